@@ -0,0 +1,83 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit on concurrent LLM requests.
+
+    Every request that succeeds without a latency spike raises the limit
+    additively (about +1 per round of `limit` requests). A failure, or a
+    latency above `latency_tolerance` times the best latency seen recently
+    (or above `target_latency`), cuts it multiplicatively by `backoff`. Cuts
+    are applied at most once per observed round trip, so a burst of errors
+    from one overloaded moment counts once.
+    """
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        target_latency: float = None
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.target_latency = target_latency
+
+        self.in_flight = 0
+        self.min_latency = None
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+        start = time.monotonic()
+        success = False
+        try:
+            yield
+            success = True
+        finally:
+            self._record(time.monotonic() - start, success)
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def _record(self, latency: float, success: bool):
+        now = time.monotonic()
+        if success:
+            # Let the baseline drift up slowly so it tracks the backend's
+            # current no-load latency rather than a single lucky request.
+            if self.min_latency is None or latency < self.min_latency:
+                self.min_latency = latency
+            else:
+                self.min_latency *= 1.01
+
+        overloaded = not success
+        if success and self.target_latency is not None:
+            overloaded = latency > self.target_latency
+        elif success and self.min_latency:
+            overloaded = latency > self.min_latency * self.latency_tolerance
+
+        if overloaded:
+            if now - self._last_decrease >= latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "min_latency": self.min_latency
+        }
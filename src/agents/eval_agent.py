@@ -1,78 +1,378 @@
 from langchain_openai import ChatOpenAI
-from src.agents.prompts.prompt_templates import QUALITY_EVAL_PROMPT
-from tenacity import retry, stop_after_attempt, wait_exponential
+from src.agents.prompts.prompt_templates import QUALITY_EVAL_PROMPT, TRANSCRIPT_PART_NOTE, MISSING_FIELDS_PROMPT
+from src.agents.output_parser import JsonScanner, parse_evaluation, loads_lenient, merge_patch, validate_evaluation, response_format
+from src.agents.long_transcript import transcript_token_budget, encoding_for_model, split_transcript, merge_chunk_evaluations
+from concurrent.futures import ThreadPoolExecutor
 import torch
 import os 
 from src.clients.rabbitmq_client import RabbitMQClient
-from src.clients.postgres_client import PostgresClient
-import json 
+from src.clients.postgres_client import PostgresClient, POOL_STAT_COUNTERS
+from src.services.result_cache import ResultCache
+from src.agents.concurrency import AdaptiveConcurrencyLimiter
+from src.agents.prompt_registry import PromptRegistry, PromptTemplate
+from src.services import metrics
+import asyncio
+import contextvars
+import hashlib
 from dotenv import load_dotenv
-import time
 load_dotenv()
 
+LLM_TOKENS = metrics.counter(
+    "llm_tokens_total",
+    "LLM tokens by kind, counted locally with the model's tokenizer.",
+    ("kind",)
+)
+
 class CallQualityAgent:
-    def __init__(self, db: PostgresClient, mq: RabbitMQClient):
+    def __init__(self, db: PostgresClient, mq: RabbitMQClient, evaluation_cache: ResultCache = None, bypass_cache: bool = False, limiter: AdaptiveConcurrencyLimiter = None, prompts: PromptRegistry = None):
+        # EVAL_RESPONSE_FORMAT=json_schema makes backends with structured
+        # output (OpenAI, vLLM, LM Studio) emit schema-valid JSON directly.
+        fmt = response_format(os.getenv("EVAL_RESPONSE_FORMAT", ""))
         self.llm = ChatOpenAI(
             base_url=os.getenv("LLM_BASE_URL"),
             api_key=os.getenv("LLM_API_KEY"),
-            temperature=0
+            temperature=0,
+            model_kwargs={"response_format": fmt} if fmt else {}
         )
         self.db = db
-        self.prompt_template = self.db.get_active_prompt("QUALITY_EVAL")
+        self.prompts = prompts or PromptRegistry(db, ["QUALITY_EVAL"])
         self.mq = mq
+        self.evaluation_cache = evaluation_cache
+        self.bypass_cache = bypass_cache
+        self.limiter = limiter or AdaptiveConcurrencyLimiter()
+        self.max_transcript_tokens = transcript_token_budget(self.llm.model_name)
+        self.encoding = None
+        self.count_tokens = True
+        self.chunk_concurrency = int(os.getenv("EVAL_CHUNK_CONCURRENCY", "4"))
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=10))
-    def evaluate(self, transcript: str) -> str:
-        prompt = self.prompt_template["content"].format(transcript=transcript)
+    @property
+    def prompt_template(self) -> PromptTemplate:
+        # Read once per job and passed down, so one evaluation never mixes
+        # two prompt versions.
+        return self.prompts.get("QUALITY_EVAL")
 
-        start = time.time()
-        response = self.llm.invoke(prompt)
-        duration = time.time() - start
+    def build_prompt(self, template: PromptTemplate, transcript: str, part: int = None, parts: int = 1) -> str:
+        prompt = template.format(transcript=transcript)
+        if parts > 1:
+            prompt += TRANSCRIPT_PART_NOTE.format(part=part, parts=parts)
+        return prompt
 
-        print(f"LLM latency: {duration:.2f}s for call")
-        return response.content
+    def complete(self, prompt: str) -> str:
+        """
+        Stream a completion and stop reading as soon as the first top-level
+        JSON object closes; closing the stream early lets the server stop
+        generating whatever the model would have added after it.
+        """
+        scanner = JsonScanner()
 
-    def process_evaluation_job(self, message: dict):
+        with metrics.stage("llm"):
+            for chunk in self.llm.stream(prompt):
+                if scanner.feed(chunk.content):
+                    break
+
+        self.record_tokens(prompt, scanner.text)
+        return scanner.text
+
+    async def acomplete(self, prompt: str) -> str:
+        scanner = JsonScanner()
+
+        # Failed requests still count against the limit; the job is retried
+        # later through the broker's delay queues.
+        async with self.limiter.slot():
+            with metrics.stage("llm", limit=self.limiter.stats()["limit"]):
+                stream = self.llm.astream(prompt)
+                try:
+                    async for chunk in stream:
+                        if scanner.feed(chunk.content):
+                            break
+                finally:
+                    await stream.aclose()
+
+        self.record_tokens(prompt, scanner.text)
+        return scanner.text
+
+    def token_encoding(self):
+        if self.encoding is None:
+            self.encoding = encoding_for_model(self.llm.model_name)
+        return self.encoding
+
+    def record_tokens(self, prompt: str, completion: str):
+        if not self.count_tokens:
+            return
         try:
-            call_id = message.get("call_id")
-            print("Processing evaluation job for call:", call_id)
-            call = self.db.get_transcript_by_call_id(call_id)
-            
-            evaluation = self.evaluate(call["timestamped_text"])      
+            encoding = self.token_encoding()
+            prompt_tokens = len(encoding.encode(prompt))
+            completion_tokens = len(encoding.encode(completion))
+        except Exception as e:
+            # e.g. the tokenizer files cannot be downloaded; not worth
+            # retrying on every request.
+            print(f"Token counting disabled: {e}")
+            self.count_tokens = False
+            return
+        LLM_TOKENS.inc(prompt_tokens, kind="prompt")
+        LLM_TOKENS.inc(completion_tokens, kind="completion")
+
+    def evaluate(self, transcript: str, part: int = None, parts: int = 1) -> str:
+        return self.complete(self.build_prompt(self.prompt_template, transcript, part, parts))
+
+    async def aevaluate(self, transcript: str, part: int = None, parts: int = 1) -> str:
+        return await self.acomplete(self.build_prompt(self.prompt_template, transcript, part, parts))
+
+    def reask_prompt(self, prompt: str, missing: list) -> str:
+        # The original prompt is kept as the prefix so servers with prefix
+        # caching (vLLM, LM Studio) do not prefill the transcript again.
+        return prompt + MISSING_FIELDS_PROMPT.format(fields="\n".join(f"- {field}" for field in missing))
+
+    def _apply_patch(self, evaluation: dict, missing: list, answer: str) -> dict:
+        patch = loads_lenient(answer) or {}
+        evaluation = merge_patch(evaluation, patch, missing)
+        missing = validate_evaluation(evaluation)
+        if missing:
+            raise ValueError(f"Evaluation still missing fields after re-ask: {missing}")
+        return evaluation
+
+    def evaluate_parsed(self, template: PromptTemplate, transcript: str, part: int = None, parts: int = 1) -> dict:
+        """
+        Evaluate and parse, repairing malformed JSON locally. Fields that are
+        still missing or invalid are requested again on their own instead of
+        regenerating the whole evaluation.
+        """
+        prompt = self.build_prompt(template, transcript, part, parts)
+        evaluation, missing = parse_evaluation(self.complete(prompt))
+        if not missing:
+            return evaluation
+
+        print(f"Evaluation incomplete, re-asking for {missing}")
+        return self._apply_patch(evaluation, missing, self.complete(self.reask_prompt(prompt, missing)))
+
+    async def aevaluate_parsed(self, template: PromptTemplate, transcript: str, part: int = None, parts: int = 1) -> dict:
+        prompt = self.build_prompt(template, transcript, part, parts)
+        evaluation, missing = parse_evaluation(await self.acomplete(prompt))
+        if not missing:
+            return evaluation
+
+        print(f"Evaluation incomplete, re-asking for {missing}")
+        return self._apply_patch(evaluation, missing, await self.acomplete(self.reask_prompt(prompt, missing)))
+
+    def transcript_chunks(self, transcript: str) -> list:
+        # Byte-level BPE never yields more tokens than UTF-8 bytes, so short
+        # transcripts never need tokenizing. (Not characters: CJK text and
+        # emoji often take several tokens per character.)
+        if len(transcript.encode("utf-8")) <= self.max_transcript_tokens:
+            return [transcript]
+        return split_transcript(transcript, self.max_transcript_tokens, self.token_encoding())
+
+    def evaluate_transcript(self, template: PromptTemplate, transcript: str) -> dict:
+        """
+        Parsed evaluation of a whole transcript. Transcripts over the token
+        budget are evaluated in chunks, in parallel, and merged.
+        """
+        chunks = self.transcript_chunks(transcript)
+        if len(chunks) == 1:
+            return self.evaluate_parsed(template, transcript)
+
+        print(f"Long transcript: {len(chunks)} chunks of <= {self.max_transcript_tokens} tokens")
+        with ThreadPoolExecutor(max_workers=min(len(chunks), self.chunk_concurrency)) as pool:
+            # Each chunk runs in a copy of this context, to keep the job's trace.
+            futures = [
+                pool.submit(contextvars.copy_context().run, self.evaluate_parsed, template, chunk, index + 1, len(chunks))
+                for index, chunk in enumerate(chunks)
+            ]
+            evaluations = [future.result() for future in futures]
+        return merge_chunk_evaluations(evaluations)
+
+    async def aevaluate_transcript(self, template: PromptTemplate, transcript: str) -> dict:
+        chunks = self.transcript_chunks(transcript)
+        if len(chunks) == 1:
+            return await self.aevaluate_parsed(template, transcript)
+
+        print(f"Long transcript: {len(chunks)} chunks of <= {self.max_transcript_tokens} tokens")
+        # The limiter bounds the chunk requests together with everything else.
+        evaluations = await asyncio.gather(*(
+            self.aevaluate_parsed(template, chunk, index + 1, len(chunks))
+            for index, chunk in enumerate(chunks)
+        ))
+        return merge_chunk_evaluations(list(evaluations))
+
+    def evaluation_cache_key(self, template: PromptTemplate, transcript: str) -> str:
+        # temperature=0, so the same prompt, model, token budget and
+        # transcript give the same evaluation. The content hash covers
+        # prompts edited in place without a version bump.
+        return ResultCache.make_key(
+            template.name,
+            template.version,
+            hashlib.sha256(template.content.encode()).hexdigest(),
+            self.llm.model_name,
+            self.max_transcript_tokens,
+            hashlib.sha256(transcript.encode()).hexdigest()
+        )
+
+    def _cache_lookup(self, template: PromptTemplate, transcript: str, bypass_cache: bool = False):
+        """
+        Returns (cache key, cached evaluation or None). The key is None when
+        there is no evaluation cache.
+        """
+        cache = self.evaluation_cache
+        if cache is None:
+            return None, None
+
+        key = self.evaluation_cache_key(template, transcript)
+        if bypass_cache or self.bypass_cache:
+            return key, None
+
+        evaluation = cache.get(key)
+        if evaluation is not None:
+            print(f"Evaluation cache hit {cache.stats()}")
+        return key, evaluation
 
-            evaluation = json.loads(evaluation)
+    def evaluate_cached(self, template: PromptTemplate, transcript: str, bypass_cache: bool = False) -> dict:
+        """
+        Parsed evaluation for a transcript, served from the evaluation cache
+        when possible. With bypass_cache the LLM is always called, but the
+        fresh result still refreshes the cache.
+        """
+        key, evaluation = self._cache_lookup(template, transcript, bypass_cache)
+        if evaluation is not None:
+            return evaluation
 
-            print("Evaluation:", evaluation)
-            transcript_id = self.db.save_evaluation(
+        evaluation = self.evaluate_transcript(template, transcript)
+
+        if key is not None:
+            self.evaluation_cache.put(key, evaluation)
+        return evaluation
+
+    async def aevaluate_cached(self, template: PromptTemplate, transcript: str, bypass_cache: bool = False) -> dict:
+        key, evaluation = await asyncio.to_thread(self._cache_lookup, template, transcript, bypass_cache)
+        if evaluation is not None:
+            return evaluation
+
+        evaluation = await self.aevaluate_transcript(template, transcript)
+
+        if key is not None:
+            await asyncio.to_thread(self.evaluation_cache.put, key, evaluation)
+        return evaluation
+
+    def save_evaluation(self, call_id: str, evaluation: dict, template: PromptTemplate):
+        print("Evaluation:", evaluation)
+        with metrics.stage("db_write"):
+            evaluation_id = self.db.complete_evaluation(
                 call_id=call_id,
                 evaluator_type="agentic",
-                evaluator_version="0.1",
+                evaluator_version=template.version,
                 overall_score=evaluation["overall_score"],
                 category_scores=evaluation["category_scores"],
                 strengths=evaluation["strengths"],
                 improvements=evaluation["areas_for_improvement"],
                 raw_output=evaluation
             )
+        if evaluation_id is None:
+            raise RuntimeError("Could not save evaluation")
 
-            self.db.update_call_status(call_id, "EVALUATED")
+    def fail_job(self, message: dict, error: Exception):
+        """
+        Failure handler for a job that used up its retries.
+        """
+        print("Error processing evaluation job:", error)
+        self.db.update_call_status(message.get("call_id"), "FAILED", f"Evaluation failed: {str(error)}")
+        self.mq.publish("failed_jobs", {"file_path": message.get("file_path"), "call_id": message.get("call_id"), "trace_id": message.get("trace_id"), "error": f"Evaluation failed: {str(error)}"})
 
-        except Exception as e:
-            print("Error processing evaluation job:", e)
-            self.db.update_call_status(call_id, "FAILED", f"Evaluation failed: {str(e)}")
-            self.mq.publish("failed_jobs", {"file_path": message.get("file_path"), "call_id": message.get("call_id"), "error": f"Evaluation failed: {str(e)}"})
+    def process_evaluation_job(self, message: dict):
+        """
+        Raises if the job failed, so the consumer can schedule a retry.
+        """
+        with metrics.trace(message.get("trace_id")), metrics.stage("evaluation"):
+            call_id = message.get("call_id")
+            print("Processing evaluation job for call:", call_id)
+            with metrics.stage("db_read"):
+                call = self.db.get_transcript_by_call_id(call_id)
 
+            template = self.prompt_template
+            evaluation = self.evaluate_cached(template, call["timestamped_text"], bypass_cache=message.get("bypass_cache", False))
+            self.save_evaluation(call_id, evaluation, template)
 
-def main():
-    mq = RabbitMQClient()
-    db = PostgresClient()
-    print("Waiting for evaluation jobs...")
+    async def aprocess_evaluation_job(self, message: dict):
+        """
+        Async counterpart of process_evaluation_job. Only the LLM request runs
+        on the event loop; the blocking DB and publisher calls go to worker
+        threads. Raises if the job failed.
+        """
+        with metrics.trace(message.get("trace_id")), metrics.stage("evaluation"):
+            call_id = message.get("call_id")
+            print("Processing evaluation job for call:", call_id)
+            with metrics.stage("db_read"):
+                call = await asyncio.to_thread(self.db.get_transcript_by_call_id, call_id)
 
+            template = self.prompt_template
+            evaluation = await self.aevaluate_cached(template, call["timestamped_text"], bypass_cache=message.get("bypass_cache", False))
+            await asyncio.to_thread(self.save_evaluation, call_id, evaluation, template)
+
+def agent_from_env(db: PostgresClient, mq: RabbitMQClient) -> CallQualityAgent:
+    concurrency = int(os.getenv("EVAL_CONCURRENCY", "1"))
+    target_latency = os.getenv("EVAL_TARGET_LATENCY")
+
+    evaluation_cache = ResultCache(
+        db,
+        namespace="evaluation",
+        max_bytes=int(os.getenv("EVAL_CACHE_MAX_BYTES", str(256 * 1024 ** 2))),
+        ttl_seconds=float(os.getenv("EVAL_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        enabled=os.getenv("EVAL_CACHE", "1") == "1"
+    )
+    agent = CallQualityAgent(
+        db=db,
+        mq=mq,
+        evaluation_cache=evaluation_cache,
+        bypass_cache=os.getenv("EVAL_CACHE_BYPASS", "0") == "1",
+        limiter=AdaptiveConcurrencyLimiter(
+            initial=concurrency,
+            max_limit=int(os.getenv("EVAL_MAX_CONCURRENCY", "64")),
+            target_latency=float(target_latency) if target_latency else None
+        )
+    )
+    metrics.register_stats("result_cache", evaluation_cache.stats, counters=("hits", "misses"), namespace="evaluation")
+    metrics.register_stats("llm_limiter", agent.limiter.stats)
+    return agent
+
+
+def consume_evaluation_jobs(agent: CallQualityAgent, mq: RabbitMQClient):
+    """
+    Serve `evaluation_jobs` with EVAL_MODE=async on an asyncio loop, or on
+    EVAL_CONCURRENCY threads.
+    """
+    if os.getenv("EVAL_MODE", "sync") == "async":
+        # Prefetch up to the limiter's ceiling; the limiter, not the broker,
+        # decides how many of those reach the LLM at once.
+        asyncio.run(mq.consume_async(
+            queue_name="evaluation_jobs",
+            callback=agent.aprocess_evaluation_job,
+            prefetch_count=agent.limiter.max_limit,
+            on_failure=agent.fail_job
+        ))
+        return
 
-    agent = CallQualityAgent(db=db, mq=mq)
     mq.consume(
         queue_name="evaluation_jobs",
-        callback=agent.process_evaluation_job
+        callback=agent.process_evaluation_job,
+        concurrency=int(os.getenv("EVAL_CONCURRENCY", "1")),
+        executor="thread",
+        on_failure=agent.fail_job
     )
 
+
+def main():
+    concurrency = int(os.getenv("EVAL_CONCURRENCY", "1"))
+    async_mode = os.getenv("EVAL_MODE", "sync") == "async"
+    max_concurrency = int(os.getenv("EVAL_MAX_CONCURRENCY", "64"))
+
+    mq = RabbitMQClient()
+    # In async mode DB work runs on asyncio's default thread pool, so size the
+    # pool for that rather than for the number of LLM requests.
+    db = PostgresClient(maxconn=min(max_concurrency, 16) if async_mode else max(concurrency, 2))
+    print("Waiting for evaluation jobs...")
+
+    agent = agent_from_env(db, mq)
+    metrics.register_stats("db_pool", db.pool_stats, counters=POOL_STAT_COUNTERS)
+    metrics.serve_from_env(9103)
+    consume_evaluation_jobs(agent, mq)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,132 @@
+import os
+import statistics
+import tiktoken
+from src.agents.output_parser import round_half_up
+
+DEFAULT_MAX_TRANSCRIPT_TOKENS = 6000
+
+# Categories judged on the opening or the end of the call; a chunk from the
+# middle of a call says nothing about them.
+FIRST_CHUNK_CATEGORIES = ("greeting_and_introduction",)
+LAST_CHUNK_CATEGORIES = ("call_closure_quality", "customer_satisfaction", "problem_resolution")
+
+
+# -------------------------
+# Token budget
+# -------------------------
+
+def transcript_token_budget(model_name: str) -> int:
+    """
+    Max transcript tokens per LLM request for `model_name`.
+
+    EVAL_MAX_TRANSCRIPT_TOKENS_BY_MODEL holds per-model overrides as
+    "model=tokens,model=tokens"; EVAL_MAX_TRANSCRIPT_TOKENS is the default.
+    """
+    overrides = {}
+    for entry in os.getenv("EVAL_MAX_TRANSCRIPT_TOKENS_BY_MODEL", "").split(","):
+        if "=" in entry:
+            name, tokens = entry.rsplit("=", 1)
+            overrides[name.strip()] = int(tokens)
+
+    default = int(os.getenv("EVAL_MAX_TRANSCRIPT_TOKENS", str(DEFAULT_MAX_TRANSCRIPT_TOKENS)))
+    return overrides.get(model_name, default)
+
+
+def encoding_for_model(model_name: str) -> tiktoken.Encoding:
+    # Local models served through an OpenAI-compatible API are unknown to
+    # tiktoken; cl100k_base is close enough for budgeting.
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+# -------------------------
+# Map
+# -------------------------
+
+def split_transcript(text: str, max_tokens: int, encoding: tiktoken.Encoding) -> list:
+    """
+    Split a timestamped transcript (one segment per line) into chunks of at
+    most `max_tokens` tokens, cutting only between lines. A single line over
+    the budget is cut on token boundaries.
+    """
+    chunks = []
+    current, current_tokens = [], 0
+
+    for line in text.splitlines():
+        tokens = len(encoding.encode(line)) + 1  # + newline
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+
+        if tokens > max_tokens:
+            ids = encoding.encode(line)
+            for start in range(0, len(ids), max_tokens):
+                chunks.append(encoding.decode(ids[start:start + max_tokens]))
+            continue
+
+        current.append(line)
+        current_tokens += tokens
+
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+# -------------------------
+# Reduce
+# -------------------------
+
+def _unique(items) -> list:
+    seen = []
+    for item in items:
+        if item and item not in seen:
+            seen.append(item)
+    return seen
+
+
+def _merge_category(entries: list) -> dict:
+    """
+    Average the scores of one category over several chunks and keep the
+    explanation and evidence of each chunk that found something.
+    """
+    score = round_half_up(statistics.mean(entry["score"] for entry in entries))
+    evidence = _unique(
+        entry.get("evidence") for entry in entries
+        if entry.get("evidence") and entry.get("evidence") != "Not present"
+    )
+    return {
+        "score": score,
+        "explanation": " ".join(_unique(entry.get("explanation") for entry in entries)),
+        "evidence": " | ".join(evidence) if evidence else "Not present"
+    }
+
+
+def merge_chunk_evaluations(evaluations: list) -> dict:
+    """
+    Combine per-chunk evaluations (in transcript order) into one evaluation
+    with the same schema. Opening and closing categories are taken from the
+    first and last chunk; the rest are averaged. overall_score is recomputed
+    as the rounded mean of the merged category scores.
+    """
+    if len(evaluations) == 1:
+        return evaluations[0]
+
+    names = _unique(name for evaluation in evaluations for name in evaluation["category_scores"])
+    category_scores = {}
+    for name in names:
+        entries = [e["category_scores"][name] for e in evaluations if name in e["category_scores"]]
+        if name in FIRST_CHUNK_CATEGORIES:
+            entries = entries[:1]
+        elif name in LAST_CHUNK_CATEGORIES:
+            entries = entries[-1:]
+        category_scores[name] = _merge_category(entries)
+
+    return {
+        "overall_score": round_half_up(statistics.mean(c["score"] for c in category_scores.values())),
+        "category_scores": category_scores,
+        "strengths": _unique(s for e in evaluations for s in e.get("strengths", [])),
+        "areas_for_improvement": _unique(s for e in evaluations for s in e.get("areas_for_improvement", [])),
+        "chunks": len(evaluations)
+    }
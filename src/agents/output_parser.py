@@ -0,0 +1,316 @@
+import json
+import math
+
+CATEGORIES = (
+    "greeting_and_introduction",
+    "empathy_and_tone",
+    "compliance_statements",
+    "product_information_accuracy",
+    "call_closure_quality",
+    "customer_satisfaction",
+    "problem_resolution",
+)
+LIST_FIELDS = ("strengths", "areas_for_improvement")
+
+_CATEGORY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "integer", "minimum": 1, "maximum": 5},
+        "explanation": {"type": "string"},
+        "evidence": {"type": "string"}
+    },
+    "required": ["score", "explanation", "evidence"],
+    "additionalProperties": False
+}
+
+EVALUATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "overall_score": {"type": "number"},
+        "category_scores": {
+            "type": "object",
+            "properties": {name: _CATEGORY_SCHEMA for name in CATEGORIES},
+            "required": list(CATEGORIES),
+            "additionalProperties": False
+        },
+        "strengths": {"type": "array", "items": {"type": "string"}},
+        "areas_for_improvement": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["overall_score", "category_scores", *LIST_FIELDS],
+    "additionalProperties": False
+}
+
+
+def response_format(mode: str):
+    """
+    OpenAI `response_format` for EVAL_RESPONSE_FORMAT: "json_schema" (the
+    evaluation schema, strict), "json_object", or empty for none.
+    """
+    if mode == "json_schema":
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": "call_quality_evaluation", "schema": EVALUATION_SCHEMA, "strict": True}
+        }
+    if mode == "json_object":
+        return {"type": "json_object"}
+    if mode:
+        raise ValueError(f"Unknown response format '{mode}', expected 'json_schema' or 'json_object'")
+    return None
+
+
+# -------------------------
+# Scanning and repair
+# -------------------------
+
+class JsonScanner:
+    """
+    Incremental scanner for the first top-level JSON object in streamed text.
+    Skips anything before the opening brace (code fences, preambles) and
+    reports when the object closes, so the stream can be cut there.
+    """
+    def __init__(self):
+        self.text = ""
+        self.start = None
+        self.end = None
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self._pos = 0
+
+    def feed(self, chunk: str) -> bool:
+        self.text += chunk
+        text = self.text
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self.start is None:
+                if c == "{":
+                    self.start = i
+                    self.stack.append("}")
+                continue
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                continue
+            if c == '"':
+                self.in_string = True
+            elif c == "{":
+                self.stack.append("}")
+            elif c == "[":
+                self.stack.append("]")
+            elif c in "}]":
+                if self.stack:
+                    self.stack.pop()
+                if not self.stack:
+                    self.end = i + 1
+                    self._pos = len(text)
+                    return True
+        self._pos = len(text)
+        return False
+
+    @property
+    def done(self) -> bool:
+        return self.end is not None
+
+    @property
+    def json_text(self) -> str:
+        if self.start is None:
+            return ""
+        return self.text[self.start:self.end]
+
+
+def extract_json(text: str) -> str:
+    scanner = JsonScanner()
+    scanner.feed(text)
+    return scanner.json_text
+
+
+def _is_json(text: str) -> bool:
+    try:
+        json.loads(text)
+    except ValueError:
+        return False
+    return True
+
+
+def repair_json(text: str) -> str:
+    """
+    Fix the defects LLMs commonly produce: smart quotes used as delimiters,
+    trailing commas, and output truncated before the closing brackets.
+    Truncated output is cut back to the last complete member of the
+    innermost open container (dropping a half-typed key or literal, or a
+    dangling `"key":`) before the brackets are closed.
+    """
+    if '"' not in text:
+        text = text.replace("“", '"').replace("”", '"')
+
+    out = []
+    # One [closer, expecting, member_start] per open container. `expecting`
+    # is "key", "colon", "value" or "done" (arrays only use the last two);
+    # `member_start` is where the member being read starts in `out`.
+    stack = []
+    in_string = escape = False
+    literal = None
+    for c in text:
+        if in_string:
+            out.append(c)
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+                if stack:
+                    stack[-1][1] = "colon" if stack[-1][1] == "key" else "done"
+            continue
+        if literal is not None:
+            if not (c.isspace() or c in ",}]"):
+                out.append(c)
+                continue
+            literal = None
+            stack[-1][1] = "done"
+        top = stack[-1] if stack else None
+        if c in "}]":
+            # Drop a trailing comma before the closer.
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack:
+                stack.pop()
+            if stack:
+                stack[-1][1] = "done"
+        elif c == '"':
+            in_string = True
+        elif c == "{":
+            stack.append(["}", "key", len(out) + 1])
+        elif c == "[":
+            stack.append(["]", "value", len(out) + 1])
+        elif top is None:
+            pass
+        elif c == ",":
+            top[1] = "key" if top[0] == "}" else "value"
+            top[2] = len(out)
+        elif c == ":":
+            if top[1] == "colon":
+                top[1] = "value"
+        elif top[1] == "value" and not c.isspace():
+            literal = len(out)
+        out.append(c)
+
+    # Truncated output: keep the last member only if it is complete.
+    if stack:
+        top = stack[-1]
+        complete = top[1] == "done"
+        if in_string:
+            complete = top[1] == "value"
+            if complete:
+                if escape:
+                    out.pop()
+                out.append('"')
+        elif literal is not None:
+            complete = _is_json("".join(out[literal:]))
+        if not complete:
+            del out[top[2]:]
+    repaired = "".join(out).rstrip()
+    return repaired + "".join(closer for closer, _, _ in reversed(stack))
+
+
+def loads_lenient(text: str):
+    """
+    Parse the first JSON object in `text`, repairing it if needed.
+    Returns None if nothing usable is found.
+    """
+    candidate = extract_json(text)
+    if not candidate:
+        return None
+    for attempt in (candidate, repair_json(candidate)):
+        try:
+            value = json.loads(attempt)
+        except ValueError:
+            continue
+        return value if isinstance(value, dict) else None
+    return None
+
+
+# -------------------------
+# Validation
+# -------------------------
+
+def round_half_up(value: float) -> int:
+    return int(math.floor(value + 0.5))
+
+
+def _valid_category(entry) -> bool:
+    if not isinstance(entry, dict):
+        return False
+    score = entry.get("score")
+    if isinstance(score, str) and score.strip().isdigit():
+        score = entry["score"] = int(score)
+    if isinstance(score, float) and score.is_integer():
+        score = entry["score"] = int(score)
+    return (
+        isinstance(score, int) and 1 <= score <= 5
+        and isinstance(entry.get("explanation"), str)
+        and isinstance(entry.get("evidence"), str)
+    )
+
+
+def validate_evaluation(evaluation: dict) -> list:
+    """
+    Check an evaluation against the schema, normalising what can be fixed
+    locally. Returns the fields that are missing or invalid, as
+    "category_scores.<name>", "strengths" or "areas_for_improvement".
+    overall_score is always recomputed from the category scores.
+    """
+    categories = evaluation.get("category_scores")
+    if not isinstance(categories, dict):
+        categories = evaluation["category_scores"] = {}
+
+    missing = [f"category_scores.{name}" for name in CATEGORIES if not _valid_category(categories.get(name))]
+    missing += [
+        field for field in LIST_FIELDS
+        if not isinstance(evaluation.get(field), list)
+        or not all(isinstance(item, str) for item in evaluation[field])
+    ]
+
+    if not missing:
+        evaluation["overall_score"] = round_half_up(
+            sum(categories[name]["score"] for name in CATEGORIES) / len(CATEGORIES)
+        )
+    return missing
+
+
+def merge_patch(evaluation: dict, patch: dict, missing: list) -> dict:
+    """
+    Fill the `missing` fields of `evaluation` (as reported by
+    validate_evaluation) from a re-ask answer; fields that were already
+    valid are kept even if the answer repeats them. Categories may come
+    back either under "category_scores" or at the top level.
+    """
+    categories = evaluation.setdefault("category_scores", {})
+    patch_categories = patch.get("category_scores")
+    if not isinstance(patch_categories, dict):
+        patch_categories = {}
+    for field in missing:
+        if field.startswith("category_scores."):
+            name = field.split(".", 1)[1]
+            if name in patch_categories:
+                categories[name] = patch_categories[name]
+            elif name in patch:
+                categories[name] = patch[name]
+        elif field in patch:
+            evaluation[field] = patch[field]
+    return evaluation
+
+
+def parse_evaluation(text: str):
+    """
+    Returns (evaluation, missing fields). An unparseable answer gives an
+    empty evaluation with every field missing.
+    """
+    evaluation = loads_lenient(text) or {}
+    return evaluation, validate_evaluation(evaluation)
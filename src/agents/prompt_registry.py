@@ -0,0 +1,124 @@
+import select
+import string
+import threading
+from dataclasses import dataclass, field
+from src.clients.postgres_client import PostgresClient
+
+NOTIFY_CHANNEL = "prompts_changed"
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    name: str
+    version: str
+    content: str
+    # (literal text, field name or None) pairs from string.Formatter.parse,
+    # so rendering a job's prompt is a join rather than a re-parse.
+    parts: tuple = field(default=(), repr=False)
+
+    @classmethod
+    def parse(cls, name: str, version: str, content: str) -> "PromptTemplate":
+        parts = []
+        for literal, field_name, format_spec, conversion in string.Formatter().parse(content):
+            if field_name is not None and (format_spec or conversion or not field_name.isidentifier()):
+                raise ValueError(f"Prompt {name} v{version}: unsupported placeholder '{{{field_name}}}'")
+            parts.append((literal, field_name))
+        return cls(name, version, content, tuple(parts))
+
+    @property
+    def fields(self) -> set:
+        return {name for _, name in self.parts if name is not None}
+
+    def format(self, **values) -> str:
+        return "".join(
+            literal if name is None else literal + str(values[name])
+            for literal, name in self.parts
+        )
+
+
+class PromptRegistry:
+    """
+    In-process cache of the active prompts.
+
+    Prompts are loaded once and then reloaded only when Postgres notifies
+    `prompts_changed` (see the trigger on `prompts`), so jobs read the prompt
+    from memory and pick up a newly activated version within about
+    `poll_interval` seconds. If the listener connection drops, everything is
+    reloaded after reconnecting, since notifications sent meanwhile are lost.
+    """
+    def __init__(self, db: PostgresClient, names: list, poll_interval: float = 0.5, listen: bool = True):
+        self.db = db
+        self.names = list(names)
+        self.poll_interval = poll_interval
+        self._prompts = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        for name in self.names:
+            self._reload(name)
+
+        if listen:
+            self._thread = threading.Thread(target=self._listen, name="prompt-registry", daemon=True)
+            self._thread.start()
+
+    def get(self, name: str) -> PromptTemplate:
+        prompt = self._prompts.get(name)
+        if prompt is None:
+            raise KeyError(f"No active prompt named '{name}'")
+        return prompt
+
+    def _reload(self, name: str):
+        row = self.db.get_active_prompt(name)
+        if row is None:
+            # Keep serving the previous version rather than failing jobs
+            # while no version is marked active (e.g. mid-switch).
+            print(f"No active prompt '{name}', keeping the cached version")
+            return
+
+        current = self._prompts.get(name)
+        if current is not None and (current.version, current.content) == (row["version"], row["content"]):
+            return
+
+        try:
+            prompt = PromptTemplate.parse(row["name"], row["version"], row["content"])
+        except ValueError as e:
+            print(f"Ignoring invalid prompt: {e}")
+            return
+
+        with self._lock:
+            self._prompts[name] = prompt
+        previous = f" (was v{current.version})" if current is not None else ""
+        print(f"Loaded prompt {name} v{prompt.version}{previous}")
+
+    def _listen(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self.db.listen(NOTIFY_CHANNEL)
+                for name in self.names:
+                    self._reload(name)
+                backoff = 1.0
+
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], self.poll_interval) == ([], [], []):
+                        continue
+                    conn.poll()
+                    changed = {notify.payload for notify in conn.notifies}
+                    conn.notifies.clear()
+                    for name in changed.intersection(self.names):
+                        self._reload(name)
+
+            except Exception as e:
+                print(f"Prompt listener error ({e!r}), reconnecting in {backoff:.0f}s")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if conn is not None and not conn.closed:
+                    conn.close()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval * 2)
@@ -95,4 +95,15 @@ TRANSCRIPT:
 \"\"\"
 {transcript}
 \"\"\"
-"""
\ No newline at end of file
+"""
+TRANSCRIPT_PART_NOTE = """
+NOTE: The transcript above is part {part} of {parts} of one longer call, split to fit the model context.
+Evaluate only what this part shows. Greeting happens in the first part and call closure, customer satisfaction and problem resolution are judged on the last part, so do not mark them "Not present" just because they fall outside this part.
+"""
+
+MISSING_FIELDS_PROMPT = """
+Your previous answer was missing or had invalid values for these fields:
+{fields}
+
+Return ONLY raw JSON with just these fields, in the same format as the OUTPUT FORMAT above (categories inside "category_scores").
+"""
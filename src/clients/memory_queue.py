@@ -0,0 +1,420 @@
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Any, Iterable, Union
+from src.services import metrics
+
+# Same series as RabbitMQClient, so dashboards work for either transport.
+CONSUMED = metrics.counter("mq_messages_total", "Messages consumed, by outcome.", ("queue", "outcome"))
+QUEUE_WAIT = metrics.histogram("mq_queue_wait_seconds", "Time messages spent waiting in the queue.", ("queue",))
+
+
+class InMemoryQueueClient:
+    """
+    In-process stand-in for RabbitMQClient, for running the pipeline stages
+    in one process (or a benchmark) without a broker.
+
+    Publishing and the consume* methods take the same arguments as
+    RabbitMQClient, so stages written against the broker run unchanged.
+    Messages are JSON round-tripped on publish, so consumers get a copy as
+    they would from the broker. Queues listed in `maxsizes` are bounded:
+    publishing to a full one blocks until its consumer catches up, which
+    pushes back on the stage before it. Other queues (e.g. failed_jobs,
+    which nothing reads in-process) are unbounded.
+
+    Failed messages are retried after `retry_delays` seconds and handed to
+    `on_failure` after the last attempt, as with the broker's delay queues.
+    Nothing is persisted: messages still queued when the process exits are
+    lost, and their calls stay in their last status.
+    """
+    def __init__(self, maxsizes: dict = None, retry_delays: Iterable[float] = None, poll_interval: float = 0.5):
+        self.maxsizes = dict(maxsizes or {})
+        if retry_delays is None:
+            retry_delays = [float(d) for d in os.getenv("MQ_RETRY_DELAYS", "5,30,120").split(",") if d.strip()]
+        self.retry_delays = tuple(retry_delays)
+        self.poll_interval = poll_interval
+
+        self._queues = {}
+        self._scheduled = {}
+        self._lock = threading.Lock()
+        self._available = threading.Condition()
+        self._closed = threading.Event()
+
+    def queue(self, queue_name: str) -> queue.Queue:
+        with self._lock:
+            q = self._queues.get(queue_name)
+            if q is None:
+                q = self._queues[queue_name] = queue.Queue(maxsize=self.maxsizes.get(queue_name, 0))
+                self._scheduled[queue_name] = 0
+            return q
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+    def close(self):
+        """
+        Stop the consume loops after the messages they are handling, and
+        fail publishers blocked on a full queue.
+        """
+        self._closed.set()
+        with self._available:
+            self._available.notify_all()
+
+    # ---------
+    # Publisher
+    # ---------
+
+    def _put(self, queue_name: str, message: dict, attempt: int = 1):
+        # Items are (message, attempt, time it became available).
+        q = self.queue(queue_name)
+        while True:
+            if self._closed.is_set():
+                raise RuntimeError(f"Cannot publish to '{queue_name}': queue client closed")
+            try:
+                q.put((message, attempt, time.time()), timeout=self.poll_interval)
+                break
+            except queue.Full:
+                continue
+        with self._available:
+            self._available.notify_all()
+
+    def publish(self, queue_name: str, message: dict, persistent: bool = True):
+        self._put(queue_name, json.loads(json.dumps(message)))
+
+    def publish_many(self, queue_name: str, messages, persistent: bool = True, batch_size: int = None) -> int:
+        count = 0
+        for message in messages:
+            self.publish(queue_name, message, persistent)
+            count += 1
+        return count
+
+    # ----------------
+    # Direct reads
+    # ----------------
+
+    def get(self, queue_name: str, timeout: float = None):
+        """
+        Take the next message of a queue, acknowledged at once, or None if
+        it stays empty for `timeout` seconds (None: return immediately).
+        """
+        q = self.queue(queue_name)
+        try:
+            item = q.get(timeout=timeout) if timeout is not None else q.get_nowait()
+        except queue.Empty:
+            return None
+        q.task_done()
+        return item[0]
+
+    def drain(self, queue_names, max_messages: int = None) -> list:
+        """
+        Take up to `max_messages` waiting messages, from the first queue
+        in `queue_names` that has any before moving on to the next.
+        """
+        if isinstance(queue_names, str):
+            queue_names = [queue_names]
+        messages = []
+        for queue_name in queue_names:
+            while max_messages is None or len(messages) < max_messages:
+                message = self.get(queue_name)
+                if message is None:
+                    break
+                messages.append(message)
+        return messages
+
+    def qsize(self, queue_name: str) -> int:
+        return self.queue(queue_name).qsize()
+
+    def stats(self) -> dict:
+        """
+        Waiting messages per queue, as `<queue>_depth`.
+        """
+        with self._lock:
+            queues = list(self._queues.items())
+        return {f"{name}_depth": q.qsize() for name, q in queues}
+
+    def wait_idle(self, queue_names: list, timeout: float = None) -> bool:
+        """
+        Block until every message published to `queue_names` has been
+        handled, including scheduled retries. Returns False on timeout.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self._lock:
+                busy = any(
+                    self.queue_unfinished(name) or self._scheduled.get(name, 0)
+                    for name in queue_names
+                )
+            if not busy:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(min(self.poll_interval, 0.1))
+
+    def queue_unfinished(self, queue_name: str) -> int:
+        q = self._queues.get(queue_name)
+        return q.unfinished_tasks if q is not None else 0
+
+    # ---------
+    # Consumers
+    # ---------
+
+    def _take(self, queue_name: str, timeout: float = None):
+        """
+        Next (queue_name, message, attempt) delivery, or None.
+        """
+        q = self.queue(queue_name)
+        try:
+            item = q.get(timeout=timeout) if timeout else q.get_nowait()
+        except queue.Empty:
+            return None
+        message, attempt, available_at = item
+        wait = max(time.time() - available_at, 0.0)
+        QUEUE_WAIT.observe(wait, queue=queue_name)
+        trace_id = message.get("trace_id") if isinstance(message, dict) else None
+        metrics.trace_event("queue_wait", wait, trace_id, queue=queue_name)
+        return queue_name, message, attempt
+
+    def _take_weighted(self, queue_weights: dict, credit: dict):
+        """
+        One delivery picked by smooth weighted round-robin (see
+        RabbitMQClient.consume_weighted), or None if every queue is empty.
+        """
+        total = sum(queue_weights.values())
+        for name, weight in queue_weights.items():
+            credit[name] += weight
+
+        idle = 0
+        for name in sorted(credit, key=credit.get, reverse=True):
+            delivery = self._take(name)
+            if delivery is not None:
+                credit[name] -= total - idle
+                return delivery
+            credit[name] = 0
+            idle += queue_weights[name]
+
+        for name in credit:
+            credit[name] = 0
+        return None
+
+    def _wait_available(self):
+        with self._available:
+            if not self._closed.is_set():
+                self._available.wait(self.poll_interval)
+
+    def _settle(self, delivery: tuple, error: Exception, on_failure: Callable = None):
+        queue_name, message, attempt = delivery
+        if error is None:
+            outcome = "ok"
+        elif attempt <= len(self.retry_delays):
+            outcome = "retry"
+            delay = self.retry_delays[attempt - 1]
+            print(f"Retrying message from '{queue_name}' in {delay:g}s (attempt {attempt + 1})")
+            with self._lock:
+                self._scheduled[queue_name] += 1
+            timer = threading.Timer(delay, self._retry, args=(queue_name, message, attempt + 1))
+            timer.daemon = True
+            timer.start()
+        else:
+            outcome = "failed"
+            if on_failure is not None:
+                try:
+                    on_failure(message, error)
+                except Exception as e:
+                    print(f"Failure handler error: {e}")
+
+        CONSUMED.inc(queue=queue_name, outcome=outcome)
+        self.queue(queue_name).task_done()
+
+    def _retry(self, queue_name: str, message: dict, attempt: int):
+        try:
+            self._put(queue_name, message, attempt)
+        except RuntimeError as e:
+            print(f"Dropping retry: {e}")
+        with self._lock:
+            self._scheduled[queue_name] -= 1
+
+    def _run_one(self, callback: Callable, delivery: tuple, on_failure: Callable):
+        try:
+            callback(delivery[1])
+            error = None
+        except Exception as e:
+            print(f"Error processing message: {e}")
+            error = e
+        self._settle(delivery, error, on_failure)
+
+    def _run_batch(self, callback: Callable, batch: list, on_failure: Callable):
+        try:
+            failures = callback([message for _, message, _ in batch]) or ()
+            errors = {id(message): error for message, error in failures}
+        except Exception as e:
+            print(f"Error processing batch: {e}")
+            errors = {id(message): e for _, message, _ in batch}
+
+        for delivery in batch:
+            self._settle(delivery, errors.get(id(delivery[1])), on_failure)
+
+    def consume(
+        self,
+        queue_name: Union[str, list],
+        callback: Callable[[dict], Any],
+        prefetch_count: int = 1,
+        concurrency: int = 1,
+        executor: str = "thread",
+        initializer: Callable = None,
+        initargs: tuple = (),
+        on_failure: Callable[[dict, Exception], Any] = None,
+    ) -> None:
+        """
+        Hand messages to `callback` one at a time, or on `concurrency`
+        threads. Only thread pools are supported in-process. Returns after
+        close().
+        """
+        if concurrency > 1 and executor != "thread":
+            raise ValueError("InMemoryQueueClient only supports thread pools")
+
+        queue_weights = dict.fromkeys([queue_name] if isinstance(queue_name, str) else queue_name, 1)
+        credit = dict.fromkeys(queue_weights, 0)
+        single = next(iter(queue_weights)) if len(queue_weights) == 1 else None
+        pool = None
+        slots = None
+        if concurrency > 1:
+            pool = ThreadPoolExecutor(max_workers=concurrency, initializer=initializer, initargs=initargs)
+            # Take a message only when a thread is free to run it, so a full
+            # pool holds back the queue (and the stage publishing to it).
+            slots = threading.Semaphore(concurrency)
+        elif initializer is not None:
+            initializer(*initargs)
+
+        mode = f"{concurrency} thread workers" if pool else "inline"
+        print(f"Consuming messages from {', '.join(map(repr, queue_weights))} ({mode}, in-process)...")
+        try:
+            while not self._closed.is_set():
+                if slots is not None and not slots.acquire(timeout=self.poll_interval):
+                    continue
+                if single is not None:
+                    delivery = self._take(single, self.poll_interval)
+                else:
+                    delivery = self._take_weighted(queue_weights, credit)
+                    if delivery is None:
+                        self._wait_available()
+
+                if delivery is None:
+                    if slots is not None:
+                        slots.release()
+                    continue
+                if pool is None:
+                    self._run_one(callback, delivery, on_failure)
+                    continue
+
+                future = pool.submit(self._run_one, callback, delivery, on_failure)
+                future.add_done_callback(lambda _: slots.release())
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True)
+
+    def consume_batches(
+        self,
+        queue_name: str,
+        callback: Callable[[list], Any],
+        batch_size: int = 8,
+        max_wait: float = 2.0,
+        on_failure: Callable[[dict, Exception], Any] = None,
+    ) -> None:
+        """
+        Batch consumer with the semantics of RabbitMQClient.consume_batches.
+        Returns after close().
+        """
+        print(f"Consuming batches of up to {batch_size} from '{queue_name}' (in-process)...")
+        while not self._closed.is_set():
+            first = self._take(queue_name, self.poll_interval)
+            if first is None:
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + max_wait
+            while len(batch) < batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                delivery = self._take(queue_name, remaining)
+                if delivery is None:
+                    break
+                batch.append(delivery)
+
+            self._run_batch(callback, batch, on_failure)
+
+    def consume_weighted(
+        self,
+        queue_weights: dict,
+        callback: Callable[[list], Any],
+        batch_size: int = 1,
+        poll_interval: float = 0.5,
+        on_failure: Callable[[dict, Exception], Any] = None,
+    ) -> None:
+        """
+        Weighted consumer with the semantics of
+        RabbitMQClient.consume_weighted. Returns after close().
+        """
+        credit = dict.fromkeys(queue_weights, 0)
+        lanes = ", ".join(f"'{name}' x{weight}" for name, weight in queue_weights.items())
+        print(f"Consuming batches of up to {batch_size} from {lanes} (in-process)...")
+
+        while not self._closed.is_set():
+            batch = []
+            while len(batch) < batch_size:
+                delivery = self._take_weighted(queue_weights, credit)
+                if delivery is None:
+                    break
+                batch.append(delivery)
+
+            if batch:
+                self._run_batch(callback, batch, on_failure)
+            else:
+                self._wait_available()
+
+    async def consume_async(
+        self,
+        queue_name: str,
+        callback: Callable[[dict], Awaitable[Any]],
+        prefetch_count: int = 32,
+        on_failure: Callable[[dict, Exception], Any] = None,
+    ) -> None:
+        """
+        Run `await callback(message)` in its own task for up to
+        `prefetch_count` messages at once, on the running loop. Returns
+        after close(), once the tasks in flight are done.
+        """
+        slots = asyncio.Semaphore(prefetch_count)
+        tasks = set()
+
+        async def _handle(delivery):
+            try:
+                try:
+                    await callback(delivery[1])
+                    error = None
+                except Exception as e:
+                    print(f"Error processing message: {e}")
+                    error = e
+                # The failure handler does blocking I/O.
+                await asyncio.to_thread(self._settle, delivery, error, on_failure)
+            finally:
+                slots.release()
+
+        print(f"Consuming messages from '{queue_name}' (async, prefetch {prefetch_count}, in-process)...")
+        while not self._closed.is_set():
+            await slots.acquire()
+            delivery = await asyncio.to_thread(self._take, queue_name, self.poll_interval)
+            if delivery is None:
+                slots.release()
+                continue
+            task = asyncio.create_task(_handle(delivery))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
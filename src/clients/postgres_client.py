@@ -1,29 +1,151 @@
 import uuid
 import json
+import time
+import threading
+from contextlib import contextmanager
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import RealDictCursor, execute_values
+from src.clients.segment_codec import pack_segments, LazySegments
+
+# pool_stats() entries that only ever grow (the rest are current values).
+POOL_STAT_COUNTERS = ("checkouts", "waits", "wait_seconds_total", "reconnects")
 
 
 class PostgresClient:
+    """
+    Thread-safe Postgres client backed by a connection pool.
+
+    Every method checks a connection out of the pool for the duration of one
+    transaction, so a single client can be shared by concurrent consumers and
+    a failed statement only rolls back its own connection.
+    """
     def __init__(
         self,
         host="localhost",
         port=5432,
         dbname="qa_poc",
         user="postgres",
-        password="postgres"
+        password="postgres",
+        minconn: int = 1,
+        maxconn: int = 10,
+        health_check_interval: float = 30.0
     ):
-        self.conn = psycopg2.connect(
+        self.connect_kwargs = dict(
             host=host,
             port=port,
             dbname=dbname,
             user=user,
             password=password
         )
-        self.conn.autocommit = False
+        self.pool = ThreadedConnectionPool(minconn, maxconn, **self.connect_kwargs)
+        # ThreadedConnectionPool raises instead of blocking when exhausted,
+        # so callers wait on this semaphore for a free slot.
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self.health_check_interval = health_check_interval
+        self._last_used = {}
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "in_use": 0,
+            "reconnects": 0
+        }
 
     def close(self):
-        self.conn.close()
+        self.pool.closeall()
+
+    def listen(self, channel: str):
+        """
+        Open a dedicated autocommit connection that LISTENs on `channel`.
+        It is held for the life of the listener, so it does not come from
+        the pool; the caller closes it.
+        """
+        conn = psycopg2.connect(**self.connect_kwargs)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("LISTEN {}").format(sql.Identifier(channel)))
+        return conn
+
+    # ----
+    # Pool
+    # ----
+
+    def _healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+
+        idle = time.monotonic() - self._last_used.get(id(conn), 0.0)
+        if idle < self.health_check_interval:
+            return True
+
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        start = time.monotonic()
+        if not self._slots.acquire(blocking=False):
+            self._slots.acquire()
+            waited = time.monotonic() - start
+            with self._stats_lock:
+                self._stats["waits"] += 1
+                self._stats["wait_seconds_total"] += waited
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+
+        try:
+            conn = self.pool.getconn()
+            if not self._healthy(conn):
+                self.pool.putconn(conn, close=True)
+                conn = self.pool.getconn()
+                with self._stats_lock:
+                    self._stats["reconnects"] += 1
+            conn.autocommit = False
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._stats_lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+        return conn
+
+    def _release(self, conn):
+        self._last_used[id(conn)] = time.monotonic()
+        try:
+            self.pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            with self._stats_lock:
+                self._stats["in_use"] -= 1
+            self._slots.release()
+
+    @contextmanager
+    def _connection(self):
+        """
+        Check out a connection for one transaction.
+        Rolls back on error and always returns the connection to the pool.
+        """
+        conn = self._checkout()
+        try:
+            yield conn
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self._release(conn)
+
+    def pool_stats(self) -> dict:
+        with self._stats_lock:
+            return dict(self._stats)
 
     # -----
     # Calls 
@@ -32,52 +154,345 @@ class PostgresClient:
     def create_call(self, audio_path: str, call_id: str, duration_seconds: float = None):
         
         try:
-            with self.conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO calls (id, audio_path, duration_seconds, status)
-                    VALUES (%s, %s, %s, %s)
-                """,
-                (call_id, audio_path, duration_seconds, "TRANSCRIPTION_QUEUE")
-            )
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        INSERT INTO calls (id, audio_path, duration_seconds, status)
+                        VALUES (%s, %s, %s, %s)
+                        """,
+                        (call_id, audio_path, duration_seconds, "TRANSCRIPTION_QUEUE")
+                    )
 
-            self.conn.commit()
+                conn.commit()
         except Exception as e:
             print("Error creating call:", e)
-            self.conn.rollback()
             return None
         return call_id
 
+    def create_calls(self, calls: list, audio_files: list = None, page_size: int = 1000):
+        """
+        Insert many calls in one transaction.
+        `calls` is a list of (call_id, audio_path, duration_seconds) tuples.
+        `audio_files` optionally records dedupe entries in the same
+        transaction, as (path, content_hash, size_bytes, mtime, call_id,
+        is_duplicate) tuples.
+        """
+        if not calls and not audio_files:
+            return []
+
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    if calls:
+                        execute_values(
+                            cur,
+                            """
+                            INSERT INTO calls (id, audio_path, duration_seconds, status)
+                            VALUES %s
+                            """,
+                            [
+                                (call_id, audio_path, duration_seconds, "TRANSCRIPTION_QUEUE")
+                                for call_id, audio_path, duration_seconds in calls
+                            ],
+                            page_size=page_size
+                        )
+
+                    if audio_files:
+                        execute_values(
+                            cur,
+                            """
+                            INSERT INTO audio_files (
+                                path,
+                                content_hash,
+                                size_bytes,
+                                mtime,
+                                call_id,
+                                is_duplicate
+                            )
+                            VALUES %s
+                            ON CONFLICT (path) DO UPDATE
+                            SET content_hash = EXCLUDED.content_hash,
+                            size_bytes = EXCLUDED.size_bytes,
+                            mtime = EXCLUDED.mtime,
+                            call_id = EXCLUDED.call_id,
+                            is_duplicate = EXCLUDED.is_duplicate
+                            """,
+                            audio_files,
+                            page_size=page_size
+                        )
+
+                conn.commit()
+        except Exception as e:
+            print("Error creating calls:", e)
+            return None
+        return [call[0] for call in calls]
+
     def update_call_status(self, call_id: str, status: str, error_message: str = None):
         try:
-            with self.conn.cursor() as cur:
-                cur.execute(
-                    """
-                    UPDATE calls
-                    SET status = %s,
-                    error_message = %s
-                WHERE id = %s
-                """,
-                (status, error_message, call_id)
-            )
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        UPDATE calls
+                        SET status = %s,
+                        error_message = %s
+                        WHERE id = %s
+                        """,
+                        (status, error_message, call_id)
+                    )
 
-            if cur.rowcount == 0:
-                raise ValueError(f"No call found with id {call_id}")
+                    if cur.rowcount == 0:
+                        raise ValueError(f"No call found with id {call_id}")
 
-            self.conn.commit()
+                conn.commit()
 
         except Exception as e:
             print("Error updating call status:", e)
-            self.conn.rollback()
             return False
 
         return True
 
+    def get_calls_by_status(self, statuses: list) -> list:
+        """
+        Calls currently in one of `statuses`, oldest first, with the content
+        hash of their original audio file (None for calls ingested before
+        the audio_files index).
+        """
+        try:
+            with self._connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT c.id, c.audio_path, c.duration_seconds, c.status, a.content_hash
+                    FROM calls c
+                    LEFT JOIN audio_files a
+                        ON a.call_id = c.id
+                        AND NOT a.is_duplicate
+                    WHERE c.status = ANY(%s)
+                    ORDER BY c.created_at
+                    """,
+                    (list(statuses),)
+                )
+
+                return [
+                    {
+                        "call_id": str(row[0]),
+                        "audio_path": row[1],
+                        "duration_seconds": row[2],
+                        "status": row[3],
+                        "content_hash": row[4]
+                    }
+                    for row in cur.fetchall()
+                ]
+
+        except Exception as e:
+            print("Error fetching calls by status:", e)
+            return None
+
+
+    # -----------
+    # Audio files
+    # -----------
+
+    def get_audio_files(self, paths: list) -> dict:
+        """
+        Look up dedupe entries for the given paths.
+        Returns {path: {"content_hash", "size_bytes", "mtime", "call_id",
+        "is_duplicate"}}.
+        """
+        if not paths:
+            return {}
+
+        try:
+            with self._connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT path, content_hash, size_bytes, mtime, call_id, is_duplicate
+                    FROM audio_files
+                    WHERE path = ANY(%s)
+                    """,
+                    (list(paths),)
+                )
+
+                return {
+                    row[0]: {
+                        "content_hash": row[1],
+                        "size_bytes": row[2],
+                        "mtime": row[3],
+                        "call_id": str(row[4]),
+                        "is_duplicate": row[5]
+                    }
+                    for row in cur.fetchall()
+                }
+
+        except Exception as e:
+            print("Error fetching audio files:", e)
+            return None
+
+    def get_calls_by_path(self, paths: list) -> dict:
+        """
+        Find the first call created for each audio path.
+        Returns {audio_path: call_id}.
+        """
+        if not paths:
+            return {}
+
+        try:
+            with self._connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT DISTINCT ON (audio_path) audio_path, id
+                    FROM calls
+                    WHERE audio_path = ANY(%s)
+                    ORDER BY audio_path, created_at
+                    """,
+                    (list(paths),)
+                )
+
+                return {row[0]: str(row[1]) for row in cur.fetchall()}
+
+        except Exception as e:
+            print("Error fetching calls by path:", e)
+            return None
+
+    def find_calls_by_content(self, keys: list) -> dict:
+        """
+        Find the original call for each (content_hash, size_bytes) key.
+        Returns {(content_hash, size_bytes): call_id}.
+        """
+        if not keys:
+            return {}
+
+        try:
+            with self._connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT DISTINCT ON (a.content_hash, a.size_bytes)
+                        a.content_hash,
+                        a.size_bytes,
+                        a.call_id
+                    FROM audio_files a
+                    JOIN unnest(%s::text[], %s::bigint[]) AS k(content_hash, size_bytes)
+                        ON a.content_hash = k.content_hash
+                        AND a.size_bytes = k.size_bytes
+                    WHERE NOT a.is_duplicate
+                    ORDER BY a.content_hash, a.size_bytes, a.created_at
+                    """,
+                    ([key[0] for key in keys], [key[1] for key in keys])
+                )
+
+                return {(row[0], row[1]): str(row[2]) for row in cur.fetchall()}
+
+        except Exception as e:
+            print("Error fetching calls by content:", e)
+            return None
+
+    # ----------------
+    # Streaming reads
+    # ----------------
+
+    def _iter_keyset(
+        self,
+        from_sql: str,
+        alias: str,
+        selects: list,
+        where: list,
+        params: list,
+        itersize: int,
+        page_size: int,
+        after: tuple
+    ):
+        """
+        Yield rows of `SELECT selects FROM from_sql WHERE where` in
+        (created_at, id) order, with `alias`.created_at and `alias`.id
+        appended as the last two columns.
+
+        Rows are read in keyset pages of `page_size`, each in its own short
+        transaction. A page is read in full (through a named, server-side
+        cursor fetching `itersize` rows per round trip) and its connection
+        returned to the pool before any of its rows are yielded, so a slow
+        consumer never holds a pool connection or a snapshot; memory is
+        bounded by one page.
+        """
+        selects = selects + [f"{alias}.created_at", f"{alias}.id"]
+        key = after
+        while True:
+            conditions = list(where)
+            page_params = list(params)
+            if key is not None:
+                conditions.append(f"({alias}.created_at, {alias}.id) > (%s, %s)")
+                page_params += list(key)
+
+            query = f"SELECT {', '.join(selects)} FROM {from_sql}"
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            query += f" ORDER BY {alias}.created_at, {alias}.id LIMIT %s"
+            page_params.append(page_size)
+
+            with self._connection() as conn:
+                try:
+                    with conn.cursor(name=f"iter_{uuid.uuid4().hex}") as cur:
+                        cur.itersize = itersize
+                        cur.execute(query, page_params)
+                        page = list(cur)
+                finally:
+                    if not conn.closed:
+                        conn.rollback()
+
+            for row in page:
+                key = (row[-2], row[-1])
+                yield row
+
+            if len(page) < page_size:
+                return
+
+    @staticmethod
+    def _resolve_columns(columns, available: dict, default: list) -> list:
+        columns = list(columns or default)
+        unknown = [column for column in columns if column not in available]
+        if unknown:
+            raise ValueError(f"Unknown columns {unknown}, expected some of {sorted(available)}")
+        return columns
+
+    @staticmethod
+    def _date_filters(alias: str, since, until, where: list, params: list):
+        if since is not None:
+            where.append(f"{alias}.created_at >= %s")
+            params.append(since)
+        if until is not None:
+            where.append(f"{alias}.created_at < %s")
+            params.append(until)
+
+    @staticmethod
+    def _in_filter(expression: str, values, where: list, params: list):
+        if values is None:
+            return
+        if isinstance(values, str):
+            values = [values]
+        where.append(f"{expression} = ANY(%s)")
+        params.append(list(values))
 
     # -------------
     # Transcription 
     # -------------
 
+    @staticmethod
+    def _segment_columns(segments: list) -> tuple:
+        starts, ends, texts, extras = pack_segments(segments)
+        return starts, ends, texts, psycopg2.Binary(extras)
+
+    @staticmethod
+    def _segments_from_row(starts, ends, texts, extras, legacy) -> LazySegments:
+        if texts is None and legacy is not None:
+            # Row written before the compact columns and not migrated.
+            return LazySegments(
+                [segment["start"] for segment in legacy],
+                [segment["end"] for segment in legacy],
+                [segment["text"] for segment in legacy],
+                legacy=legacy
+            )
+        return LazySegments(starts, ends, texts, extras, legacy)
+
     def save_transcript(
         self,
         call_id: str,
@@ -90,51 +505,121 @@ class PostgresClient:
     ):
         try:
             print("Saving transcript to database")
-            with self.conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO transcripts (
-                        id,
-                        call_id,
-                    model_name,
-                    language,
-                    transcript_text,
-                    segments,
-                    timestamped_text
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """,
-                (
-                    transcript_id,
-                    call_id,
-                    model_name,
-                    language,
-                    transcript_text,
-                    json.dumps(segments),
-                    timestamped_text
-                )
-            )
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        INSERT INTO transcripts (
+                            id,
+                            call_id,
+                            model_name,
+                            language,
+                            transcript_text,
+                            segment_starts,
+                            segment_ends,
+                            segment_texts,
+                            segment_extras,
+                            timestamped_text
+                        )
+                        VALUES (%s, %s, %s, %s, %s, %s::real[], %s::real[], %s::text[], %s, %s)
+                        """,
+                        (
+                            transcript_id,
+                            call_id,
+                            model_name,
+                            language,
+                            transcript_text,
+                            *self._segment_columns(segments),
+                            timestamped_text
+                        )
+                    )
 
-            self.conn.commit()
+                conn.commit()
             print("Transcript saved to database")
         except Exception as e:
             print("Error saving transcript:", e)
-            self.conn.rollback()
+            return None
+        return transcript_id
+
+
+    def complete_transcription(
+        self,
+        call_id: str,
+        transcript_id: str,
+        transcript_text: str,
+        segments: list,
+        timestamped_text: str,
+        model_name: str = "whisper-base",
+        language: str = "en",
+        next_status: str = "EVALUATION_QUEUE"
+    ):
+        """
+        Insert the transcript and move the call to `next_status` in a single
+        statement, so both writes share one round trip and one commit.
+        """
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        WITH inserted AS (
+                            INSERT INTO transcripts (
+                                id,
+                                call_id,
+                                model_name,
+                                language,
+                                transcript_text,
+                                segment_starts,
+                                segment_ends,
+                                segment_texts,
+                                segment_extras,
+                                timestamped_text
+                            )
+                            VALUES (%s, %s, %s, %s, %s, %s::real[], %s::real[], %s::text[], %s, %s)
+                            RETURNING call_id
+                        )
+                        UPDATE calls
+                        SET status = %s,
+                        error_message = NULL
+                        WHERE id = (SELECT call_id FROM inserted)
+                        """,
+                        (
+                            transcript_id,
+                            call_id,
+                            model_name,
+                            language,
+                            transcript_text,
+                            *self._segment_columns(segments),
+                            timestamped_text,
+                            next_status
+                        )
+                    )
+
+                    if cur.rowcount == 0:
+                        raise ValueError(f"No call found with id {call_id}")
+
+                conn.commit()
+        except Exception as e:
+            print("Error completing transcription:", e)
             return None
         return transcript_id
 
 
     def get_transcript_by_call_id(self, call_id: str):
         try:
-            with self.conn.cursor() as cur:
+            with self._connection() as conn, conn.cursor() as cur:
                 cur.execute(
                     """
                     SELECT
                         id,
                         call_id,
                         transcript_text,
-                        segments,
-                        timestamped_text
+                        timestamped_text,
+                        segment_starts,
+                        segment_ends,
+                        segment_texts,
+                        segment_extras,
+                        segments
                     FROM transcripts
                     WHERE call_id = %s
                     """,
@@ -149,27 +634,38 @@ class PostgresClient:
                     "id": row[0],
                     "call_id": row[1],
                     "transcript_text": row[2],
-                    "segments": row[3],
-                    "timestamped_text": row[4]
+                    "segments": self._segments_from_row(*row[4:9]),
+                    "timestamped_text": row[3]
                 }
 
         except Exception as e:
             print("Error fetching transcript:", e)
-            self.conn.rollback()
             return None
 
-    def get_transcripts(self):
+    def get_transcripts(self, include_segment_details: bool = False):
+        """
+        All transcripts. Segments carry only id/start/end/text unless
+        `include_segment_details` is set, which also fetches the packed
+        tokens and confidence fields.
+        """
+        details = (
+            "segment_extras, segments" if include_segment_details
+            else "NULL, CASE WHEN segment_texts IS NULL THEN segments END"
+        )
         try:
-            with self.conn.cursor() as cur:
+            with self._connection() as conn, conn.cursor() as cur:
                 cur.execute(
-                    """
+                    f"""
                     SELECT
                         id,
                         call_id,
                         transcript_text,
-                        segments,
                         timestamped_text,
-                        human_transcript
+                        human_transcript,
+                        segment_starts,
+                        segment_ends,
+                        segment_texts,
+                        {details}
                     FROM transcripts
                     """
                 )
@@ -183,18 +679,94 @@ class PostgresClient:
                         "id": row[0],
                         "call_id": row[1],
                         "transcript_text": row[2],
-                        "segments": row[3],
-                        "timestamped_text": row[4],
-                        "human_transcript": row[5]
+                        "segments": self._segments_from_row(*row[5:10]),
+                        "timestamped_text": row[3],
+                        "human_transcript": row[4]
                     }
                 for row in rows
                 ]
 
         except Exception as e:
             print("Error fetching transcript:", e)
-            self.conn.rollback()
             return None
 
+    TRANSCRIPT_COLUMNS = {
+        "id": "t.id",
+        "call_id": "t.call_id",
+        "model_name": "t.model_name",
+        "language": "t.language",
+        "transcript_text": "t.transcript_text",
+        "timestamped_text": "t.timestamped_text",
+        "human_transcript": "t.human_transcript",
+        "segments": None,
+        "created_at": "t.created_at",
+        "status": "c.status",
+        "audio_path": "c.audio_path",
+        "duration_seconds": "c.duration_seconds"
+    }
+
+    def iter_transcripts(
+        self,
+        columns: list = None,
+        since=None,
+        until=None,
+        status=None,
+        has_human_transcript: bool = None,
+        include_segment_details: bool = False,
+        itersize: int = 2000,
+        page_size: int = 5000,
+        after: tuple = None
+    ):
+        """
+        Stream transcripts as dicts, oldest first, without loading the table.
+
+        `columns` picks keys from TRANSCRIPT_COLUMNS (default: id, call_id,
+        transcript_text, timestamped_text, created_at). Filters: created_at in
+        [since, until), call `status` (one or a list) and whether a
+        human_transcript exists. `after=(created_at, id)` resumes after a
+        previously seen row.
+        """
+        columns = self._resolve_columns(
+            columns,
+            self.TRANSCRIPT_COLUMNS,
+            ["id", "call_id", "transcript_text", "timestamped_text", "created_at"]
+        )
+
+        selects = []
+        for column in columns:
+            if column == "segments":
+                details = (
+                    ["t.segment_extras", "t.segments"] if include_segment_details
+                    else ["NULL", "CASE WHEN t.segment_texts IS NULL THEN t.segments END"]
+                )
+                selects += ["t.segment_starts", "t.segment_ends", "t.segment_texts", *details]
+            else:
+                selects.append(self.TRANSCRIPT_COLUMNS[column])
+
+        where, params = [], []
+        self._date_filters("t", since, until, where, params)
+        self._in_filter("c.status", status, where, params)
+        if has_human_transcript is not None:
+            where.append(f"t.human_transcript IS {'NOT ' if has_human_transcript else ''}NULL")
+
+        try:
+            for row in self._iter_keyset(
+                "transcripts t JOIN calls c ON c.id = t.call_id",
+                "t", selects, where, params, itersize, page_size, after
+            ):
+                record, position = {}, 0
+                for column in columns:
+                    if column == "segments":
+                        record[column] = self._segments_from_row(*row[position:position + 5])
+                        position += 5
+                    else:
+                        record[column] = row[position]
+                        position += 1
+                yield record
+        except Exception as e:
+            print("Error streaming transcripts:", e)
+            raise
+
     # ----------
     # Evaluation 
     # ----------
@@ -212,45 +784,110 @@ class PostgresClient:
     ):
         evaluation_id = str(uuid.uuid4())
         try:
-            with self.conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO evaluations (
-                        id,
-                    call_id,
-                    evaluator_type,
-                    evaluator_version,
-                    overall_score,
-                    category_scores,
-                    strengths,
-                    improvements,
-                    raw_output
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """,
-                (
-                    evaluation_id,
-                    call_id,
-                    evaluator_type,
-                    evaluator_version,
-                    overall_score,
-                    json.dumps(category_scores),
-                    json.dumps(strengths),
-                    json.dumps(improvements),
-                    json.dumps(raw_output)
-                )
-            )
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        INSERT INTO evaluations (
+                            id,
+                            call_id,
+                            evaluator_type,
+                            evaluator_version,
+                            overall_score,
+                            category_scores,
+                            strengths,
+                            improvements,
+                            raw_output
+                        )
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                        """,
+                        (
+                            evaluation_id,
+                            call_id,
+                            evaluator_type,
+                            evaluator_version,
+                            overall_score,
+                            json.dumps(category_scores),
+                            json.dumps(strengths),
+                            json.dumps(improvements),
+                            json.dumps(raw_output)
+                        )
+                    )
 
-            self.conn.commit()
+                conn.commit()
         except Exception as e:
             print("Error saving evaluation:", e)
-            self.conn.rollback()
+            return None
+        return evaluation_id
+
+    def complete_evaluation(
+        self,
+        call_id: str,
+        evaluator_type: str,
+        evaluator_version: str,
+        overall_score: int,
+        category_scores: dict,
+        strengths: list,
+        improvements: list,
+        raw_output: dict,
+        next_status: str = "EVALUATED"
+    ):
+        """
+        Insert the evaluation and move the call to `next_status` in a single
+        statement, so both writes share one round trip and one commit.
+        """
+        evaluation_id = str(uuid.uuid4())
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        WITH inserted AS (
+                            INSERT INTO evaluations (
+                                id,
+                                call_id,
+                                evaluator_type,
+                                evaluator_version,
+                                overall_score,
+                                category_scores,
+                                strengths,
+                                improvements,
+                                raw_output
+                            )
+                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                            RETURNING call_id
+                        )
+                        UPDATE calls
+                        SET status = %s,
+                        error_message = NULL
+                        WHERE id = (SELECT call_id FROM inserted)
+                        """,
+                        (
+                            evaluation_id,
+                            call_id,
+                            evaluator_type,
+                            evaluator_version,
+                            overall_score,
+                            json.dumps(category_scores),
+                            json.dumps(strengths),
+                            json.dumps(improvements),
+                            json.dumps(raw_output),
+                            next_status
+                        )
+                    )
+
+                    if cur.rowcount == 0:
+                        raise ValueError(f"No call found with id {call_id}")
+
+                conn.commit()
+        except Exception as e:
+            print("Error completing evaluation:", e)
             return None
         return evaluation_id
 
     def get_evaluations(self):
         try:
-            with self.conn.cursor() as cur:
+            with self._connection() as conn, conn.cursor() as cur:
                 cur.execute(
                     """
                     SELECT
@@ -294,6 +931,161 @@ class PostgresClient:
             print("Error fetching evaluation:", e)
             return None
 
+    EVALUATION_COLUMNS = {
+        "id": "e.id",
+        "call_id": "e.call_id",
+        "evaluator_type": "e.evaluator_type",
+        "evaluator_version": "e.evaluator_version",
+        "overall_score": "e.overall_score",
+        "category_scores": "e.category_scores",
+        "strengths": "e.strengths",
+        "improvements": "e.improvements",
+        "raw_output": "e.raw_output",
+        "human_output": "e.human_output",
+        "created_at": "e.created_at",
+        "status": "c.status",
+        "audio_path": "c.audio_path",
+        "duration_seconds": "c.duration_seconds"
+    }
+
+    def iter_evaluations(
+        self,
+        columns: list = None,
+        since=None,
+        until=None,
+        status=None,
+        evaluator_version=None,
+        has_human_output: bool = None,
+        itersize: int = 2000,
+        page_size: int = 5000,
+        after: tuple = None
+    ):
+        """
+        Stream evaluations as dicts, oldest first, without loading the table.
+
+        `columns` picks keys from EVALUATION_COLUMNS (default: id, call_id,
+        evaluator_version, overall_score, category_scores, created_at).
+        Filters: created_at in [since, until), call `status` and
+        `evaluator_version` (one or a list each), and whether human_output
+        exists. `after=(created_at, id)` resumes after a previously seen row.
+        """
+        columns = self._resolve_columns(
+            columns,
+            self.EVALUATION_COLUMNS,
+            ["id", "call_id", "evaluator_version", "overall_score", "category_scores", "created_at"]
+        )
+        selects = [self.EVALUATION_COLUMNS[column] for column in columns]
+
+        where, params = [], []
+        self._date_filters("e", since, until, where, params)
+        self._in_filter("c.status", status, where, params)
+        self._in_filter("e.evaluator_version", evaluator_version, where, params)
+        if has_human_output is not None:
+            where.append(f"e.human_output IS {'NOT ' if has_human_output else ''}NULL")
+
+        try:
+            for row in self._iter_keyset(
+                "evaluations e JOIN calls c ON c.id = e.call_id",
+                "e", selects, where, params, itersize, page_size, after
+            ):
+                yield dict(zip(columns, row))
+        except Exception as e:
+            print("Error streaming evaluations:", e)
+            raise
+
+    # ------------
+    # Result cache
+    # ------------
+
+    def cache_get(self, namespace: str, cache_key: str, max_age_seconds: float = None):
+        """
+        Return the cached payload and mark it as recently used, or None.
+        Entries older than `max_age_seconds` are treated as missing.
+        """
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        UPDATE result_cache
+                        SET last_used_at = now()
+                        WHERE namespace = %s
+                        AND cache_key = %s
+                        AND (%s::float IS NULL OR created_at > now() - %s::float * interval '1 second')
+                        RETURNING payload
+                        """,
+                        (namespace, cache_key, max_age_seconds, max_age_seconds)
+                    )
+                    row = cur.fetchone()
+
+                conn.commit()
+                return row[0] if row else None
+
+        except Exception as e:
+            print("Error reading result cache:", e)
+            return None
+
+    def cache_put(self, namespace: str, cache_key: str, payload: dict):
+        body = json.dumps(payload)
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        INSERT INTO result_cache (namespace, cache_key, payload, size_bytes)
+                        VALUES (%s, %s, %s, %s)
+                        ON CONFLICT (namespace, cache_key) DO UPDATE
+                        SET payload = EXCLUDED.payload,
+                        size_bytes = EXCLUDED.size_bytes,
+                        created_at = now(),
+                        last_used_at = now()
+                        """,
+                        (namespace, cache_key, body, len(body))
+                    )
+
+                conn.commit()
+        except Exception as e:
+            print("Error writing result cache:", e)
+            return False
+        return True
+
+    def cache_evict(self, namespace: str, max_bytes: int = None, max_age_seconds: float = None) -> int:
+        """
+        Drop expired entries and, beyond `max_bytes`, the least recently
+        used ones. Returns the number of rows removed.
+        """
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        DELETE FROM result_cache
+                        WHERE namespace = %s
+                        AND cache_key IN (
+                            SELECT cache_key
+                            FROM (
+                                SELECT
+                                    cache_key,
+                                    created_at,
+                                    SUM(size_bytes) OVER (ORDER BY last_used_at DESC, cache_key) AS running_bytes
+                                FROM result_cache
+                                WHERE namespace = %s
+                            ) ranked
+                            WHERE (%s::bigint IS NOT NULL AND running_bytes > %s::bigint)
+                            OR (%s::float IS NOT NULL AND created_at < now() - %s::float * interval '1 second')
+                        )
+                        """,
+                        (namespace, namespace, max_bytes, max_bytes, max_age_seconds, max_age_seconds)
+                    )
+                    removed = cur.rowcount
+
+                conn.commit()
+                return removed
+
+        except Exception as e:
+            print("Error evicting result cache:", e)
+            return 0
+
     # -------
     # Prompts 
     # -------
@@ -301,7 +1093,7 @@ class PostgresClient:
     def get_active_prompt(self, name: str) -> dict:
 
         try:
-            with self.conn.cursor() as cur:
+            with self._connection() as conn, conn.cursor() as cur:
                 cur.execute(
                     """
                     SELECT name, version, content
@@ -324,5 +1116,4 @@ class PostgresClient:
 
         except Exception as e:
             print("Error fetching transcript:", e)
-            self.conn.rollback()
-            return None
\ No newline at end of file
+            return None
@@ -1,6 +1,26 @@
+import asyncio
 import json
+import os
+import time
+import threading
+import multiprocessing
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import pika
-from typing import Callable, Any
+from pika.adapters.asyncio_connection import AsyncioConnection
+from pika.exceptions import AMQPConnectionError, AMQPChannelError, NackError
+from typing import Awaitable, Callable, Any, Iterable, Union
+from src.services import metrics
+
+ATTEMPT_HEADER = "x-attempt"
+# Unix time at which a message became available to consumers.
+PUBLISHED_HEADER = "x-published-at"
+FAILED_QUEUE = "failed_jobs"
+
+PUBLISHED = metrics.counter("mq_published_total", "Messages published.", ("queue",))
+CONSUMED = metrics.counter("mq_messages_total", "Messages consumed, by outcome.", ("queue", "outcome"))
+QUEUE_WAIT = metrics.histogram("mq_queue_wait_seconds", "Time messages spent waiting in the queue.", ("queue",))
+IN_FLIGHT = metrics.gauge("mq_in_flight", "Messages received and not yet settled.", ("queue",))
 
 
 class RabbitMQClient:
@@ -12,10 +32,18 @@ class RabbitMQClient:
         password: str = "admin123",
         heartbeat: int = 600,
         blocked_connection_timeout: int = 300,
+        publish_batch_size: int = 500,
+        retry_delays: Iterable[float] = None,
     ):
         self.host = host
         self.port = port
         self.credentials = pika.PlainCredentials(username, password)
+        self.publish_batch_size = publish_batch_size
+        # Seconds to wait before each retry of a failed message; a message
+        # gets len(retry_delays) + 1 attempts in total.
+        if retry_delays is None:
+            retry_delays = [float(d) for d in os.getenv("MQ_RETRY_DELAYS", "5,30,120").split(",") if d.strip()]
+        self.retry_delays = tuple(retry_delays)
 
         self.connection_params = pika.ConnectionParameters(
             host=self.host,
@@ -25,9 +53,77 @@ class RabbitMQClient:
             blocked_connection_timeout=blocked_connection_timeout,
         )
 
+        # pika connections are not thread-safe, so every publishing thread
+        # keeps its own long-lived connection and channel.
+        self._publisher = threading.local()
+
     def _connect(self) -> pika.BlockingConnection:
         return pika.BlockingConnection(self.connection_params)
 
+    # ---------
+    # Publisher
+    # ---------
+
+    def _publisher_channel(self, transactional: bool = False):
+        """
+        Return this thread's publisher channel, (re)connecting if needed.
+
+        The confirm channel is used for single publishes, the transactional
+        channel for batches. AMQP does not allow both modes on one channel.
+        """
+        state = self._publisher
+        connection = getattr(state, "connection", None)
+
+        if connection is None or connection.is_closed:
+            state.connection = self._connect()
+            state.confirm_channel = None
+            state.tx_channel = None
+            state.declared_queues = set()
+
+        attr = "tx_channel" if transactional else "confirm_channel"
+        channel = getattr(state, attr)
+
+        if channel is None or channel.is_closed:
+            channel = state.connection.channel()
+            if transactional:
+                channel.tx_select()
+            else:
+                channel.confirm_delivery()
+            setattr(state, attr, channel)
+
+        return channel
+
+    def _declare_queue(self, channel, queue_name: str) -> None:
+        # Declaring is idempotent but costs a round trip, so only do it once
+        # per queue for the lifetime of the publisher connection.
+        declared = self._publisher.declared_queues
+        if queue_name in declared:
+            return
+        channel.queue_declare(queue=queue_name, durable=True)
+        declared.add(queue_name)
+
+    def _reset_publisher(self) -> None:
+        state = self._publisher
+        connection = getattr(state, "connection", None)
+        if connection is not None and connection.is_open:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        state.connection = None
+
+    def _with_publisher(self, fn: Callable, transactional: bool = False):
+        """
+        Run fn(channel) on the publisher channel, reconnecting once if the
+        broker dropped the connection (e.g. missed heartbeats while idle).
+        """
+        try:
+            return fn(self._publisher_channel(transactional))
+        except (AMQPConnectionError, AMQPChannelError) as e:
+            print(f"Publisher connection lost ({e!r}), reconnecting...")
+            self._reset_publisher()
+            return fn(self._publisher_channel(transactional))
+
     def publish(
         self,
         queue_name: str,
@@ -36,59 +132,641 @@ class RabbitMQClient:
     ) -> None:
         """
         Publish a JSON-serializable message to a durable queue.
+        Blocks until the broker confirms the message.
         """
-        connection = self._connect()
-        channel = connection.channel()
+        properties = pika.BasicProperties(
+            delivery_mode=2 if persistent else 1,  # 2 = persistent
+            headers={PUBLISHED_HEADER: time.time()}
+        )
+        body = json.dumps(message)
 
-        channel.queue_declare(queue=queue_name, durable=True)
+        def _publish(channel):
+            self._declare_queue(channel, queue_name)
+            channel.basic_publish(
+                exchange="",
+                routing_key=queue_name,
+                body=body,
+                properties=properties,
+            )
 
-        body = json.dumps(message)
+        self._with_publisher(_publish)
+        PUBLISHED.inc(queue=queue_name)
 
-        properties = pika.BasicProperties(
-            delivery_mode=2 if persistent else 1  # 2 = persistent
-        )
+    def publish_many(
+        self,
+        queue_name: str,
+        messages: Iterable[dict],
+        persistent: bool = True,
+        batch_size: int = None,
+    ) -> int:
+        """
+        Publish many messages to a durable queue.
 
-        channel.basic_publish(
-            exchange="",
-            routing_key=queue_name,
-            body=body,
-            properties=properties,
-        )
+        Messages are sent in batches of `batch_size`; the broker acknowledges
+        each batch with a single tx.commit round trip instead of one confirm
+        per message. Returns the number of messages published.
+        """
+        batch_size = batch_size or self.publish_batch_size
+
+        def _publish_batch(bodies):
+            properties = pika.BasicProperties(
+                delivery_mode=2 if persistent else 1,
+                headers={PUBLISHED_HEADER: time.time()}
+            )
+
+            def _send(channel):
+                self._declare_queue(channel, queue_name)
+                for body in bodies:
+                    channel.basic_publish(
+                        exchange="",
+                        routing_key=queue_name,
+                        body=body,
+                        properties=properties,
+                    )
+                channel.tx_commit()
+            self._with_publisher(_send, transactional=True)
+            PUBLISHED.inc(len(bodies), queue=queue_name)
+
+        published = 0
+        batch = []
+        for message in messages:
+            batch.append(json.dumps(message))
+            if len(batch) >= batch_size:
+                _publish_batch(batch)
+                published += len(batch)
+                batch = []
 
-        connection.close()
+        if batch:
+            _publish_batch(batch)
+            published += len(batch)
+
+        return published
+
+    def close(self) -> None:
+        """
+        Close the calling thread's publisher connection.
+        """
+        self._reset_publisher()
+
+    # --------
+    # Consumer
+    # --------
 
     def consume(
         self,
-        queue_name: str,
+        queue_name: Union[str, list],
         callback: Callable[[dict], Any],
         prefetch_count: int = 1,
+        concurrency: int = 1,
+        executor: str = "thread",
+        initializer: Callable = None,
+        initargs: tuple = (),
+        on_failure: Callable[[dict, Exception], Any] = None,
     ) -> None:
         """
         Start consuming messages from a queue.
         The callback must accept a single dict argument.
+
+        With concurrency > 1 the callback runs on a pool of `concurrency`
+        threads (executor="thread") or processes (executor="process") while
+        the pika I/O thread keeps serving heartbeats. Prefetch is raised to
+        the pool size and acks are handed back to the I/O thread via
+        add_callback_threadsafe. Process pools use the spawn start method, so
+        the callback, initializer and initargs must be picklable.
+
+        `queue_name` may be a list of queues, all served by the same
+        callback; prefetch then applies to the channel as a whole.
+
+        A message whose callback raises is retried through the delay queues
+        (see `retry_delays`) and handed to `on_failure` after the last
+        attempt; either way the worker moves on at once.
         """
+        queue_names = [queue_name] if isinstance(queue_name, str) else list(queue_name)
 
-        def _on_message(channel, method, properties, body):
-            try:
-                message = json.loads(body)
-                callback(message)
-                channel.basic_ack(delivery_tag=method.delivery_tag)
-            except Exception as e:
-                print(f"Error processing message: {e}")
-                # channel.basic_nack(
-                #     delivery_tag=method.delivery_tag, requeue=True
-                # )
+        connection = self._connect()
+        channel = self._consumer_channel(connection)
+
+        for name in queue_names:
+            channel.queue_declare(queue=name, durable=True)
+            self._declare_retry_queues(channel, name)
+
+        pool = None
+        if concurrency > 1:
+            pool = self._make_pool(executor, concurrency, initializer, initargs)
+            prefetch_count = max(prefetch_count, concurrency)
+            handler = partial(self._dispatch_message, connection, pool, callback)
+        else:
+            handler = partial(self._handle_message, callback)
+
+        channel.basic_qos(prefetch_count=prefetch_count, global_qos=len(queue_names) > 1)
+
+        for name in queue_names:
+            channel.basic_consume(
+                queue=name,
+                on_message_callback=partial(handler, name, on_failure),
+            )
 
+        mode = f"{concurrency} {executor} workers" if pool else "inline"
+        print(f"Consuming messages from {', '.join(map(repr, queue_names))} ({mode})...")
+        try:
+            channel.start_consuming()
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    def consume_batches(
+        self,
+        queue_name: str,
+        callback: Callable[[list], Any],
+        batch_size: int = 8,
+        max_wait: float = 2.0,
+        on_failure: Callable[[dict, Exception], Any] = None,
+    ) -> None:
+        """
+        Consume messages in batches.
+
+        The callback receives a list of up to `batch_size` dicts. A batch is
+        dispatched when it is full or `max_wait` seconds after its first
+        message arrived, whichever comes first. The callback may return
+        (message, error) pairs for the messages that failed; those are
+        retried individually and the rest acked. If it raises, the whole
+        batch is retried.
+        """
         connection = self._connect()
-        channel = connection.channel()
+        channel = self._consumer_channel(connection)
 
         channel.queue_declare(queue=queue_name, durable=True)
-        channel.basic_qos(prefetch_count=prefetch_count)
+        self._declare_retry_queues(channel, queue_name)
+        channel.basic_qos(prefetch_count=batch_size)
+
+        print(f"Consuming batches of up to {batch_size} from '{queue_name}'...")
+
+        batch = []
+        deadline = None
+        for method, properties, body in channel.consume(queue_name, inactivity_timeout=0.1):
+            if method is not None:
+                delivery = self._decode(channel, queue_name, method, properties, body)
+                if delivery is None:
+                    continue
+                batch.append(delivery)
+
+                if deadline is None:
+                    deadline = time.monotonic() + max_wait
+
+            if batch and (len(batch) >= batch_size or time.monotonic() >= deadline):
+                self._run_batch(channel, callback, batch, on_failure)
+                batch = []
+                deadline = None
+
+    def consume_weighted(
+        self,
+        queue_weights: dict,
+        callback: Callable[[list], Any],
+        batch_size: int = 1,
+        poll_interval: float = 0.5,
+        on_failure: Callable[[dict, Exception], Any] = None,
+    ) -> None:
+        """
+        Consume from several queues in proportion to their weights.
+
+        Messages are pulled with basic_get instead of pushed, so the worker
+        holds nothing it is not about to process and every pick can choose
+        its queue. Picks follow smooth weighted round-robin: with weights
+        {"a": 3, "b": 1} three messages come from `a` for each one from `b`
+        while both have work, and an empty queue passes its turn on (without
+        banking it). The callback receives a list of up to `batch_size`
+        dicts; failures are handled as in consume_batches.
+        """
+        connection = self._connect()
+        channel = self._consumer_channel(connection)
+
+        for name in queue_weights:
+            channel.queue_declare(queue=name, durable=True)
+            self._declare_retry_queues(channel, name)
+
+        total = sum(queue_weights.values())
+        credit = dict.fromkeys(queue_weights, 0)
+        lanes = ", ".join(f"'{name}' x{weight}" for name, weight in queue_weights.items())
+        print(f"Consuming batches of up to {batch_size} from {lanes}...")
+
+        while True:
+            batch = []
+            while len(batch) < batch_size:
+                for name, weight in queue_weights.items():
+                    credit[name] += weight
 
-        channel.basic_consume(
-            queue=queue_name,
-            on_message_callback=_on_message,
+                # Empty queues sit the round out, so they neither bank nor
+                # owe credit when work shows up again.
+                idle = 0
+                for name in sorted(credit, key=credit.get, reverse=True):
+                    method, properties, body = channel.basic_get(queue=name)
+                    if method is not None:
+                        break
+                    credit[name] = 0
+                    idle += queue_weights[name]
+                else:
+                    credit = dict.fromkeys(queue_weights, 0)
+                    break
+
+                credit[name] -= total - idle
+                delivery = self._decode(channel, name, method, properties, body)
+                if delivery is not None:
+                    batch.append(delivery)
+
+            if batch:
+                self._run_batch(channel, callback, batch, on_failure)
+            else:
+                # Also services heartbeats while idle.
+                connection.sleep(poll_interval)
+
+    async def consume_async(
+        self,
+        queue_name: str,
+        callback: Callable[[dict], Awaitable[Any]],
+        prefetch_count: int = 32,
+        on_failure: Callable[[dict, Exception], Any] = None,
+    ) -> None:
+        """
+        Consume messages on the running asyncio loop.
+
+        Every delivery is handed to `await callback(message)` in its own
+        task, so up to `prefetch_count` messages are in flight at once; the
+        callback is expected to bound its own concurrency. Failed messages
+        are retried as in consume, and the blocking `on_failure` runs in a
+        worker thread. Returns (or raises) when the connection closes.
+        """
+        loop = asyncio.get_running_loop()
+        closed = loop.create_future()
+        tasks = set()
+        confirms = _AsyncConfirms(loop)
+
+        # Delay queues are declared up front on a short-lived blocking
+        # connection rather than through the async callback chain.
+        await asyncio.to_thread(self.declare_queues, [queue_name])
+
+        def on_message(channel, method, properties, body):
+            task = loop.create_task(
+                self._handle_message_async(callback, queue_name, on_failure, confirms, channel, method, properties, body)
+            )
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        def on_qos(channel):
+            channel.basic_consume(queue=queue_name, on_message_callback=on_message)
+            print(f"Consuming messages from '{queue_name}' (async, prefetch {prefetch_count})...")
+
+        def on_channel_closed(channel, reason):
+            confirms.fail_all(AMQPChannelError(reason))
+            # Without a channel there is nothing left to consume from.
+            if connection.is_open:
+                connection.close()
+
+        def on_channel_open(channel):
+            channel.add_on_close_callback(on_channel_closed)
+            # Retry copies must be confirmed before the original is acked.
+            channel.confirm_delivery(confirms.on_confirm)
+            channel.basic_qos(
+                prefetch_count=prefetch_count,
+                callback=lambda _: on_qos(channel),
+            )
+
+        def on_open_error(_, error):
+            if not closed.done():
+                closed.set_exception(AMQPConnectionError(error))
+
+        def on_close(_, reason):
+            if not closed.done():
+                closed.set_result(reason)
+
+        connection = AsyncioConnection(
+            self.connection_params,
+            on_open_callback=lambda conn: conn.channel(on_open_callback=on_channel_open),
+            on_open_error_callback=on_open_error,
+            on_close_callback=on_close,
+            custom_ioloop=loop,
+        )
+
+        try:
+            reason = await closed
+            print(f"Consumer connection closed: {reason!r}")
+        finally:
+            if connection.is_open:
+                connection.close()
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    # ----------------
+    # Message handling
+    # ----------------
+
+    def _handle_message(self, callback, queue_name, on_failure, channel, method, properties, body):
+        delivery = self._decode(channel, queue_name, method, properties, body)
+        if delivery is None:
+            return
+        error = None
+        try:
+            callback(delivery[-1])
+        except Exception as e:
+            print(f"Error processing message: {e}")
+            error = e
+        self._finish(delivery, error, on_failure)
+        self._settle(channel, delivery, error)
+
+    async def _handle_message_async(self, callback, queue_name, on_failure, confirms, channel, method, properties, body):
+        delivery = self._decode(channel, queue_name, method, properties, body)
+        if delivery is None:
+            return
+        error = None
+        try:
+            await callback(delivery[-1])
+        except Exception as e:
+            print(f"Error processing message: {e}")
+            error = e
+        await asyncio.to_thread(self._finish, delivery, error, on_failure)
+        await self._settle_async(channel, confirms, delivery, error)
+
+    def _run_batch(self, channel, callback, batch, on_failure):
+        try:
+            failures = callback([message for *_, message in batch]) or ()
+            errors = {id(message): error for message, error in failures}
+        except Exception as e:
+            print(f"Error processing batch: {e}")
+            errors = {id(message): e for *_, message in batch}
+
+        for delivery in batch:
+            error = errors.get(id(delivery[-1]))
+            self._finish(delivery, error, on_failure)
+            self._settle(channel, delivery, error)
+
+    def _dispatch_message(self, connection, pool, callback, queue_name, on_failure, channel, method, properties, body):
+        delivery = self._decode(channel, queue_name, method, properties, body)
+        if delivery is None:
+            return
+
+        future = pool.submit(callback, delivery[-1])
+        future.add_done_callback(
+            partial(self._on_job_done, connection, channel, delivery, on_failure)
+        )
+
+    def _on_job_done(self, connection, channel, delivery, on_failure, future):
+        # Runs on a pool thread: never touch the channel directly from here.
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            print(f"Error processing message: {error}")
+        # The failure handler does blocking I/O, so it runs here rather
+        # than on the I/O thread.
+        self._finish(delivery, error, on_failure)
+        try:
+            connection.add_callback_threadsafe(
+                partial(self._settle, channel, delivery, error)
+            )
+        except Exception as e:
+            # Connection already closed; the broker will redeliver.
+            print(f"Could not settle message {delivery[1].delivery_tag}: {e}")
+
+    @staticmethod
+    def _decode(channel, queue_name, method, properties, body):
+        """
+        Returns the delivery as (queue_name, method, properties, body,
+        message), or None after dropping a message that is not valid JSON.
+        """
+        try:
+            message = json.loads(body)
+        except Exception as e:
+            print(f"Dropping undecodable message: {e}")
+            channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            CONSUMED.inc(queue=queue_name, outcome="dropped")
+            return None
+
+        IN_FLIGHT.inc(queue=queue_name)
+        published_at = ((properties.headers if properties else None) or {}).get(PUBLISHED_HEADER)
+        if published_at is not None:
+            wait = max(time.time() - published_at, 0.0)
+            QUEUE_WAIT.observe(wait, queue=queue_name)
+            trace_id = message.get("trace_id") if isinstance(message, dict) else None
+            metrics.trace_event("queue_wait", wait, trace_id, queue=queue_name)
+        return queue_name, method, properties, body, message
+
+    @staticmethod
+    def _make_pool(executor: str, size: int, initializer: Callable, initargs: tuple):
+        if executor == "thread":
+            return ThreadPoolExecutor(
+                max_workers=size,
+                initializer=initializer,
+                initargs=initargs,
+            )
+        if executor == "process":
+            return ProcessPoolExecutor(
+                max_workers=size,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=initializer,
+                initargs=initargs,
+            )
+        raise ValueError(f"Unknown executor '{executor}', expected 'thread' or 'process'")
+
+    # -----
+    # Retry
+    # -----
+
+    @staticmethod
+    def attempt_of(properties) -> int:
+        """
+        1-based attempt number of a delivery, from its x-attempt header.
+        """
+        headers = (properties.headers if properties else None) or {}
+        return int(headers.get(ATTEMPT_HEADER, 1))
+
+    @staticmethod
+    def retry_queue_name(queue_name: str, delay: float) -> str:
+        return f"{queue_name}.retry.{delay:g}s"
+
+    def _declare_retry_queues(self, channel, queue_name: str) -> None:
+        # Messages wait out their TTL in the delay queue, then the broker
+        # dead-letters them back onto the work queue. Named by delay, so a
+        # changed schedule declares new queues instead of clashing with the
+        # TTL of existing ones.
+        for delay in set(self.retry_delays):
+            channel.queue_declare(
+                queue=self.retry_queue_name(queue_name, delay),
+                durable=True,
+                arguments={
+                    "x-message-ttl": int(delay * 1000),
+                    "x-dead-letter-exchange": "",
+                    "x-dead-letter-routing-key": queue_name,
+                },
+            )
+
+    def declare_queues(self, queue_names: list) -> None:
+        """
+        Declare work queues and their delay queues on a short-lived
+        connection.
+        """
+        connection = self._connect()
+        try:
+            channel = connection.channel()
+            for name in queue_names:
+                channel.queue_declare(queue=name, durable=True)
+                self._declare_retry_queues(channel, name)
+        finally:
+            connection.close()
+
+    def _finish(self, delivery, error, on_failure) -> None:
+        """
+        Run the failure handler for a message that failed its last attempt.
+        """
+        _, _, properties, _, message = delivery
+        attempt = self.attempt_of(properties)
+        if error is None or attempt <= len(self.retry_delays):
+            return
+
+        print(f"Giving up after {attempt} attempts: {error}")
+        try:
+            (on_failure or self.publish_failed)(message, error)
+        except Exception as e:
+            print(f"Failure handler raised: {e}")
+
+    def _consumer_channel(self, connection: pika.BlockingConnection):
+        # In confirm mode basic_publish blocks until the broker has the
+        # message, so a retry copy is never lost behind an ack.
+        channel = connection.channel()
+        channel.confirm_delivery()
+        return channel
+
+    def _retry_copy(self, delivery, error):
+        """
+        (delay queue, properties) for re-publishing a failed delivery that
+        has attempts left, or None.
+        """
+        queue_name, _, properties, _, _ = delivery
+        attempt = self.attempt_of(properties)
+        if error is None or attempt > len(self.retry_delays):
+            return None
+
+        delay = self.retry_delays[attempt - 1]
+        headers = {
+            key: value for key, value in (properties.headers or {}).items()
+            if key != "x-death"
+        }
+        headers[ATTEMPT_HEADER] = attempt + 1
+        headers[PUBLISHED_HEADER] = time.time() + delay
+        print(f"Attempt {attempt} failed, retrying in {delay:g}s")
+        return self.retry_queue_name(queue_name, delay), pika.BasicProperties(
+            delivery_mode=2,
+            content_type=properties.content_type,
+            headers=headers,
         )
 
-        print(f"Consuming messages from '{queue_name}'...")
-        channel.start_consuming()
+    def _settle(self, channel, delivery, error) -> None:
+        """
+        Ack a delivery, first re-publishing it to its delay queue if it
+        failed and has attempts left. Runs on the channel's I/O thread; the
+        channel is in confirm mode (see _consumer_channel).
+        """
+        queue_name, method, _, body, _ = delivery
+        IN_FLIGHT.dec(queue=queue_name)
+        if not channel.is_open:
+            return
+
+        retry = self._retry_copy(delivery, error)
+        if retry is not None:
+            routing_key, properties = retry
+            try:
+                channel.basic_publish(exchange="", routing_key=routing_key, body=body, properties=properties)
+            except (NackError, AMQPConnectionError, AMQPChannelError) as e:
+                self._requeue(channel, delivery, e)
+                return
+
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+        CONSUMED.inc(queue=queue_name, outcome=self._outcome(error, retry))
+
+    async def _settle_async(self, channel, confirms, delivery, error) -> None:
+        """
+        _settle for consume_async, waiting for the broker to confirm the
+        retry copy without blocking the event loop.
+        """
+        queue_name, method, _, body, _ = delivery
+        IN_FLIGHT.dec(queue=queue_name)
+        if not channel.is_open:
+            return
+
+        retry = self._retry_copy(delivery, error)
+        if retry is not None:
+            routing_key, properties = retry
+            try:
+                await confirms.publish(channel, exchange="", routing_key=routing_key, body=body, properties=properties)
+            except (NackError, AMQPConnectionError, AMQPChannelError) as e:
+                self._requeue(channel, delivery, e)
+                return
+            if not channel.is_open:
+                return
+
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+        CONSUMED.inc(queue=queue_name, outcome=self._outcome(error, retry))
+
+    @staticmethod
+    def _outcome(error, retry) -> str:
+        if error is None:
+            return "ok"
+        return "failed" if retry is None else "retry"
+
+    @staticmethod
+    def _requeue(channel, delivery, error) -> None:
+        # The broker did not take the retry copy: hand the original back
+        # (same attempt) rather than ack it and lose the job.
+        queue_name, method, _, _, _ = delivery
+        print(f"Could not schedule retry ({error!r}), returning message to '{queue_name}'")
+        if channel.is_open:
+            channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+        CONSUMED.inc(queue=queue_name, outcome="requeued")
+
+    def publish_failed(self, message: dict, error: Exception) -> None:
+        """
+        Default failure handler: park the message on `failed_jobs`.
+        """
+        self.publish(FAILED_QUEUE, {**message, "error": str(error)})
+
+
+class _AsyncConfirms:
+    """
+    Publisher confirms for an asynchronous channel in confirm mode: each
+    publish returns a future that resolves when the broker acks it and
+    fails if the broker nacks it or the channel closes first.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.next_tag = 1
+        self.pending = {}
+
+    def publish(self, channel, **kwargs) -> asyncio.Future:
+        future = self.loop.create_future()
+        # The broker numbers confirms by publish order on the channel.
+        self.pending[self.next_tag] = future
+        self.next_tag += 1
+        channel.basic_publish(**kwargs)
+        return future
+
+    def on_confirm(self, frame) -> None:
+        method = frame.method
+        if method.multiple:
+            tags = [tag for tag in self.pending if tag <= method.delivery_tag]
+        else:
+            tags = [method.delivery_tag]
+        acked = isinstance(method, pika.spec.Basic.Ack)
+        for tag in tags:
+            future = self.pending.pop(tag, None)
+            if future is None or future.done():
+                continue
+            if acked:
+                future.set_result(None)
+            else:
+                future.set_exception(NackError([]))
+
+    def fail_all(self, error: Exception) -> None:
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self.pending.clear()
@@ -0,0 +1,134 @@
+import struct
+from collections.abc import Sequence
+import numpy as np
+
+# Per-segment whisper fields kept in the packed `segment_extras` column.
+FLOAT_FIELDS = ("temperature", "avg_logprob", "compression_ratio", "no_speech_prob")
+MAGIC = b"SEG1"
+_HEADER = struct.Struct("<4sI")
+
+
+def pack_segments(segments: list):
+    """
+    Split whisper segments into the compact columns: (starts, ends, texts,
+    extras). `extras` packs seek, the float fields and the token ids as
+    little-endian arrays; a field missing from a segment is stored as -1 /
+    NaN and left out again on read.
+    """
+    starts = [float(segment["start"]) for segment in segments]
+    ends = [float(segment["end"]) for segment in segments]
+    texts = [segment["text"] for segment in segments]
+
+    n = len(segments)
+    seeks = np.array([segment.get("seek", -1) for segment in segments], dtype="<i4")
+    floats = np.array(
+        [[segment.get(name, np.nan) for name in FLOAT_FIELDS] for segment in segments],
+        dtype="<f4"
+    ).reshape(n, len(FLOAT_FIELDS))
+    token_lists = [segment.get("tokens") or [] for segment in segments]
+    counts = np.array([len(tokens) for tokens in token_lists], dtype="<u4")
+    # Whisper vocabularies are < 65536 tokens.
+    tokens = np.fromiter(
+        (token for tokens in token_lists for token in tokens),
+        dtype="<u2",
+        count=int(counts.sum())
+    )
+
+    extras = b"".join((
+        _HEADER.pack(MAGIC, n),
+        seeks.tobytes(),
+        floats.T.tobytes(),
+        counts.tobytes(),
+        tokens.tobytes()
+    ))
+    return starts, ends, texts, extras
+
+
+def unpack_extras(extras: bytes, n: int) -> list:
+    """
+    Decode the packed column into one dict of extra fields per segment.
+    """
+    magic, count = _HEADER.unpack_from(extras)
+    if magic != MAGIC or count != n:
+        raise ValueError("Corrupt segment_extras")
+
+    offset = _HEADER.size
+    seeks = np.frombuffer(extras, dtype="<i4", count=n, offset=offset)
+    offset += 4 * n
+    floats = np.frombuffer(extras, dtype="<f4", count=n * len(FLOAT_FIELDS), offset=offset)
+    floats = floats.reshape(len(FLOAT_FIELDS), n)
+    offset += 4 * n * len(FLOAT_FIELDS)
+    counts = np.frombuffer(extras, dtype="<u4", count=n, offset=offset)
+    offset += 4 * n
+    tokens = np.frombuffer(extras, dtype="<u2", count=int(counts.sum()), offset=offset)
+    bounds = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=bounds[1:])
+
+    result = []
+    for i in range(n):
+        fields = {}
+        if seeks[i] >= 0:
+            fields["seek"] = int(seeks[i])
+        fields["tokens"] = tokens[bounds[i]:bounds[i + 1]].tolist()
+        for j, name in enumerate(FLOAT_FIELDS):
+            value = floats[j, i]
+            if not np.isnan(value):
+                fields[name] = round(float(value), 6)
+        result.append(fields)
+    return result
+
+
+class LazySegments(Sequence):
+    """
+    Read-only list of whisper segment dicts backed by the compact columns.
+    Dicts are built on access and the packed extras are decoded only the
+    first time a segment is read; without extras, segments carry only id,
+    start, end and text. Use `to_list()` for JSON serialization.
+    """
+    def __init__(self, starts: list, ends: list, texts: list, extras: bytes = None, legacy: list = None):
+        self._starts = starts or []
+        self._ends = ends or []
+        self._texts = texts or []
+        self._extras = extras
+        self._legacy = legacy
+        self._decoded = None
+
+    def __len__(self):
+        return len(self._texts)
+
+    def _extra(self, i: int) -> dict:
+        if self._decoded is None:
+            if self._extras is not None:
+                self._decoded = unpack_extras(bytes(self._extras), len(self))
+            elif self._legacy is not None:
+                # Rows migrated from the old JSONB column keep their details there.
+                self._decoded = [
+                    {key: value for key, value in segment.items() if key not in ("id", "start", "end", "text")}
+                    for segment in self._legacy
+                ]
+            else:
+                self._decoded = [{}] * len(self)
+        return self._decoded[i]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("segment index out of range")
+
+        segment = {
+            "id": index,
+            "start": round(self._starts[index], 3),
+            "end": round(self._ends[index], 3),
+            "text": self._texts[index]
+        }
+        segment.update(self._extra(index))
+        return segment
+
+    def to_list(self) -> list:
+        return list(self)
+
+    def __repr__(self):
+        return f"LazySegments({len(self)} segments)"
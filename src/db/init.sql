@@ -21,7 +21,11 @@ CREATE TABLE IF NOT EXISTS transcripts (
     model_name TEXT,
     language TEXT,
     transcript_text TEXT,
-    segments JSONB,
+    segments JSONB,                     -- legacy full segment list; new rows use the columns below
+    segment_starts REAL[],
+    segment_ends REAL[],
+    segment_texts TEXT[],
+    segment_extras BYTEA,               -- packed seek, tokens and confidence fields (see segment_codec.py)
     timestamped_text TEXT,
     human_transcript TEXT,
     created_at TIMESTAMP DEFAULT now()
@@ -41,6 +45,26 @@ CREATE TABLE IF NOT EXISTS evaluations (
     created_at TIMESTAMP DEFAULT now()
 );
 
+CREATE TABLE IF NOT EXISTS audio_files (
+    path TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,         -- xxh3-128 of the file contents
+    size_bytes BIGINT NOT NULL,
+    mtime DOUBLE PRECISION NOT NULL,
+    call_id UUID NOT NULL REFERENCES calls(id) ON DELETE CASCADE,
+    is_duplicate BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS result_cache (
+    namespace TEXT NOT NULL,            -- e.g. 'transcript', 'evaluation'
+    cache_key TEXT NOT NULL,            -- sha256 of the inputs that determine the result
+    payload JSONB NOT NULL,
+    size_bytes INT NOT NULL,
+    created_at TIMESTAMP DEFAULT now(),
+    last_used_at TIMESTAMP DEFAULT now(),
+    PRIMARY KEY (namespace, cache_key)
+);
+
 CREATE TABLE prompts (
     id UUID PRIMARY KEY,
     name TEXT NOT NULL,                 -- e.g. 'QUALITY_EVAL'
@@ -61,6 +85,18 @@ ON transcripts(call_id);
 CREATE INDEX IF NOT EXISTS idx_evaluations_call_id
 ON evaluations(call_id);
 
+CREATE INDEX IF NOT EXISTS idx_transcripts_created
+ON transcripts(created_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_evaluations_created
+ON evaluations(created_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_audio_files_content
+ON audio_files(content_hash, size_bytes);
+
+CREATE INDEX IF NOT EXISTS idx_result_cache_lru
+ON result_cache(namespace, last_used_at);
+
 CREATE OR REPLACE FUNCTION set_updated_at()
 RETURNS TRIGGER AS $$
 BEGIN
@@ -75,6 +111,21 @@ FOR EACH ROW
 EXECUTE FUNCTION set_updated_at();
 
 
+-- Prompt registries in the agents LISTEN on this channel and reload the
+-- named prompt when it changes.
+CREATE OR REPLACE FUNCTION notify_prompts_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('prompts_changed', COALESCE(NEW.name, OLD.name));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER prompts_notify_changed
+AFTER INSERT OR UPDATE OR DELETE ON prompts
+FOR EACH ROW
+EXECUTE FUNCTION notify_prompts_changed();
+
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
 
@@ -0,0 +1,18 @@
+-- Content-hash dedupe index for ingested audio (replaces processed_files.txt).
+-- Apply to databases created before this table was added to init.sql:
+--   psql -h localhost -U postgres -d qa_poc -f src/db/migrations/001_audio_files.sql
+-- Paths listed in an existing processed_files.txt are imported into this table
+-- by the ingestion service on its next start (backfill_processed_files).
+
+CREATE TABLE IF NOT EXISTS audio_files (
+    path TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,         -- xxh3-128 of the file contents
+    size_bytes BIGINT NOT NULL,
+    mtime DOUBLE PRECISION NOT NULL,
+    call_id UUID NOT NULL REFERENCES calls(id) ON DELETE CASCADE,
+    is_duplicate BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_audio_files_content
+ON audio_files(content_hash, size_bytes);
@@ -0,0 +1,15 @@
+-- Shared cache for transcripts and evaluations, keyed by content hash.
+--   psql -h localhost -U postgres -d qa_poc -f src/db/migrations/002_result_cache.sql
+
+CREATE TABLE IF NOT EXISTS result_cache (
+    namespace TEXT NOT NULL,            -- e.g. 'transcript', 'evaluation'
+    cache_key TEXT NOT NULL,            -- sha256 of the inputs that determine the result
+    payload JSONB NOT NULL,
+    size_bytes INT NOT NULL,
+    created_at TIMESTAMP DEFAULT now(),
+    last_used_at TIMESTAMP DEFAULT now(),
+    PRIMARY KEY (namespace, cache_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_result_cache_lru
+ON result_cache(namespace, last_used_at);
@@ -0,0 +1,17 @@
+-- Notify listening agents when a prompt is added, edited or (de)activated.
+--   psql -h localhost -U postgres -d qa_poc -f src/db/migrations/003_prompt_notify.sql
+
+CREATE OR REPLACE FUNCTION notify_prompts_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('prompts_changed', COALESCE(NEW.name, OLD.name));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS prompts_notify_changed ON prompts;
+
+CREATE TRIGGER prompts_notify_changed
+AFTER INSERT OR UPDATE OR DELETE ON prompts
+FOR EACH ROW
+EXECUTE FUNCTION notify_prompts_changed();
@@ -0,0 +1,31 @@
+-- Store transcript segments as parallel arrays instead of whisper's JSON list.
+--   psql -h localhost -U postgres -d qa_poc -f src/db/migrations/004_compact_segments.sql
+
+ALTER TABLE transcripts
+    ADD COLUMN IF NOT EXISTS segment_starts REAL[],
+    ADD COLUMN IF NOT EXISTS segment_ends REAL[],
+    ADD COLUMN IF NOT EXISTS segment_texts TEXT[],
+    ADD COLUMN IF NOT EXISTS segment_extras BYTEA;
+
+-- Backfill the arrays for existing rows. Their tokens and confidence fields
+-- stay in the old `segments` column, which readers fall back to.
+UPDATE transcripts t
+SET segment_starts = s.starts,
+    segment_ends = s.ends,
+    segment_texts = s.texts
+FROM (
+    SELECT
+        id,
+        array_agg((seg->>'start')::real ORDER BY ord) AS starts,
+        array_agg((seg->>'end')::real ORDER BY ord) AS ends,
+        array_agg(seg->>'text' ORDER BY ord) AS texts
+    FROM transcripts, jsonb_array_elements(segments) WITH ORDINALITY AS e(seg, ord)
+    WHERE segment_texts IS NULL AND segments IS NOT NULL
+    GROUP BY id
+) s
+WHERE t.id = s.id;
+
+-- Optional: drop the legacy JSON (and with it tokens/confidence of old rows)
+-- and reclaim the space. VACUUM FULL locks the table while it runs.
+-- UPDATE transcripts SET segments = NULL WHERE segment_texts IS NOT NULL;
+-- VACUUM FULL transcripts;
@@ -0,0 +1,8 @@
+-- Indexes for the (created_at, id) keyset pagination of iter_transcripts / iter_evaluations.
+--   psql -h localhost -U postgres -d qa_poc -f src/db/migrations/005_keyset_indexes.sql
+
+CREATE INDEX IF NOT EXISTS idx_transcripts_created
+ON transcripts(created_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_evaluations_created
+ON evaluations(created_at, id);
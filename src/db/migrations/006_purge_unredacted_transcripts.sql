@@ -0,0 +1,8 @@
+-- Drop cached transcripts written before the transcription worker redacted
+-- them ahead of caching; those entries can hold unredacted PII. Their keys
+-- no longer match (the redaction version is part of the key), so the only
+-- cost is that re-delivered calls are transcribed again.
+--   psql -h localhost -U postgres -d qa_poc -f src/db/migrations/006_purge_unredacted_transcripts.sql
+
+DELETE FROM result_cache
+WHERE namespace = 'transcript';
@@ -0,0 +1,191 @@
+import os
+import shutil
+import struct
+import subprocess
+
+# Header bytes read from the start of a file; enough to skip an ID3 tag
+# with small artwork and reach the first MP3 frame.
+PROBE_BYTES = 64 * 1024
+
+# -------------------------
+# WAV
+# -------------------------
+
+def _wav_duration(f, size: int):
+    """
+    Duration from the RIFF chunk list: data bytes / byte rate of the fmt
+    chunk. Only chunk headers are read; the data chunk is never touched.
+    """
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] not in (b"RIFF", b"RF64") or riff[8:12] != b"WAVE":
+        return None
+
+    byte_rate = None
+    rf64_data_size = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack("<4sI", header)
+
+        if chunk_id == b"data":
+            data_size = chunk_size
+            if chunk_size == 0xFFFFFFFF and rf64_data_size is not None:
+                data_size = rf64_data_size
+            elif chunk_size in (0, 0xFFFFFFFF):
+                # Streamed writers leave the size unset; use the rest of the file.
+                data_size = size - f.tell()
+            data_size = min(data_size, size - f.tell())
+            return data_size / byte_rate if byte_rate else None
+
+        if chunk_id == b"fmt ":
+            body = f.read(chunk_size)
+            if len(body) < 12:
+                return None
+            byte_rate = struct.unpack_from("<I", body, 8)[0]
+        elif chunk_id == b"ds64":
+            body = f.read(chunk_size)
+            if len(body) < 16:
+                return None
+            rf64_data_size = struct.unpack_from("<Q", body, 8)[0]
+        else:
+            f.seek(chunk_size, os.SEEK_CUR)
+        if chunk_size & 1:
+            f.seek(1, os.SEEK_CUR)
+
+
+# -------------------------
+# MP3
+# -------------------------
+
+_MP3_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 25: (11025, 12000, 8000)}
+
+
+def _mp3_frame(header: bytes):
+    """
+    Parse a 4-byte MPEG audio frame header. Returns (version, layer,
+    bitrate kbps, sample rate, samples per frame, frame bytes, mono) or
+    None if it is not a valid header.
+    """
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = {3: 1, 2: 2, 0: 25}.get((header[1] >> 3) & 3)
+    layer = {3: 1, 2: 2, 1: 3}.get((header[1] >> 1) & 3)
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 3
+    if version is None or layer is None or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    bitrate = _MP3_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index]
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    padding = (header[2] >> 1) & 1
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate * 1000 // sample_rate + padding) * 4
+    else:
+        samples = 1152 if layer == 2 or version == 1 else 576
+        length = samples // 8 * bitrate * 1000 // sample_rate + padding
+    return version, layer, bitrate, sample_rate, samples, length, header[3] >> 6 == 3
+
+
+def _mp3_duration(f, size: int):
+    """
+    Duration of an MP3 from its first frame: the frame count of a Xing/Info
+    or VBRI header when present (VBR files), otherwise audio bytes over the
+    constant bitrate.
+    """
+    data = f.read(PROBE_BYTES)
+    base = start = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        tag_size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        start = 10 + tag_size + (10 if data[5] & 0x10 else 0)
+        if start + 4 > len(data):
+            # Tag larger than the probe window (embedded artwork): read past it.
+            f.seek(start)
+            data = f.read(PROBE_BYTES)
+            base, start = start, 0
+
+    # Require a second frame right after the first to skip false syncs.
+    for i in range(start, len(data) - 4):
+        frame = _mp3_frame(data[i:i + 4])
+        if frame is None:
+            continue
+        following = data[i + frame[5]:i + frame[5] + 4]
+        if len(following) == 4 and _mp3_frame(following) is None:
+            continue
+        break
+    else:
+        return None
+
+    version, layer, bitrate, sample_rate, samples, _, mono = frame
+    side_info = (17 if mono else 32) if version == 1 else (9 if mono else 17)
+    xing = i + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info") and len(data) >= xing + 12:
+        flags = struct.unpack_from(">I", data, xing + 4)[0]
+        if flags & 1:
+            frames = struct.unpack_from(">I", data, xing + 8)[0]
+            return frames * samples / sample_rate
+    vbri = i + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI" and len(data) >= vbri + 18:
+        frames = struct.unpack_from(">I", data, vbri + 14)[0]
+        return frames * samples / sample_rate
+
+    audio_bytes = size - base - i
+    if size >= 128:
+        f.seek(size - 128)
+        if f.read(3) == b"TAG":
+            audio_bytes -= 128
+    return audio_bytes * 8 / (bitrate * 1000)
+
+
+# -------------------------
+# Probe
+# -------------------------
+
+def _ffprobe_duration(path: str, timeout: float = 10.0):
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe is None:
+        return None
+    try:
+        result = subprocess.run(
+            [ffprobe, "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+            capture_output=True, text=True, timeout=timeout, check=True
+        )
+        return float(result.stdout.strip())
+    except (subprocess.SubprocessError, ValueError):
+        return None
+
+
+def probe_duration(path: str):
+    """
+    Duration of an audio file in seconds, read from its container headers
+    without decoding the audio. WAV and MP3 are parsed directly; anything
+    else (or a header that cannot be parsed) falls back to ffprobe, which
+    also only reads headers. Returns None if the duration is unknown.
+    """
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            magic = f.read(4)
+            f.seek(0)
+            if magic in (b"RIFF", b"RF64"):
+                duration = _wav_duration(f, size)
+            elif magic[:3] == b"ID3" or _mp3_frame(magic) is not None:
+                duration = _mp3_duration(f, size)
+            else:
+                duration = None
+    except (OSError, struct.error) as e:
+        print(f"Could not read audio header of {path}: {e}")
+        return None
+
+    if duration is None:
+        duration = _ffprobe_duration(path)
+    return round(duration, 3) if duration is not None else None
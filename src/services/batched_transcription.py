@@ -0,0 +1,157 @@
+import numpy as np
+import torch
+from whisper.audio import HOP_LENGTH, N_FRAMES, N_SAMPLES, SAMPLE_RATE, load_audio, log_mel_spectrogram, pad_or_trim
+from whisper.decoding import DecodingOptions
+from whisper.tokenizer import get_tokenizer
+from whisper.utils import compression_ratio
+
+# whisper.transcribe defaults for skipping silent windows.
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+
+
+class BatchedTranscriber:
+    """
+    Runs Whisper on several recordings at once.
+
+    Every recording is cut into the same 30-second mel windows that
+    `whisper.transcribe` uses. In each step the current window of every
+    unfinished recording is stacked into one batch, so the encoder and
+    decoder see `batch_size` windows per forward pass instead of one.
+
+    Differences from `model.transcribe`: decoding is greedy at temperature 0
+    with no temperature fallback, and the previous window's text is not used
+    as a prompt. Recordings in the same batch are grouped by detected
+    language after their first window.
+    """
+    def __init__(self, model, batch_size: int = 8, language: str = None):
+        self.model = model
+        self.batch_size = batch_size
+        self.language = language
+        self.device = next(model.parameters()).device
+        self.fp16 = self.device.type == "cuda"
+        self.tokenizer = get_tokenizer(
+            model.is_multilingual,
+            num_languages=model.num_languages,
+            task="transcribe"
+        )
+        self.input_stride = N_FRAMES // model.dims.n_audio_ctx
+        self.time_precision = self.input_stride * HOP_LENGTH / SAMPLE_RATE
+
+    def compute_mel(self, audio: np.ndarray) -> torch.Tensor:
+        """
+        Log-mel spectrogram of a 16 kHz waveform, padded like whisper.transcribe.
+        """
+        return log_mel_spectrogram(audio, self.model.dims.n_mels, padding=N_SAMPLES)
+
+    def transcribe_files(self, audio_paths: list) -> list:
+        return self.transcribe_mels([self.compute_mel(load_audio(path)) for path in audio_paths])
+
+    def transcribe_mels(self, mels: list) -> list:
+        """
+        Transcribe padded mel spectrograms (see `compute_mel`).
+        Returns one whisper-style result dict per input, in input order.
+        """
+        content_frames = [mel.shape[-1] - N_FRAMES for mel in mels]
+        seeks = [0] * len(mels)
+        results = [{"segments": [], "language": self.language} for _ in mels]
+
+        while True:
+            active = [i for i in range(len(mels)) if seeks[i] < content_frames[i]]
+            if not active:
+                break
+
+            groups = {}
+            for i in active:
+                groups.setdefault(results[i]["language"], []).append(i)
+
+            for language, indices in groups.items():
+                for start in range(0, len(indices), self.batch_size):
+                    self._decode_step(indices[start:start + self.batch_size], language, mels, content_frames, seeks, results)
+
+        for result in results:
+            result["text"] = "".join(segment["text"] for segment in result["segments"])
+            if result["language"] is None:
+                result["language"] = "en"
+
+        return results
+
+    def _decode_step(self, indices, language, mels, content_frames, seeks, results):
+        batch = torch.stack([
+            pad_or_trim(mels[i][:, seeks[i]:seeks[i] + N_FRAMES], N_FRAMES) for i in indices
+        ]).to(self.device, dtype=torch.float16 if self.fp16 else torch.float32)
+
+        options = DecodingOptions(language=language, temperature=0.0, fp16=self.fp16)
+        decoded = self.model.decode(batch, options)
+
+        for i, result in zip(indices, decoded):
+            if results[i]["language"] is None:
+                results[i]["language"] = result.language
+
+            segment_size = min(N_FRAMES, content_frames[i] - seeks[i])
+            # Same comparison as whisper.transcribe: a window at exactly the
+            # logprob threshold is still skipped.
+            if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob <= LOGPROB_THRESHOLD:
+                seeks[i] += segment_size
+                continue
+
+            seeks[i] += self._add_segments(results[i]["segments"], result, seeks[i], segment_size)
+
+    def _add_segments(self, segments: list, result, seek: int, segment_size: int) -> int:
+        """
+        Split one decoded window on its timestamp tokens (as whisper.transcribe
+        does) and return how many mel frames to advance.
+        """
+        tokenizer = self.tokenizer
+        time_offset = seek * HOP_LENGTH / SAMPLE_RATE
+        tokens = torch.tensor(result.tokens)
+        timestamp_tokens = tokens.ge(tokenizer.timestamp_begin)
+        single_timestamp_ending = timestamp_tokens[-2:].tolist() == [False, True]
+
+        consecutive = torch.where(timestamp_tokens[:-1] & timestamp_tokens[1:])[0] + 1
+
+        def _add(start, end, segment_tokens):
+            text_tokens = [token for token in segment_tokens if token < tokenizer.eot]
+            segments.append({
+                "id": len(segments),
+                "seek": seek,
+                "start": round(start, 3),
+                "end": round(end, 3),
+                "text": tokenizer.decode(text_tokens),
+                "tokens": segment_tokens,
+                "temperature": 0.0,
+                "avg_logprob": result.avg_logprob,
+                "compression_ratio": compression_ratio(result.text),
+                "no_speech_prob": result.no_speech_prob
+            })
+
+        if len(consecutive) > 0:
+            slices = consecutive.tolist()
+            if single_timestamp_ending:
+                slices.append(len(tokens))
+
+            last_slice = 0
+            for current_slice in slices:
+                sliced = tokens[last_slice:current_slice]
+                start_pos = sliced[0].item() - tokenizer.timestamp_begin
+                end_pos = sliced[-1].item() - tokenizer.timestamp_begin
+                _add(
+                    time_offset + start_pos * self.time_precision,
+                    time_offset + end_pos * self.time_precision,
+                    sliced.tolist()
+                )
+                last_slice = current_slice
+
+            if single_timestamp_ending:
+                return segment_size
+            last_timestamp_pos = tokens[last_slice - 1].item() - tokenizer.timestamp_begin
+            return max(last_timestamp_pos * self.input_stride, 1)
+
+        duration = segment_size * HOP_LENGTH / SAMPLE_RATE
+        timestamps = tokens[timestamp_tokens.nonzero().flatten()]
+        if len(timestamps) > 0 and timestamps[-1].item() != tokenizer.timestamp_begin:
+            duration = (timestamps[-1].item() - tokenizer.timestamp_begin) * self.time_precision
+
+        if len(tokens) > 0:
+            _add(time_offset, time_offset + duration, tokens.tolist())
+        return segment_size
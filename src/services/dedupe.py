@@ -0,0 +1,149 @@
+import os
+import uuid
+from dataclasses import dataclass
+import xxhash
+from src.clients.postgres_client import PostgresClient
+from src.services.audio_probe import probe_duration
+from src.services import metrics
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class AudioFile:
+    path: str
+    size_bytes: int
+    mtime: float
+    content_hash: str = None
+    call_id: str = None
+    duration_seconds: float = None
+
+    @property
+    def content_key(self):
+        return (self.content_hash, self.size_bytes)
+
+
+def content_hash(path: str) -> str:
+    """
+    Fast non-cryptographic fingerprint of the file contents (xxh3-128).
+    """
+    hasher = xxhash.xxh3_128()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class AudioDedupeStore:
+    """
+    Content-addressed record of ingested audio, stored in the `audio_files`
+    table.
+
+    Files are keyed by path; a path whose size and mtime are unchanged is
+    known without reading it. Anything else is hashed and matched on
+    (content_hash, size) so copies of a recording link to the call that
+    already holds its transcript and evaluation instead of being processed
+    again.
+    """
+    def __init__(self, db: PostgresClient):
+        self.db = db
+
+    def classify(self, paths: list):
+        """
+        Split paths into (new, duplicates, refreshed, known_count).
+        `new` files get a fresh call_id and their duration, read from the
+        file header; `duplicates` carry the call_id of the original
+        recording. `refreshed` are indexed files whose size or mtime
+        changed but whose content still maps to their own call (e.g. a
+        touched file); they count as known and only need their row updated.
+        """
+        known = self.db.get_audio_files(paths)
+        if known is None:
+            raise RuntimeError("Could not read audio file index")
+
+        candidates = []
+        known_count = 0
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+
+            entry = known.get(path)
+            if entry and entry["size_bytes"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                known_count += 1
+                continue
+
+            candidates.append(AudioFile(path=path, size_bytes=stat.st_size, mtime=stat.st_mtime))
+
+        for audio in candidates:
+            with metrics.stage("hash"):
+                audio.content_hash = content_hash(audio.path)
+
+        originals = self.db.find_calls_by_content(list({audio.content_key for audio in candidates}))
+        if originals is None:
+            raise RuntimeError("Could not read audio file index")
+
+        new, duplicates, refreshed = [], [], []
+        for audio in candidates:
+            original = originals.get(audio.content_key)
+            entry = known.get(audio.path)
+            if original and entry and entry["call_id"] == original:
+                audio.call_id = original
+                refreshed.append((audio, entry["is_duplicate"]))
+                known_count += 1
+            elif original:
+                audio.call_id = original
+                duplicates.append(audio)
+            else:
+                # Later copies within the same batch link to this one.
+                audio.call_id = str(uuid.uuid4())
+                with metrics.stage("probe"):
+                    audio.duration_seconds = probe_duration(audio.path)
+                originals[audio.content_key] = audio.call_id
+                new.append(audio)
+
+        return new, duplicates, refreshed, known_count
+
+    def register(self, new: list, duplicates: list, refreshed: list = ()):
+        """
+        Create calls for new recordings and index all files, atomically.
+        `refreshed` holds (file, is_duplicate) pairs from classify, which
+        keep their call and duplicate flag.
+        """
+        calls = [(audio.call_id, audio.path, audio.duration_seconds) for audio in new]
+        flagged = [(audio, False) for audio in new] + [(audio, True) for audio in duplicates] + list(refreshed)
+        audio_files = [
+            (audio.path, audio.content_hash, audio.size_bytes, audio.mtime, audio.call_id, is_duplicate)
+            for audio, is_duplicate in flagged
+        ]
+
+        if self.db.create_calls(calls, audio_files) is None:
+            raise RuntimeError(f"Could not register batch of {len(audio_files)} audio files")
+
+    def backfill(self, paths: list) -> int:
+        """
+        Index files ingested before this table existed, each linked to the
+        call created for its path. Paths that are already indexed, no
+        longer on disk or have no call are skipped; the latter are ingested
+        as new files. Returns the number of files indexed.
+        """
+        known = self.db.get_audio_files(paths)
+        if known is None:
+            raise RuntimeError("Could not read audio file index")
+        calls = self.db.get_calls_by_path([path for path in paths if path not in known])
+        if calls is None:
+            raise RuntimeError("Could not read calls")
+
+        audio_files = []
+        for path, call_id in calls.items():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            with metrics.stage("hash"):
+                audio_files.append((path, content_hash(path), stat.st_size, stat.st_mtime, call_id, False))
+
+        if self.db.create_calls([], audio_files) is None:
+            raise RuntimeError(f"Could not index batch of {len(audio_files)} audio files")
+        return len(audio_files)
@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+from pathlib import Path
+from watchdog.observers import Observer
+from src.agents.eval_agent import agent_from_env, consume_evaluation_jobs
+from src.clients.memory_queue import InMemoryQueueClient
+from src.clients.postgres_client import PostgresClient
+from src.services.dedupe import AudioDedupeStore
+from src.services.ingestion import NewFileHandler, backfill_processed_files, scan_existing_files
+from src.services.job_lanes import SHORT_QUEUE, LONG_QUEUE, queue_for_duration
+from src.services.transcription import load_models_from_env, worker_from_env, consume_jobs
+from src.services import metrics
+from dotenv import load_dotenv
+load_dotenv()
+
+EVALUATION_QUEUE = "evaluation_jobs"
+STAGE_QUEUES = (SHORT_QUEUE, LONG_QUEUE, EVALUATION_QUEUE)
+
+
+# -------------------------
+# Resume
+# -------------------------
+
+def requeue_unfinished(db: PostgresClient, mq: InMemoryQueueClient) -> int:
+    """
+    Queue the calls a previous run left in TRANSCRIPTION_QUEUE or
+    EVALUATION_QUEUE. In-process queues are lost on exit, and the files of
+    those calls are already indexed, so ingestion would not queue them
+    again. Returns the number of jobs queued.
+    """
+    calls = db.get_calls_by_status(["TRANSCRIPTION_QUEUE", "EVALUATION_QUEUE"])
+    if calls is None:
+        raise RuntimeError("Could not read unfinished calls")
+
+    for call in calls:
+        message = {
+            "file_path": call["audio_path"],
+            "call_id": call["call_id"],
+            "trace_id": metrics.new_trace_id()
+        }
+        if call["status"] == "EVALUATION_QUEUE":
+            mq.publish(EVALUATION_QUEUE, message)
+            continue
+        message["content_hash"] = call["content_hash"]
+        message["duration_seconds"] = call["duration_seconds"]
+        mq.publish(queue_for_duration(call["duration_seconds"]), message)
+
+    if calls:
+        print(f"Requeued {len(calls)} unfinished calls from a previous run")
+    return len(calls)
+
+
+# -------------------------
+# Stages
+# -------------------------
+
+def start_stage(name: str, mq: InMemoryQueueClient, crashed: threading.Event, target, *args) -> threading.Thread:
+    """
+    Run a consumer loop on its own thread. If it stops before shutdown,
+    `crashed` is set and the queues are closed, so the whole process exits
+    instead of blocking on the full queue in front of a dead stage.
+    """
+    def _run():
+        try:
+            target(*args)
+        except Exception as e:
+            print(f"Stage '{name}' crashed: {e!r}")
+        if not mq.closed:
+            crashed.set()
+            mq.close()
+
+    thread = threading.Thread(target=_run, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+# -------------------------
+# Main
+# -------------------------
+
+def main():
+    """
+    Ingestion, transcription and evaluation in one process, connected by
+    bounded in-memory queues instead of RabbitMQ. When transcription falls
+    behind, ingestion blocks on the full lane queue; when evaluation falls
+    behind, the transcription worker blocks on `evaluation_jobs`.
+    """
+    depth = int(os.getenv("FUSED_QUEUE_DEPTH", "8"))
+    watch = os.getenv("FUSED_WATCH", "1") == "1"
+    # Forks the long-call chunk pool, so before any connections or threads.
+    model, long_audio = load_models_from_env()
+
+    mq = InMemoryQueueClient(maxsizes={
+        SHORT_QUEUE: depth,
+        LONG_QUEUE: depth,
+        EVALUATION_QUEUE: int(os.getenv("FUSED_EVALUATION_QUEUE_DEPTH", str(depth)))
+    })
+    db = PostgresClient(maxconn=int(os.getenv("FUSED_DB_CONNECTIONS", "8")))
+    store = AudioDedupeStore(db)
+
+    # Both register their caches; the worker also registers db_pool.
+    worker = worker_from_env(mq, db, model, long_audio)
+    agent = agent_from_env(db, mq)
+    metrics.register_stats("memory_queue", mq.stats)
+    metrics.serve_from_env(9100)
+
+    crashed = threading.Event()
+    stages = [
+        start_stage("transcription", mq, crashed, consume_jobs, worker, mq),
+        start_stage("evaluation", mq, crashed, consume_evaluation_jobs, agent, mq)
+    ]
+
+    path = Path(os.getenv("DATA_PATH")).resolve()
+    settle_seconds = float(os.getenv("INGESTION_SETTLE_SECONDS", "2"))
+    observer = None
+    try:
+        if os.getenv("FUSED_RESUME", "1") == "1":
+            requeue_unfinished(db, mq)
+
+        backfill_processed_files(store, batch_size=int(os.getenv("INGESTION_BATCH_SIZE", "500")))
+        print(f"Scanning directory: {path}")
+        # Blocks while the lane queues are full, so a backfill streams
+        # through the stages instead of piling up in memory.
+        scan_existing_files(
+            path,
+            store,
+            mq,
+            batch_size=int(os.getenv("INGESTION_BATCH_SIZE", "500")),
+            settle_seconds=settle_seconds
+        )
+
+        if watch:
+            observer = Observer()
+            observer.schedule(NewFileHandler(store, mq, settle_seconds=settle_seconds), str(path), recursive=False)
+            observer.start()
+            print(f"Watching directory: {path}")
+            while not mq.closed:
+                time.sleep(1)
+        else:
+            while not mq.closed and not mq.wait_idle(STAGE_QUEUES, timeout=1):
+                pass
+            if not mq.closed:
+                print("All calls processed")
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        # Publishing failed because a stage crashed and closed the queues.
+        if not crashed.is_set():
+            raise
+        print(f"Ingestion stopped: {e}")
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
+        mq.close()
+        for stage in stages:
+            stage.join(timeout=30)
+        db.close()
+
+    if crashed.is_set():
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
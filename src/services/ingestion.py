@@ -3,44 +3,173 @@ import os
 from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-import uuid
 from src.clients.rabbitmq_client import RabbitMQClient
-from src.clients.postgres_client import PostgresClient
+from src.clients.postgres_client import PostgresClient, POOL_STAT_COUNTERS
+from src.services.dedupe import AudioDedupeStore
+from src.services.job_lanes import queue_for_duration
+from src.services import metrics
 from dotenv import load_dotenv
 load_dotenv()
+AUDIO_EXTENSIONS = (".wav", ".mp3")
 PROCESSED_FILE = "processed_files.txt"
 
+INGESTED_FILES = metrics.counter("ingested_files_total", "Files seen by ingestion, by result.", ("result",))
+
 
 # -------------------------
-# State helpers
+# Ingestion helpers
 # -------------------------
 
-def load_processed():
-    if not os.path.exists(PROCESSED_FILE):
-        return set()
-    with open(PROCESSED_FILE, "r") as f:
-        return set(line.strip() for line in f)
-
-
-def mark_processed(path):
-    with open(PROCESSED_FILE, "a") as f:
-        f.write(path + "\n")
+def ingest_batch(file_paths, store: AudioDedupeStore, mq: RabbitMQClient):
+    """
+    Dedupe, register and enqueue a batch of files: one index lookup, one
+    transaction for calls and audio_files rows, and one batched publish per
+    lane (short or long calls, by duration). Returns (queued, duplicates,
+    known) counts. Every queued job gets a new trace_id, which follows the
+    call through the later stages.
+    """
+    with metrics.stage("ingest"):
+        return _ingest_batch(file_paths, store, mq)
+
+
+def _ingest_batch(file_paths, store: AudioDedupeStore, mq: RabbitMQClient):
+    new, duplicates, refreshed, known = store.classify(file_paths)
+
+    for audio in duplicates:
+        print(f"Duplicate audio: {audio.path} -> call {audio.call_id}")
+
+    if new or duplicates or refreshed:
+        store.register(new, duplicates, refreshed)
+
+    lanes = {}
+    for audio in new:
+        lanes.setdefault(queue_for_duration(audio.duration_seconds), []).append(audio)
+
+    for queue_name, audios in lanes.items():
+        mq.publish_many(
+            queue_name,
+            (
+                {
+                    "file_path": audio.path,
+                    "call_id": audio.call_id,
+                    "content_hash": audio.content_hash,
+                    "duration_seconds": audio.duration_seconds,
+                    "trace_id": metrics.new_trace_id()
+                }
+                for audio in audios
+            )
+        )
+
+    INGESTED_FILES.inc(len(new), result="queued")
+    INGESTED_FILES.inc(len(duplicates), result="duplicate")
+    INGESTED_FILES.inc(known, result="known")
+    return len(new), len(duplicates), known
+
+
+def wait_until_settled(file_paths, settle_seconds: float) -> list:
+    """
+    Return `file_paths` once none of them has been modified for
+    `settle_seconds`, dropping any that disappear. Watchdog reports a file
+    as soon as it is created, so a recording still being copied in would
+    otherwise be hashed and queued half-written. Files older than that
+    are returned without waiting.
+    """
+    stats = {}
+    for file_path in file_paths:
+        try:
+            stats[file_path] = os.stat(file_path)
+        except FileNotFoundError:
+            pass
+
+    while settle_seconds > 0:
+        now = time.time()
+        if all(now - stat.st_mtime >= settle_seconds for stat in stats.values()):
+            break
+        time.sleep(settle_seconds)
+
+        changed = False
+        for file_path, stat in list(stats.items()):
+            try:
+                current = os.stat(file_path)
+            except FileNotFoundError:
+                del stats[file_path]
+                continue
+            if (current.st_size, current.st_mtime) != (stat.st_size, stat.st_mtime):
+                stats[file_path] = current
+                changed = True
+        if not changed:
+            break
+
+    return [file_path for file_path in file_paths if file_path in stats]
 
 
 # -------------------------
 # Bootstrap scan
 # -------------------------
 
-def scan_existing_files(path, processed, mq, db):
-    for file in Path(path).glob("*.mp3"):
-        file_path = str(file.resolve())
-        if file_path not in processed:
-            print(f"Found existing call: {file_path}")
-            call_id = str(uuid.uuid4())
-            mq.publish("transcription_jobs", {"file_path": file_path, "call_id": call_id})
-            mark_processed(file_path)
-            processed.add(file_path)
-            db.create_call(file_path, call_id)
+def backfill_processed_files(store: AudioDedupeStore, processed_file: str = PROCESSED_FILE, batch_size: int = 500) -> int:
+    """
+    One-time import of the paths listed in the old processed_files.txt into
+    the audio_files index, so the bootstrap scan does not queue them again.
+    The file is renamed to `<name>.migrated` only once every batch is
+    indexed; if the backfill fails it is retried on the next start.
+    """
+    if not os.path.exists(processed_file):
+        return 0
+
+    with open(processed_file, "r") as f:
+        paths = list(dict.fromkeys(line.strip() for line in f if line.strip()))
+
+    indexed = 0
+    for start in range(0, len(paths), batch_size):
+        indexed += store.backfill(paths[start:start + batch_size])
+
+    os.replace(processed_file, processed_file + ".migrated")
+    print(f"Backfilled {indexed} of {len(paths)} paths from {processed_file} into the audio file index")
+    return indexed
+
+
+def iter_audio_files(path):
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                yield os.path.realpath(entry.path)
+
+
+def scan_existing_files(
+    path,
+    store: AudioDedupeStore,
+    mq: RabbitMQClient,
+    batch_size: int = 500,
+    settle_seconds: float = 0.0
+):
+    started = time.time()
+    pending = []
+    totals = [0, 0, 0]
+
+    def _flush():
+        for i, count in enumerate(ingest_batch(wait_until_settled(pending, settle_seconds), store, mq)):
+            totals[i] += count
+        pending.clear()
+
+    for file_path in iter_audio_files(path):
+        pending.append(file_path)
+        if len(pending) >= batch_size:
+            _flush()
+            scanned = sum(totals)
+            rate = scanned / max(time.time() - started, 1e-6)
+            print(
+                f"Bootstrap: {scanned} files scanned ({rate:.0f}/s), {totals[0]} queued, "
+                f"{totals[1]} duplicates, {totals[2]} already processed"
+            )
+
+    if pending:
+        _flush()
+
+    print(
+        f"Bootstrap finished in {time.time() - started:.1f}s: {totals[0]} queued, "
+        f"{totals[1]} duplicates, {totals[2]} already processed"
+    )
 
 
 # -------------------------
@@ -48,27 +177,28 @@ def scan_existing_files(path, processed, mq, db):
 # -------------------------
 
 class NewFileHandler(FileSystemEventHandler):
-    def __init__(self, processed, MQClient: RabbitMQClient = None, DBClient: PostgresClient = None):
-        self.processed = processed
+    """
+    Ingests each new audio file once it has stopped changing for
+    `settle_seconds` (see wait_until_settled). Events are handled one at a
+    time on the observer thread, so later files wait behind a slow copy.
+    """
+    def __init__(self, store: AudioDedupeStore, MQClient: RabbitMQClient = None, settle_seconds: float = 0.0):
+        self.store = store
         self.mq = MQClient
-        self.db = DBClient
+        self.settle_seconds = settle_seconds
 
     def on_created(self, event):
         if event.is_directory:
             return
 
-        if event.src_path.endswith((".wav", ".mp3")):
+        if event.src_path.lower().endswith(AUDIO_EXTENSIONS):
             audio_path = str(Path(event.src_path).resolve())
 
-            if audio_path in self.processed:
-                return
-
             print(f"New call detected: {audio_path}")
-            call_id = str(uuid.uuid4())
-            self.mq.publish("transcription_jobs", {"file_path": audio_path, "call_id": call_id})
-            mark_processed(audio_path)
-            self.processed.add(audio_path)
-            self.db.create_call(audio_path, call_id)
+            try:
+                ingest_batch(wait_until_settled([audio_path], self.settle_seconds), self.store, self.mq)
+            except Exception as e:
+                print(f"Error ingesting {audio_path}: {e}")
 
 
 # -------------------------
@@ -78,17 +208,26 @@ class NewFileHandler(FileSystemEventHandler):
 def main():
     mq = RabbitMQClient()
     db = PostgresClient()
+    store = AudioDedupeStore(db)
+    metrics.register_stats("db_pool", db.pool_stats, counters=POOL_STAT_COUNTERS)
+    metrics.serve_from_env(9101)
 
     path = Path(os.getenv("DATA_PATH")).resolve()
 
-    print(f"Watching directory: {path}")
-
-    processed = load_processed()
+    settle_seconds = float(os.getenv("INGESTION_SETTLE_SECONDS", "2"))
 
+    print(f"Watching directory: {path}")
 
-    scan_existing_files(path, processed, mq, db)
+    backfill_processed_files(store, batch_size=int(os.getenv("INGESTION_BATCH_SIZE", "500")))
+    scan_existing_files(
+        path,
+        store,
+        mq,
+        batch_size=int(os.getenv("INGESTION_BATCH_SIZE", "500")),
+        settle_seconds=settle_seconds
+    )
 
-    event_handler = NewFileHandler(processed, mq, db)
+    event_handler = NewFileHandler(store, mq, settle_seconds=settle_seconds)
     observer = Observer()
     observer.schedule(event_handler, str(path), recursive=False)
     observer.start()
@@ -104,5 +243,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
-
@@ -0,0 +1,41 @@
+import os
+from dotenv import load_dotenv
+load_dotenv()
+
+SHORT_QUEUE = "transcription_jobs"
+LONG_QUEUE = "transcription_jobs_long"
+LANES = {"short": SHORT_QUEUE, "long": LONG_QUEUE}
+# Workers take three short calls for every long one while both have work.
+DEFAULT_LANES = "short:3,long:1"
+
+
+def long_call_threshold() -> float:
+    return float(os.getenv("TRANSCRIPTION_LONG_CALL_SECONDS", "600"))
+
+
+def queue_for_duration(duration_seconds: float, threshold: float = None) -> str:
+    """
+    Transcription queue for a call: calls of at least `threshold` seconds go
+    to the long lane so they never hold up the short calls queued behind
+    them. Calls of unknown duration are treated as long.
+    """
+    if threshold is None:
+        threshold = long_call_threshold()
+    if duration_seconds is None or duration_seconds >= threshold:
+        return LONG_QUEUE
+    return SHORT_QUEUE
+
+
+def lane_weights(spec: str) -> dict:
+    """
+    Parse a lane list such as "short:3,long:1" into {queue name: weight},
+    in the given order. A lane without a weight counts 1; names other than
+    "short" and "long" are taken as queue names.
+    """
+    weights = {}
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        lane, _, weight = entry.partition(":")
+        weights[LANES.get(lane.strip(), lane.strip())] = int(weight) if weight.strip() else 1
+    return weights
@@ -0,0 +1,151 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import torch
+from whisper.audio import HOP_LENGTH, SAMPLE_RATE, log_mel_spectrogram, pad_or_trim
+
+FRAME_SECONDS = 0.03
+
+
+# -------------------------
+# Silence-based splitting
+# -------------------------
+
+def split_on_silence(
+    audio: np.ndarray,
+    target_chunk_seconds: float = 300.0,
+    search_seconds: float = 60.0,
+    min_silence_seconds: float = 0.5
+) -> list:
+    """
+    Split a 16 kHz waveform into (start_sample, end_sample) chunks of roughly
+    `target_chunk_seconds`. Each cut is placed in the quietest
+    `min_silence_seconds` stretch within `search_seconds` of the target
+    boundary, using short-time RMS energy.
+    """
+    total = len(audio)
+    target = int(target_chunk_seconds * SAMPLE_RATE)
+    if total <= target + int(search_seconds * SAMPLE_RATE):
+        return [(0, total)]
+
+    frame = int(FRAME_SECONDS * SAMPLE_RATE)
+    n_frames = total // frame
+    frames = np.asarray(audio[:n_frames * frame], dtype=np.float32).reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+
+    window = max(int(min_silence_seconds / FRAME_SECONDS), 1)
+    energy = np.convolve(rms, np.ones(window) / window, mode="same")
+
+    search = int(search_seconds / FRAME_SECONDS)
+    cuts = [0]
+    boundary = target // frame
+    while boundary + search < n_frames:
+        lo = max(boundary - search, cuts[-1] // frame + 1)
+        hi = min(boundary + search, n_frames - 1)
+        quietest = lo + int(np.argmin(energy[lo:hi]))
+        cuts.append(quietest * frame)
+        boundary = quietest + target // frame
+
+    cuts.append(total)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def merge_chunk_results(chunks: list, results: list) -> dict:
+    """
+    Stitch per-chunk whisper results back into one result with absolute
+    timestamps and contiguous segment ids.
+    """
+    segments = []
+    for (start_sample, _), result in zip(chunks, results):
+        offset = start_sample / SAMPLE_RATE
+        seek_offset = start_sample // HOP_LENGTH
+        for segment in result["segments"]:
+            segment = dict(segment)
+            segment["id"] = len(segments)
+            segment["seek"] = segment.get("seek", 0) + seek_offset
+            segment["start"] = round(segment["start"] + offset, 3)
+            segment["end"] = round(segment["end"] + offset, 3)
+            segments.append(segment)
+
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": results[0].get("language") if results else None
+    }
+
+
+# -------------------------
+# Process pool
+# -------------------------
+
+# Set in the parent before the pool forks, so every child shares the parent's
+# model weights copy-on-write instead of loading its own copy.
+_chunk_model = None
+
+
+def _init_chunk_process(threads: int):
+    torch.set_num_threads(threads)
+
+
+def _transcribe_chunk(pcm_path: str, start: int, end: int, options: dict) -> dict:
+    audio = np.load(pcm_path, mmap_mode="r")
+    result = _chunk_model.transcribe(np.array(audio[start:end]), **options)
+    return {"segments": result["segments"], "language": result.get("language")}
+
+
+class ChunkedTranscriber:
+    """
+    Long-call mode: cut a recording at silences and transcribe the chunks in
+    parallel on a forked process pool that shares the loaded Whisper model.
+    CPU only; CUDA contexts cannot be shared across fork.
+    """
+    def __init__(
+        self,
+        model,
+        workers: int = 4,
+        chunk_seconds: float = 300.0,
+        threads_per_worker: int = 1
+    ):
+        global _chunk_model
+        _chunk_model = model
+
+        self.model = model
+        self.chunk_seconds = chunk_seconds
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_chunk_process,
+            initargs=(threads_per_worker,)
+        )
+        # With fork the pool starts all workers on first submit; do that now,
+        # before the caller starts any threads or opens connections.
+        self.pool.submit(int).result()
+
+    def detect_language(self, audio: np.ndarray) -> str:
+        mel = log_mel_spectrogram(np.array(audio[:30 * SAMPLE_RATE]), self.model.dims.n_mels)
+        mel = pad_or_trim(mel, 3000).to(self.model.device)
+        _, probs = self.model.detect_language(mel)
+        return max(probs, key=probs.get)
+
+    def transcribe(self, pcm_path: str, audio: np.ndarray) -> dict:
+        """
+        Transcribe the PCM stored at `pcm_path` (an .npy file that must stay
+        in place until this returns, see PcmCache.pinned). `audio` is the
+        same array, used here only to pick the cut points.
+        """
+        chunks = split_on_silence(
+            audio,
+            target_chunk_seconds=self.chunk_seconds,
+            search_seconds=self.chunk_seconds / 5
+        )
+        options = {"language": self.detect_language(audio), "fp16": False}
+
+        print(f"Long audio: {len(audio) / SAMPLE_RATE:.0f}s in {len(chunks)} chunks")
+        futures = [
+            self.pool.submit(_transcribe_chunk, pcm_path, start, end, options)
+            for start, end in chunks
+        ]
+        return merge_chunk_results(chunks, [future.result() for future in futures])
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,362 @@
+import bisect
+import contextvars
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds; spans DB round trips up to hour-long Whisper runs.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# -------------------------
+# Metric types
+# -------------------------
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.label_names)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key: tuple, value) -> list:
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum and count.
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_sample(self, key: tuple, value) -> list:
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = f'le="{_format_value(float(bound))}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+        labels = _format_labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+# -------------------------
+# Registry
+# -------------------------
+
+class MetricsRegistry:
+    """
+    Process-wide set of metrics, rendered in the Prometheus text format.
+
+    Metrics are created on first use and shared afterwards, so modules can
+    declare the same metric independently. Collectors are callables run at
+    scrape time for values that already live elsewhere (pool and cache
+    stats, limiter state).
+    """
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, labels: tuple, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labels, **kwargs)
+            elif not isinstance(metric, cls) or metric.label_names != tuple(labels):
+                raise ValueError(f"Metric {name} already registered with a different type or labels")
+            return metric
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str, labels: tuple = ()) -> Gauge:
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def register_stats(self, prefix: str, stats_fn, counters: tuple = (), **labels):
+        """
+        Export every numeric entry of the dict returned by `stats_fn()` as
+        `<prefix>_<key>`; keys listed in `counters` are typed as counters,
+        the rest as gauges. The same prefix may be registered several times
+        with different labels (e.g. one cache per namespace); the samples
+        are rendered together as one metric family.
+        """
+        names = tuple(labels)
+        values = tuple(labels.values())
+
+        def collect():
+            samples = []
+            for key, value in stats_fn().items():
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    continue
+                name = f"{prefix}_{key}"
+                kind = "counter" if key in counters else "gauge"
+                samples.append((name, kind, f"{name}{_format_labels(names, values)} {_format_value(value)}"))
+            return samples
+
+        with self._lock:
+            self._collectors.append((prefix, collect))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        # Collected samples grouped by metric name, so each family gets a
+        # single HELP/TYPE header however many collectors report it.
+        families = {}
+        for prefix, collect in collectors:
+            try:
+                samples = collect()
+            except Exception as e:
+                lines.append(f"# collector {prefix} failed: {_escape(e)}")
+                continue
+            for name, kind, sample in samples:
+                families.setdefault(name, (prefix, kind, []))[2].append(sample)
+        for name, (prefix, kind, samples) in families.items():
+            lines.append(f"# HELP {name} {name[len(prefix) + 1:]} from {prefix} stats.")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+register_stats = REGISTRY.register_stats
+
+STAGE_SECONDS = histogram("pipeline_stage_seconds", "Time spent in each pipeline stage.", ("stage",))
+STAGE_TOTAL = counter("pipeline_stage_total", "Pipeline stage runs by outcome.", ("stage", "outcome"))
+STAGE_IN_FLIGHT = gauge("pipeline_stage_in_flight", "Pipeline stage runs in progress.", ("stage",))
+
+# Callables receiving (stage, seconds) for every stage timing, for tools
+# that need raw samples rather than histogram buckets (benchmarks).
+_stage_listeners = []
+
+
+def add_stage_listener(listener):
+    _stage_listeners.append(listener)
+
+
+def _record_stage(stage_name: str, seconds: float, outcome: str):
+    STAGE_SECONDS.observe(seconds, stage=stage_name)
+    STAGE_TOTAL.inc(stage=stage_name, outcome=outcome)
+    for listener in _stage_listeners:
+        listener(stage_name, seconds)
+
+
+# -------------------------
+# HTTP endpoint
+# -------------------------
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def serve_from_env(default_port: int, offset: int = 0):
+    """
+    Start the endpoint on METRICS_PORT (or `default_port`) + `offset`, so
+    forked workers of one service each get their own port. METRICS_PORT=0
+    disables it.
+    """
+    port = int(os.getenv("METRICS_PORT", str(default_port)))
+    if port == 0:
+        return None
+    try:
+        return start_http_server(port + offset, os.getenv("METRICS_HOST", "127.0.0.1"))
+    except OSError as e:
+        print(f"Could not start metrics endpoint on port {port + offset}: {e}")
+        return None
+
+
+# -------------------------
+# Tracing
+# -------------------------
+
+# Trace ID of the job being handled. asyncio tasks and asyncio.to_thread
+# inherit it; plain thread pools need contextvars.copy_context().
+_current_trace = contextvars.ContextVar("trace_id", default=None)
+TRACE_LOG = os.getenv("METRICS_TRACE_LOG", "1") == "1"
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def current_trace_id():
+    return _current_trace.get()
+
+
+@contextmanager
+def trace(trace_id: str):
+    """
+    Make `trace_id` (from a job message) the current trace for the stages
+    run inside the block.
+    """
+    token = _current_trace.set(trace_id)
+    try:
+        yield
+    finally:
+        _current_trace.reset(token)
+
+
+def trace_event(stage_name: str, seconds: float, trace_id: str = None, **fields):
+    """
+    Log one stage timing of a traced job as a single grep-able line.
+    """
+    trace_id = trace_id or current_trace_id()
+    if not TRACE_LOG or not trace_id:
+        return
+    extra = "".join(f" {key}={value}" for key, value in fields.items() if value is not None)
+    print(f"trace={trace_id} stage={stage_name} seconds={seconds:.3f}{extra}")
+
+
+@contextmanager
+def stage(stage_name: str, trace_id: str = None, **fields):
+    """
+    Time a pipeline stage: latency histogram, run counter by outcome,
+    in-flight gauge, and a trace line for the current job.
+    """
+    STAGE_IN_FLIGHT.inc(stage=stage_name)
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_IN_FLIGHT.dec(stage=stage_name)
+        _record_stage(stage_name, seconds, outcome)
+        trace_event(stage_name, seconds, trace_id, outcome=outcome, **fields)
+
+
+def observe_stage(stage_name: str, seconds: float, trace_id: str = None, **fields):
+    """
+    Record a stage measured elsewhere (e.g. queue wait, or one job's share
+    of a batched run).
+    """
+    _record_stage(stage_name, seconds, "ok")
+    trace_event(stage_name, seconds, trace_id, **fields)
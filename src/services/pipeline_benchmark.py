@@ -0,0 +1,702 @@
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import queue
+import resource
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import wave
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from src.agents.output_parser import CATEGORIES
+from src.agents.prompts.prompt_templates import QUALITY_EVAL_PROMPT
+from src.clients.memory_queue import InMemoryQueueClient
+from src.services import metrics
+from src.services.job_lanes import SHORT_QUEUE, LONG_QUEUE
+
+SAMPLE_RATE = 16000
+
+# Pipeline settings per benchmark mode; a `batch_size` of None takes
+# --batch-size.
+MODES = {
+    "sequential": {"batch_size": 1, "prefetch": 1, "eval": "sync", "warm": False},
+    "batched": {"batch_size": None, "prefetch": 1, "eval": "sync", "warm": False},
+    "concurrent": {"batch_size": 1, "prefetch": 4, "eval": "async", "warm": False},
+    # Replays the same jobs after a warm pass: transcript and evaluation
+    # cache hits only.
+    "cached": {"batch_size": 1, "prefetch": 4, "eval": "async", "warm": True},
+}
+
+
+# -------------------------
+# Database stand-in
+# -------------------------
+
+def _copy(value):
+    # Rows go through JSON like the real client's JSONB columns.
+    return json.loads(json.dumps(value))
+
+
+class InMemoryDB:
+    """
+    Dict-backed stand-in for the PostgresClient methods used by ingestion,
+    the transcription worker and the evaluation agent, so the benchmark
+    measures the pipeline stages rather than a database server.
+    """
+    def __init__(self, prompts: dict = None):
+        self.calls = {}
+        self.audio_files = {}
+        self.content_index = {}
+        self.transcripts = {}
+        self.evaluations = {}
+        self.cache = {}
+        self.prompts = prompts or {
+            "QUALITY_EVAL": {"name": "QUALITY_EVAL", "version": "0.1", "content": QUALITY_EVAL_PROMPT}
+        }
+        self._lock = threading.Lock()
+        self._stats = {"checkouts": 0, "waits": 0, "wait_seconds_total": 0.0, "reconnects": 0}
+
+    @contextmanager
+    def _checkout(self):
+        with self._lock:
+            self._stats["checkouts"] += 1
+            yield
+
+    def pool_stats(self) -> dict:
+        return dict(self._stats)
+
+    def close(self):
+        pass
+
+    def get_audio_files(self, paths: list) -> dict:
+        with self._checkout():
+            return {path: dict(self.audio_files[path]) for path in paths if path in self.audio_files}
+
+    def find_calls_by_content(self, keys: list) -> dict:
+        with self._checkout():
+            return {key: self.content_index[key] for key in keys if key in self.content_index}
+
+    def create_calls(self, calls: list, audio_files: list = None, page_size: int = 1000):
+        with self._checkout():
+            for call_id, audio_path, duration_seconds in calls:
+                self.calls[call_id] = {
+                    "audio_path": audio_path,
+                    "duration_seconds": duration_seconds,
+                    "status": "TRANSCRIPTION_QUEUE",
+                    "error_message": None
+                }
+            for path, content_hash, size_bytes, mtime, call_id, is_duplicate in audio_files or []:
+                self.audio_files[path] = {
+                    "content_hash": content_hash,
+                    "size_bytes": size_bytes,
+                    "mtime": mtime,
+                    "call_id": call_id,
+                    "is_duplicate": is_duplicate
+                }
+                if not is_duplicate:
+                    self.content_index.setdefault((content_hash, size_bytes), call_id)
+            return len(calls)
+
+    def update_call_status(self, call_id: str, status: str, error_message: str = None):
+        with self._checkout():
+            call = self.calls.setdefault(call_id, {})
+            call["status"] = status
+            call["error_message"] = error_message
+            return True
+
+    def complete_transcription(
+        self,
+        call_id: str,
+        transcript_id: str,
+        transcript_text: str,
+        segments: list,
+        timestamped_text: str,
+        model_name: str = "whisper-base",
+        language: str = "en",
+        next_status: str = "EVALUATION_QUEUE"
+    ):
+        row = {
+            "id": transcript_id,
+            "call_id": call_id,
+            "transcript_text": transcript_text,
+            "segments": _copy(list(segments)),
+            "timestamped_text": timestamped_text
+        }
+        with self._checkout():
+            self.transcripts[call_id] = row
+            self.calls.setdefault(call_id, {})["status"] = next_status
+        return transcript_id
+
+    def get_transcript_by_call_id(self, call_id: str):
+        with self._checkout():
+            row = self.transcripts.get(call_id)
+        return _copy(row) if row is not None else None
+
+    def complete_evaluation(
+        self,
+        call_id: str,
+        evaluator_type: str,
+        evaluator_version: str,
+        overall_score: float,
+        category_scores: dict,
+        strengths: list,
+        improvements: list,
+        raw_output: dict,
+        next_status: str = "EVALUATED"
+    ):
+        evaluation_id = str(uuid.uuid4())
+        row = _copy({
+            "id": evaluation_id,
+            "call_id": call_id,
+            "evaluator_type": evaluator_type,
+            "evaluator_version": evaluator_version,
+            "overall_score": overall_score,
+            "category_scores": category_scores,
+            "strengths": strengths,
+            "improvements": improvements,
+            "raw_output": raw_output
+        })
+        with self._checkout():
+            self.evaluations[call_id] = row
+            self.calls.setdefault(call_id, {})["status"] = next_status
+        return evaluation_id
+
+    def cache_get(self, namespace: str, cache_key: str, max_age_seconds: float = None):
+        with self._checkout():
+            entry = self.cache.get((namespace, cache_key))
+            if entry is None:
+                return None
+            if max_age_seconds is not None and time.time() - entry["created_at"] > max_age_seconds:
+                return None
+            entry["last_used_at"] = time.time()
+            payload = entry["payload"]
+        return json.loads(payload)
+
+    def cache_put(self, namespace: str, cache_key: str, payload: dict):
+        data = json.dumps(payload)
+        now = time.time()
+        with self._checkout():
+            self.cache[(namespace, cache_key)] = {"payload": data, "created_at": now, "last_used_at": now}
+        return True
+
+    def cache_evict(self, namespace: str, max_bytes: int = None, max_age_seconds: float = None) -> int:
+        now = time.time()
+        with self._checkout():
+            entries = sorted(
+                ((key, entry) for key, entry in self.cache.items() if key[0] == namespace),
+                key=lambda item: item[1]["last_used_at"]
+            )
+            total = sum(len(entry["payload"]) for _, entry in entries)
+            evicted = 0
+            for key, entry in entries:
+                expired = max_age_seconds is not None and now - entry["created_at"] > max_age_seconds
+                if not expired and (max_bytes is None or total <= max_bytes):
+                    continue
+                total -= len(entry["payload"])
+                del self.cache[key]
+                evicted += 1
+            return evicted
+
+    def get_active_prompt(self, name: str) -> dict:
+        prompt = self.prompts.get(name)
+        return dict(prompt) if prompt is not None else None
+
+
+# -------------------------
+# LLM stub server
+# -------------------------
+
+def sample_evaluation() -> dict:
+    return {
+        "overall_score": 4,
+        "category_scores": {
+            name: {
+                "score": 4,
+                "explanation": "The agent handled this part of the call clearly and politely.",
+                "evidence": "[00:00:05] Thank you for calling, how can I help you today?"
+            }
+            for name in CATEGORIES
+        },
+        "strengths": ["Clear greeting", "Resolved the billing issue on the call"],
+        "areas_for_improvement": ["Confirm the customer's details earlier"]
+    }
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/v1/models":
+            self.send_error(404)
+            return
+        self._send_json({"object": "list", "data": [{"id": self.server.stub.model, "object": "model"}]})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        try:
+            self.server.stub.respond(self, request)
+        except (BrokenPipeError, ConnectionResetError):
+            # The agent stops reading once the JSON object closes.
+            pass
+
+    def _send_json(self, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubLLMServer:
+    """
+    Minimal OpenAI-compatible chat completions server that always answers
+    with the same valid evaluation. Latency is configurable:
+    `first_token_latency` before the first token, then `token_latency` per
+    streamed token of `chars_per_token` characters. `capacity` caps the
+    requests generated at once, like an inference server's batch; requests
+    beyond it wait.
+    """
+    def __init__(
+        self,
+        first_token_latency: float = 0.3,
+        token_latency: float = 0.002,
+        capacity: int = None,
+        chars_per_token: int = 4,
+        model: str = "benchmark-stub",
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.chars_per_token = chars_per_token
+        self.model = model
+        self.host = host
+        self.port = port
+        self._slots = threading.BoundedSemaphore(capacity) if capacity else None
+        self._lock = threading.Lock()
+        self._active = 0
+        self.requests = 0
+        self.peak_concurrency = 0
+        self._server = None
+        self.content = json.dumps(sample_evaluation(), indent=2)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self._server.server_address[1]}/v1"
+
+    def start(self) -> str:
+        self._server = ThreadingHTTPServer((self.host, self.port), _StubHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        threading.Thread(target=self._server.serve_forever, name="llm-stub", daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self.requests, "peak_concurrency": self.peak_concurrency}
+
+    def _chunk(self, delta: dict, finish_reason: str = None) -> bytes:
+        body = {
+            "id": "chatcmpl-benchmark",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": self.model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(body)}\n\n".encode()
+
+    def respond(self, handler: BaseHTTPRequestHandler, request: dict):
+        pieces = [
+            self.content[i:i + self.chars_per_token]
+            for i in range(0, len(self.content), self.chars_per_token)
+        ]
+        with self._slots or nullcontext():
+            with self._lock:
+                self.requests += 1
+                self._active += 1
+                self.peak_concurrency = max(self.peak_concurrency, self._active)
+            try:
+                time.sleep(self.first_token_latency)
+                if request.get("stream"):
+                    self._stream(handler, pieces)
+                else:
+                    time.sleep(self.token_latency * len(pieces))
+                    handler._send_json({
+                        "id": "chatcmpl-benchmark",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": self.model,
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": self.content},
+                            "finish_reason": "stop"
+                        }],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": len(pieces), "total_tokens": len(pieces)}
+                    })
+            finally:
+                with self._lock:
+                    self._active -= 1
+
+    def _stream(self, handler: BaseHTTPRequestHandler, pieces: list):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        handler.wfile.write(self._chunk({"role": "assistant", "content": ""}))
+        for i, piece in enumerate(pieces):
+            if i:
+                time.sleep(self.token_latency)
+            handler.wfile.write(self._chunk({"content": piece}))
+            handler.wfile.flush()
+        handler.wfile.write(self._chunk({}, finish_reason="stop"))
+        handler.wfile.write(b"data: [DONE]\n\n")
+        handler.wfile.flush()
+
+
+# -------------------------
+# Synthetic audio
+# -------------------------
+
+def _speech_like(start: int, count: int, seed: int) -> np.ndarray:
+    """
+    Voiced harmonics with a gliding pitch, modulated at a syllable rate and
+    broken into 2 s turns with 0.5 s pauses, plus a little noise.
+    """
+    rng = np.random.default_rng(seed * 1_000_003 + start)
+    t = (start + np.arange(count)) / SAMPLE_RATE
+    base = 110 + 10 * (seed % 7)
+    phase = 2 * np.pi * (base * t - 30 / (2 * np.pi * 0.3) * np.cos(2 * np.pi * 0.3 * t))
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    syllables = 0.5 * (1 + np.sin(2 * np.pi * 4 * t))
+    turns = (t % 2.5) < 2.0
+    audio = 0.25 * voice * syllables * turns + 0.01 * rng.standard_normal(count)
+    return audio.astype(np.float32)
+
+
+def write_call_audio(path: str, seconds: float, seed: int, source: np.ndarray = None, block_seconds: int = 60):
+    """
+    Write a 16 kHz mono 16-bit WAV of `seconds`, block by block so hour-long
+    calls do not need to fit in memory. With `source` (16 kHz float PCM),
+    that recording is tiled instead, starting at a seed-dependent offset so
+    every call has different content.
+    """
+    total = int(seconds * SAMPLE_RATE)
+    block = block_seconds * SAMPLE_RATE
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        for start in range(0, total, block):
+            count = min(block, total - start)
+            if source is not None:
+                offset = seed * 7919 * SAMPLE_RATE // 1000
+                audio = source[(offset + start + np.arange(count)) % len(source)]
+            else:
+                audio = _speech_like(start, count, seed)
+            f.writeframes((np.clip(audio, -1, 1) * 32767).astype("<i2").tobytes())
+
+
+def write_calls(directory: str, durations: list, calls: int, seed: int = 0, source_path: str = None) -> list:
+    """
+    Write `calls` WAV files whose lengths cycle through `durations`. Every
+    file has distinct content, so ingestion does not dedupe them.
+    """
+    source = None
+    if source_path:
+        import whisper
+        source = whisper.load_audio(source_path)
+
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(calls):
+        seconds = durations[i % len(durations)]
+        path = os.path.join(directory, f"call_{i:04d}_{seconds:g}s.wav")
+        write_call_audio(path, seconds, seed + i, source)
+        paths.append(path)
+    return paths
+
+
+# -------------------------
+# Benchmark run
+# -------------------------
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: dict) -> dict:
+    return {
+        stage: {
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99)
+        }
+        for stage, values in sorted(samples.items()) if values
+    }
+
+
+def transcribe_all(worker, mq: InMemoryQueueClient, batch_size: int) -> int:
+    """
+    Work through both transcription lanes, short first, the way the
+    consumers hand batches to the worker. Returns the number of failed jobs.
+    """
+    failures = 0
+    while True:
+        jobs = mq.drain([SHORT_QUEUE, LONG_QUEUE], batch_size)
+        if not jobs:
+            return failures
+        failures += len(worker.process_transcription_batch(jobs))
+
+
+async def _evaluate_async(agent, messages: list) -> int:
+    results = await asyncio.gather(
+        *(agent.aprocess_evaluation_job(message) for message in messages),
+        return_exceptions=True
+    )
+    return sum(isinstance(result, Exception) for result in results)
+
+
+def evaluate_all(agent, mq: InMemoryQueueClient, mode: str) -> int:
+    messages = mq.drain("evaluation_jobs")
+    if mode == "async":
+        return asyncio.run(_evaluate_async(agent, messages))
+
+    failures = 0
+    for message in messages:
+        try:
+            agent.process_evaluation_job(message)
+        except Exception as e:
+            print("Evaluation failed:", e)
+            failures += 1
+    return failures
+
+
+def run_mode(mode: str, paths: list, options: dict) -> dict:
+    """
+    Run ingestion, transcription and evaluation over `paths` in this process
+    and return throughput, per-stage latency percentiles and peak RSS.
+    """
+    os.environ["LLM_BASE_URL"] = options["llm_url"]
+    os.environ["LLM_API_KEY"] = "benchmark"
+    metrics.TRACE_LOG = options["verbose"]
+
+    from src.agents.concurrency import AdaptiveConcurrencyLimiter
+    from src.agents.eval_agent import CallQualityAgent
+    from src.agents.prompt_registry import PromptRegistry
+    from src.clients.postgres_client import PostgresClient
+    from src.services.dedupe import AudioDedupeStore
+    from src.services.ingestion import ingest_batch
+    from src.services.result_cache import ResultCache
+    from src.services.transcription import PcmCache, TranscriptionWorker
+
+    settings = MODES[mode]
+    batch_size = settings["batch_size"] or options["batch_size"]
+
+    samples = {}
+    metrics.add_stage_listener(lambda stage, seconds: samples.setdefault(stage, []).append(seconds))
+
+    db = PostgresClient(maxconn=16) if options["postgres"] else InMemoryDB()
+    mq = InMemoryQueueClient()
+    worker = TranscriptionWorker(
+        model_name=options["whisper_model"],
+        MQClient=mq,
+        DBClient=db,
+        batch_size=batch_size,
+        prefetch=settings["prefetch"],
+        pcm_cache=PcmCache(cache_dir=os.path.join(options["workdir"], f"pcm_{mode}")),
+        transcript_cache=ResultCache(db, namespace="transcript")
+    )
+    agent = CallQualityAgent(
+        db=db,
+        mq=mq,
+        evaluation_cache=ResultCache(db, namespace="evaluation"),
+        limiter=AdaptiveConcurrencyLimiter(initial=options["eval_concurrency"], max_limit=options["eval_concurrency"]),
+        prompts=PromptRegistry(db, ["QUALITY_EVAL"], listen=False)
+    )
+    store = AudioDedupeStore(db)
+
+    start = time.perf_counter()
+    queued, _, _ = ingest_batch(paths, store, mq)
+    jobs = {name: mq.drain(name) for name in (SHORT_QUEUE, LONG_QUEUE)}
+
+    if settings["warm"]:
+        for queue_name, messages in jobs.items():
+            mq.publish_many(queue_name, messages)
+        transcribe_all(worker, mq, max(batch_size, settings["prefetch"]))
+        evaluate_all(agent, mq, settings["eval"])
+        # Replay the same jobs; the timed run starts at the transcription queues.
+        samples.clear()
+        start = time.perf_counter()
+    for queue_name, messages in jobs.items():
+        mq.publish_many(queue_name, messages)
+
+    transcribe_start = time.perf_counter()
+    failures = transcribe_all(worker, mq, max(batch_size, settings["prefetch"]))
+    evaluate_start = time.perf_counter()
+    failures += evaluate_all(agent, mq, settings["eval"])
+    end = time.perf_counter()
+
+    seconds = end - start
+    completed = queued - failures
+    audio_seconds = sum(message.get("duration_seconds") or 0 for messages in jobs.values() for message in messages)
+    return {
+        "mode": mode,
+        "calls": queued,
+        "failures": failures,
+        "seconds": seconds,
+        "transcription_seconds": evaluate_start - transcribe_start,
+        "evaluation_seconds": end - evaluate_start,
+        "calls_per_minute": 60 * completed / seconds if seconds else 0.0,
+        "audio_seconds_per_second": audio_seconds / seconds if seconds else 0.0,
+        # Linux reports kilobytes.
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stages": summarize(samples)
+    }
+
+
+def _mode_process(mode: str, paths: list, options: dict, results):
+    if not options["verbose"]:
+        sys.stdout = open(os.devnull, "w")
+    try:
+        results.put(run_mode(mode, paths, options))
+    except Exception as e:
+        results.put({"mode": mode, "error": repr(e)})
+
+
+def run_isolated(mode: str, paths: list, options: dict) -> dict:
+    """
+    Run one mode in a fresh spawned process, so its peak RSS is its own and
+    no model or cache state carries over from the previous mode.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_mode_process, args=(mode, paths, options, results), name=f"bench-{mode}")
+    process.start()
+    while True:
+        try:
+            result = results.get(timeout=1.0)
+            break
+        except queue.Empty:
+            if not process.is_alive():
+                result = {"mode": mode, "error": f"exited with code {process.exitcode}"}
+                break
+    process.join()
+    return result
+
+
+def print_report(results: list, llm_stats: dict):
+    print()
+    print(f"{'mode':<12}{'calls':>7}{'failed':>8}{'wall s':>10}{'calls/min':>11}{'audio x':>9}{'peak MB':>9}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['mode']:<12} failed: {result['error']}")
+            continue
+        print(
+            f"{result['mode']:<12}{result['calls']:>7}{result['failures']:>8}{result['seconds']:>10.1f}"
+            f"{result['calls_per_minute']:>11.2f}{result['audio_seconds_per_second']:>9.1f}{result['peak_rss_mb']:>9.0f}"
+        )
+
+    for result in results:
+        if "error" in result:
+            continue
+        print(
+            f"\n{result['mode']}: transcription {result['transcription_seconds']:.1f}s, "
+            f"evaluation {result['evaluation_seconds']:.1f}s"
+        )
+        print(f"  {'stage':<16}{'count':>7}{'p50 s':>10}{'p95 s':>10}{'p99 s':>10}")
+        for stage, stats in result["stages"].items():
+            print(f"  {stage:<16}{stats['count']:>7}{stats['p50']:>10.3f}{stats['p95']:>10.3f}{stats['p99']:>10.3f}")
+
+    print(f"\nLLM stub: {llm_stats['requests']} requests, peak concurrency {llm_stats['peak_concurrency']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline throughput benchmark")
+    parser.add_argument("--calls", type=int, default=12)
+    parser.add_argument("--durations", default="15,60,240,900", help="call lengths in seconds, cycled")
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated subset of " + ", ".join(MODES))
+    parser.add_argument("--whisper-model", default="tiny")
+    parser.add_argument("--batch-size", type=int, default=8, help="Whisper batch size of the batched mode")
+    parser.add_argument("--eval-concurrency", type=int, default=8, help="in-flight LLM requests in async modes")
+    parser.add_argument("--llm-first-token", type=float, default=0.3, help="stub latency to the first token (s)")
+    parser.add_argument("--llm-token-latency", type=float, default=0.002, help="stub latency per token (s)")
+    parser.add_argument("--llm-capacity", type=int, default=None, help="stub requests generated at once")
+    parser.add_argument("--source", help="real recording to tile instead of synthetic speech-like audio")
+    parser.add_argument("--postgres", action="store_true", help="use the Postgres from POSTGRES_* instead of the in-memory stand-in")
+    parser.add_argument("--workdir", help="where audio and PCM caches are written (default: a temp dir)")
+    parser.add_argument("--output", help="also write the results as JSON to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep the pipeline's own logging")
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+    durations = [float(value) for value in args.durations.split(",")]
+
+    llm = StubLLMServer(
+        first_token_latency=args.llm_first_token,
+        token_latency=args.llm_token_latency,
+        capacity=args.llm_capacity
+    )
+    workdir = args.workdir or tempfile.mkdtemp(prefix="pipeline_bench_")
+    options = {
+        "llm_url": llm.start(),
+        "whisper_model": args.whisper_model,
+        "batch_size": args.batch_size,
+        "eval_concurrency": args.eval_concurrency,
+        "postgres": args.postgres,
+        "workdir": workdir,
+        "verbose": args.verbose
+    }
+    print(f"LLM stub on {options['llm_url']}, work dir {workdir}")
+
+    results = []
+    try:
+        for index, mode in enumerate(modes):
+            # Fresh files per mode: with Postgres, files ingested by an
+            # earlier mode would otherwise be skipped as already known.
+            print(f"Writing {args.calls} calls for mode '{mode}'...")
+            paths = write_calls(
+                os.path.join(workdir, f"audio_{mode}"),
+                durations,
+                args.calls,
+                seed=index * args.calls,
+                source_path=args.source
+            )
+            print(f"Running mode '{mode}'...")
+            results.append(run_isolated(mode, paths, options))
+    finally:
+        llm.stop()
+
+    print_report(results, llm.stats())
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"options": vars(args), "results": results, "llm": llm.stats()}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
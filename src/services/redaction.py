@@ -0,0 +1,244 @@
+import re
+import threading
+import time
+
+# One alternation, compiled once: a single scan finds every kind of PII.
+# Order matters where patterns overlap (cards and SSNs before phones).
+PII_PATTERN = re.compile(
+    r"(?P<EMAIL>\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b)"
+    r"|(?P<CARD>\b\d(?:[ -]?\d){12,18}\b)"
+    r"|(?P<SSN>\b\d{3}[- ]\d{2}[- ]\d{4}\b)"
+    r"|(?P<PHONE>(?:\+\d{1,3}[ .-]?)?(?:\(\d{3}\)[ .-]?|\b\d{3}[ .-])\d{3}[ .-]\d{4}\b"
+    r"|\+\d{1,3}(?:[ .-]?\d){7,12}\b"
+    r"|\b\d{10,}\b)"
+)
+
+DEFAULT_NER_LABELS = ("PERSON", "GPE", "LOC", "FAC")
+
+# spaCy models are large; load each one once per process and share it.
+_nlp_models = {}
+_nlp_lock = threading.Lock()
+
+
+def load_nlp(model_name: str):
+    with _nlp_lock:
+        if model_name not in _nlp_models:
+            import spacy
+            print(f"Loading spaCy model '{model_name}' for PII redaction...")
+            _nlp_models[model_name] = spacy.load(
+                model_name,
+                disable=["tagger", "parser", "attribute_ruler", "lemmatizer", "senter"]
+            )
+        return _nlp_models[model_name]
+
+
+def luhn_valid(digits: str) -> bool:
+    total = 0
+    for i, d in enumerate(reversed(digits)):
+        n = int(d)
+        if i % 2:
+            n = n * 2 - 9 if n > 4 else n * 2
+        total += n
+    return total % 10 == 0
+
+
+class RedactionEngine:
+    """
+    Redacts PII from a whisper transcript: its segments, and the text built
+    from them, so `text`, `segments` and the rendered `timestamped_text` all
+    agree.
+
+    The pattern tier scans the concatenated segment texts once, so a number
+    split across two segments is still caught. With `ner=True` a spaCy model
+    additionally tags names and places; all segments of a call go through
+    one batched `nlp.pipe` call.
+    """
+    def __init__(
+        self,
+        ner: bool = False,
+        nlp_model: str = "en_core_web_lg",
+        ner_labels: tuple = DEFAULT_NER_LABELS,
+        batch_size: int = 256
+    ):
+        self.ner = ner
+        self.nlp_model = nlp_model
+        self.ner_labels = set(ner_labels)
+        self.batch_size = batch_size
+        self.nlp = load_nlp(nlp_model) if ner else None
+
+    @property
+    def version(self) -> str:
+        """
+        Identifies the redaction settings, for cache keys.
+        """
+        return f"regex+ner:{self.nlp_model}" if self.ner else "regex"
+
+    @staticmethod
+    def _label(match) -> str:
+        label = match.lastgroup
+        if label == "CARD":
+            digits = re.sub(r"\D", "", match.group())
+            return "CARD" if luhn_valid(digits) else "NUMBER"
+        return label
+
+    def pattern_spans(self, text: str) -> list:
+        return [(m.start(), m.end(), self._label(m)) for m in PII_PATTERN.finditer(text)]
+
+    def ner_spans(self, texts: list) -> list:
+        """
+        Entity spans for each text, from one batched pass of the NLP model.
+        """
+        spans = []
+        for doc in self.nlp.pipe(texts, batch_size=self.batch_size):
+            spans.append([
+                (ent.start_char, ent.end_char, ent.label_)
+                for ent in doc.ents if ent.label_ in self.ner_labels
+            ])
+        return spans
+
+    @staticmethod
+    def apply_spans(text: str, spans: list) -> str:
+        """
+        Replace (start, end, label) spans with [REDACTED_<label>]; a None
+        label removes the span without a marker. A span starting inside an
+        earlier one (e.g. an NER entity and a pattern match over the same
+        text) extends that redaction rather than being dropped.
+        """
+        out = []
+        pos = 0
+        for start, end, label in sorted(spans, key=lambda span: (span[0], span[1])):
+            if start < pos:
+                pos = max(pos, end)
+                continue
+            out.append(text[pos:start])
+            if label is not None:
+                out.append(f"[REDACTED_{label}]")
+            pos = end
+        out.append(text[pos:])
+        return "".join(out)
+
+    def redact_text(self, text: str) -> str:
+        spans = self.pattern_spans(text)
+        if self.nlp is not None:
+            spans += self.ner_spans([text])[0]
+        return self.apply_spans(text, spans)
+
+    def redact_transcript(self, transcript: dict) -> dict:
+        """
+        Return a copy of `transcript` with PII replaced by [REDACTED_<TYPE>]
+        in every segment and in `text`. Redacted segments lose their
+        `tokens`, which would otherwise still decode to the original words.
+        """
+        segments = transcript.get("segments") or []
+        if not segments:
+            return {**transcript, "text": self.redact_text(transcript.get("text", ""))}
+
+        texts = [segment["text"] for segment in segments]
+        starts = []
+        offset = 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text)
+
+        per_segment = [[] for _ in segments]
+        # A match crossing a segment boundary is cut at the boundary; the
+        # label goes to the segment where it starts and the rest is removed.
+        index = 0
+        for start, end, label in self.pattern_spans("".join(texts)):
+            while index + 1 < len(starts) and starts[index + 1] <= start:
+                index += 1
+            i = index
+            while i < len(segments) and starts[i] < end:
+                seg_start = max(start, starts[i]) - starts[i]
+                seg_end = min(end, starts[i] + len(texts[i])) - starts[i]
+                if seg_end > seg_start:
+                    per_segment[i].append((seg_start, seg_end, label if starts[i] <= start else None))
+                i += 1
+
+        if self.nlp is not None:
+            for spans, entities in zip(per_segment, self.ner_spans(texts)):
+                spans.extend(entities)
+
+        redacted = []
+        for segment, text, spans in zip(segments, texts, per_segment):
+            if not spans:
+                redacted.append(segment)
+                continue
+            segment = {key: value for key, value in segment.items() if key != "tokens"}
+            segment["text"] = self.apply_spans(text, spans)
+            redacted.append(segment)
+
+        return {
+            **transcript,
+            "segments": redacted,
+            "text": "".join(segment["text"] for segment in redacted)
+        }
+
+
+# -------------------------
+# Benchmark
+# -------------------------
+
+SAMPLE_LINES = (
+    " Thank you for calling, my name is Alex, how can I help you today?",
+    " Hi, yes, I was charged twice on my card ending 4242.",
+    " Can you confirm the email on the account? It's jane.doe@example.com.",
+    " Sure, and the phone number is (415) 555-0134.",
+    " Okay, and for verification, my card number is 4111 1111 1111 1111.",
+    " I can see the two charges here, I'll refund one of them now.",
+    " Great, and my social is 123-45-6789 if you need it.",
+    " No need, that's everything. Is there anything else I can help with?",
+)
+
+
+def synthetic_transcript(segments: int) -> dict:
+    items = []
+    for i in range(segments):
+        items.append({
+            "id": i,
+            "start": i * 3.0,
+            "end": i * 3.0 + 2.5,
+            "text": SAMPLE_LINES[i % len(SAMPLE_LINES)],
+            "tokens": list(range(12))
+        })
+    return {"text": "".join(s["text"] for s in items), "segments": items, "language": "en"}
+
+
+def benchmark(ner: bool = False, calls: int = 200, segments: int = 300, nlp_model: str = "en_core_web_lg"):
+    engine = RedactionEngine(ner=ner, nlp_model=nlp_model)
+    transcript = synthetic_transcript(segments)
+    engine.redact_transcript(transcript)  # warm-up
+
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        engine.redact_transcript(transcript)
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    print(
+        f"Redaction ({engine.version}), {segments} segments/call over {calls} calls: "
+        f"mean {1000 * sum(timings) / calls:.2f} ms, "
+        f"p50 {1000 * timings[calls // 2]:.2f} ms, "
+        f"p95 {1000 * timings[int(calls * 0.95) - 1]:.2f} ms"
+    )
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="PII redaction engine")
+    parser.add_argument("--benchmark", action="store_true", help="time redaction of synthetic calls")
+    parser.add_argument("--ner", action="store_true", help="include the spaCy NER tier")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--segments", type=int, default=300)
+    parser.add_argument("--model", default="en_core_web_lg")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(ner=args.ner, calls=args.calls, segments=args.segments, nlp_model=args.model)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
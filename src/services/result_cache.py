@@ -0,0 +1,75 @@
+import hashlib
+import json
+import threading
+from src.clients.postgres_client import PostgresClient
+
+
+class ResultCache:
+    """
+    Content-addressed cache of expensive results (transcripts, evaluations)
+    in the `result_cache` table, shared by every worker.
+
+    Entries are LRU-evicted once a namespace exceeds `max_bytes` and, if
+    `ttl_seconds` is set, expire after that age. Hit/miss counters are kept
+    per process.
+    """
+    def __init__(
+        self,
+        db: PostgresClient,
+        namespace: str,
+        max_bytes: int = 1024 ** 3,
+        ttl_seconds: float = None,
+        enabled: bool = True,
+        evict_every: int = 100
+    ):
+        self.db = db
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.evict_every = evict_every
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """
+        Stable key for any JSON-serializable parts.
+        """
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: str):
+        if not self.enabled:
+            return None
+
+        payload = self.db.cache_get(self.namespace, key, self.ttl_seconds)
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return payload
+
+    def put(self, key: str, payload: dict):
+        if not self.enabled:
+            return
+
+        self.db.cache_put(self.namespace, key, payload)
+        with self._lock:
+            self._puts += 1
+            evict = self._puts % self.evict_every == 0
+
+        if evict:
+            self.db.cache_evict(self.namespace, self.max_bytes, self.ttl_seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
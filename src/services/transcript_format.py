@@ -0,0 +1,168 @@
+import re
+import tiktoken
+
+FILLER_WORDS = {"uh", "um", "umm", "uhm", "er", "ah", "hmm", "mm", "mhm", "mm-hmm", "uh-huh"}
+
+# Three or more back-to-back exact repeats of a multi-word phrase, the
+# typical Whisper hallucination loop ("thank you. thank you. thank you."),
+# or of a filler word. Single words ("no, no, no", "very very") and anything
+# with digits (phone and account numbers) are what was said and are kept.
+_LETTERS = r"[^\W\d_]+(?:'[^\W\d_]+)*"
+_SEPARATOR = r"[\s,.!?-]+"
+_PHRASE_REPEAT_RE = re.compile(
+    rf"\b({_LETTERS}(?: {_LETTERS}){{1,7}}?)(?:{_SEPARATOR}\1\b){{2,}}",
+    re.IGNORECASE
+)
+_FILLER_REPEAT_RE = re.compile(
+    r"\b(" + "|".join(re.escape(word) for word in sorted(FILLER_WORDS, key=len, reverse=True)) + rf")(?:{_SEPARATOR}\1\b){{2,}}",
+    re.IGNORECASE
+)
+_WORD_RE = re.compile(r"[\w'-]+")
+_DIGIT_RE = re.compile(r"\d")
+
+
+def format_timestamp(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+def collapse_repeats(text: str) -> str:
+    text = _PHRASE_REPEAT_RE.sub(r"\1", text)
+    return _FILLER_REPEAT_RE.sub(r"\1", text)
+
+
+def _normalized(text: str) -> str:
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def _is_filler(text: str) -> bool:
+    words = _WORD_RE.findall(text.lower())
+    return bool(words) and all(word in FILLER_WORDS for word in words)
+
+
+def _looped_segments(texts: list) -> set:
+    """
+    Indexes of segments to drop as a loop: every repeat after the first in
+    a run of three or more consecutive non-empty segments with the same
+    multi-word or filler text, the segment-level form of collapse_repeats.
+    """
+    looped = set()
+    run = []
+    for i, text in enumerate(texts + [None]):
+        if text == "":
+            continue
+        normalized = _normalized(text) if text is not None else None
+        if run and normalized == run[0][1]:
+            run.append((i, normalized))
+            continue
+        if len(run) >= 3:
+            words = run[0][1].split()
+            # Repeated digits are read-out numbers, not a loop.
+            if (len(words) > 1 or _is_filler(run[0][1])) and not _DIGIT_RE.search(run[0][1]):
+                looped.update(index for index, _ in run[1:])
+        run = [(i, normalized)]
+    return looped
+
+
+class TranscriptFormatter:
+    """
+    Renders whisper segments as the "<timestamp> <text>" lines the evaluation
+    prompt quotes as evidence.
+
+    The default rendering is one line per segment with the raw start time.
+    Compact mode uses mm:ss timestamps, merges adjacent segments (gap under
+    `max_gap` seconds) into lines of up to `merge_chars` characters and, with
+    `collapse`, drops multi-word segments repeated three or more times in a
+    row, runs of filler-only segments and in-segment phrase loops. Each line still starts with the timestamp of its
+    first segment.
+    """
+    def __init__(
+        self,
+        compact: bool = False,
+        merge_chars: int = 200,
+        max_gap: float = 1.0,
+        collapse: bool = True,
+        report_encoding: str = "cl100k_base"
+    ):
+        self.compact = compact
+        self.merge_chars = merge_chars
+        self.max_gap = max_gap
+        self.collapse = collapse
+        self.report_encoding = report_encoding
+        self._encoding = None
+
+    def render_raw(self, segments: list) -> str:
+        lines = []
+
+        for seg in segments:
+            ts = seg["start"]
+            text = seg["text"].strip()
+
+            if not text:
+                continue
+
+            lines.append(f"{ts} {text}")
+
+        return "\n".join(lines)
+
+    def render_compact(self, segments: list) -> str:
+        lines = []
+        start, parts, end = None, [], None
+        previous = None
+
+        texts = [seg["text"].strip() for seg in segments]
+        looped = set()
+        if self.collapse:
+            texts = [collapse_repeats(text) for text in texts]
+            looped = _looped_segments(texts)
+
+        for i, seg in enumerate(segments):
+            text = texts[i]
+            if self.collapse and text:
+                if i in looped or (_is_filler(text) and previous is not None and _is_filler(previous)):
+                    end = seg["end"]
+                    continue
+                previous = _normalized(text)
+            if not text:
+                continue
+
+            length = sum(len(part) + 1 for part in parts)
+            if parts and (seg["start"] - end > self.max_gap or length + len(text) > self.merge_chars):
+                lines.append(f"{format_timestamp(start)} {' '.join(parts)}")
+                parts = []
+
+            if not parts:
+                start = seg["start"]
+            parts.append(text)
+            end = seg["end"]
+
+        if parts:
+            lines.append(f"{format_timestamp(start)} {' '.join(parts)}")
+
+        return "\n".join(lines)
+
+    def count_tokens(self, text: str):
+        if self._encoding is None:
+            try:
+                self._encoding = tiktoken.get_encoding(self.report_encoding)
+            except Exception as e:
+                print(f"Token report disabled, could not load '{self.report_encoding}': {e}")
+                self._encoding = False
+        if self._encoding is False:
+            return None
+        return len(self._encoding.encode(text))
+
+    def render(self, segments: list) -> str:
+        if not self.compact:
+            return self.render_raw(segments)
+
+        text = self.render_compact(segments)
+        before = self.count_tokens(self.render_raw(segments))
+        if before:
+            after = self.count_tokens(text)
+            print(f"Transcript tokens: {before} -> {after} ({100 * (before - after) / before:.0f}% fewer)")
+        return text
@@ -1,92 +1,603 @@
 import whisper
 import torch
+import numpy as np
 from src.clients.rabbitmq_client import RabbitMQClient
-from src.clients.postgres_client import PostgresClient
+from src.clients.postgres_client import PostgresClient, POOL_STAT_COUNTERS
+from src.services.batched_transcription import BatchedTranscriber
+from src.services.long_audio import ChunkedTranscriber
+from src.services.result_cache import ResultCache
+from src.services.transcript_format import TranscriptFormatter
+from src.services.redaction import RedactionEngine
+from src.services.dedupe import content_hash
+from src.services.job_lanes import DEFAULT_LANES, lane_weights
+from src.services import metrics
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
+import hashlib
+import tempfile
 import uuid
 import os
-import re
-from tenacity import retry, stop_after_attempt, wait_exponential
+import time
 
 from dotenv import load_dotenv
 load_dotenv()
 
+PCM_CACHE_LOOKUPS = metrics.counter("pcm_cache_lookups_total", "Decoded-audio cache lookups.", ("result",))
+
+
+# -------------------------
+# Audio decode pipeline
+# -------------------------
+
+class PcmCache:
+    """
+    Decoded 16 kHz mono PCM stored as .npy files and memory-mapped on read,
+    so retries and re-deliveries of a job skip the ffmpeg decode.
+    Files are evicted least-recently-used once the cache exceeds max_bytes.
+    """
+    def __init__(self, cache_dir: str = None, max_bytes: int = 2 * 1024 ** 3):
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "qa_pcm_cache")
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path_for(self, audio_path: str) -> str:
+        stat = os.stat(audio_path)
+        key = f"{audio_path}:{stat.st_size}:{stat.st_mtime_ns}".encode()
+        return os.path.join(self.cache_dir, hashlib.sha1(key).hexdigest() + ".npy")
+
+    def load(self, audio_path: str) -> np.ndarray:
+        cache_path = self.path_for(audio_path)
+        try:
+            audio = np.load(cache_path, mmap_mode="r")
+            os.utime(cache_path)
+            PCM_CACHE_LOOKUPS.inc(result="hit")
+            return audio
+        except (FileNotFoundError, ValueError):
+            PCM_CACHE_LOOKUPS.inc(result="miss")
+
+        with metrics.stage("decode"):
+            audio = whisper.load_audio(audio_path)
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, audio)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.evict()
+        # The file just written may already be evicted (by this call if it
+        # exceeds max_bytes, or by other threads and processes sharing the
+        # directory), so hand back the decoded array rather than reopen it.
+        return audio
+
+    @contextmanager
+    def pinned(self, audio_path: str, audio: np.ndarray):
+        """
+        Yield a private .npy path holding `audio` for as long as the block
+        runs. It is a hardlink to the cache entry when that still exists
+        (a copy otherwise) under a name evict() ignores, so evicting the
+        entry mid-call does not pull the file from under readers.
+        """
+        pin_path = os.path.join(self.cache_dir, f"{uuid.uuid4().hex}.pin")
+        try:
+            os.link(self.path_for(audio_path), pin_path)
+        except OSError:
+            with open(pin_path, "wb") as f:
+                np.save(f, audio)
+        try:
+            yield pin_path
+        finally:
+            os.remove(pin_path)
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npy"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+
+class AudioPrefetcher:
+    """
+    Loads upcoming items on background threads while the caller works on the
+    current one. At most `depth` items are loaded or buffered at a time,
+    which caps the memory held by decoded audio.
+    """
+    def __init__(self, workers: int = 2, depth: int = 4):
+        self.depth = max(depth, 1)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audio-prefetch")
+
+    def iterate(self, items: list, load_fn):
+        """
+        Yield (item, loaded, error) in input order.
+        """
+        items = iter(items)
+        pending = deque()
+
+        def _submit():
+            item = next(items, None)
+            if item is not None:
+                pending.append((item, self.pool.submit(load_fn, item)))
+
+        for _ in range(self.depth):
+            _submit()
+
+        while pending:
+            item, future = pending.popleft()
+            _submit()
+            try:
+                yield item, future.result(), None
+            except Exception as e:
+                yield item, None, e
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+# -------------------------
+# Worker
+# -------------------------
+
 class TranscriptionWorker:
     """
     Deterministic transcription tool using OpenAI Whisper.
     """
-    def __init__(self, model_name="base", MQClient: RabbitMQClient = None, DBClient: PostgresClient = None):
+    def __init__(
+        self,
+        model_name="base",
+        MQClient: RabbitMQClient = None,
+        DBClient: PostgresClient = None,
+        batch_size: int = 1,
+        prefetch: int = 4,
+        pcm_cache: PcmCache = None,
+        long_audio: ChunkedTranscriber = None,
+        long_audio_threshold: float = 600.0,
+        model=None,
+        transcript_cache: ResultCache = None,
+        transcript_formatter: TranscriptFormatter = None,
+        redactor: RedactionEngine = None
+    ):
         self.mq = MQClient
         self.db = DBClient
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"Loading Whisper model '{model_name}' on {self.device}...")
-        self.model = whisper.load_model(model_name).to(self.device)
+        self.model_name = model_name
+        self.transcript_cache = transcript_cache
+        self.transcript_formatter = transcript_formatter or TranscriptFormatter()
+        self.redactor = redactor or RedactionEngine()
+        if model is not None:
+            # Preloaded (e.g. shared copy-on-write by the supervisor).
+            self.model = model
+        else:
+            self.model = load_model(model_name)
+        self.device = next(self.model.parameters()).device.type
+        self.batch_size = batch_size
+        self.batch_transcriber = BatchedTranscriber(self.model, batch_size=batch_size)
+        self.pcm_cache = pcm_cache or PcmCache()
+        self.long_audio_threshold = long_audio_threshold
+        # Built by the caller (see load_models_from_env) so its processes
+        # are forked before any connections or threads exist.
+        self.long_audio = long_audio
+        self.prefetcher = AudioPrefetcher(depth=prefetch)
+        # Settings that change the transcript for the same audio and model.
+        self.decode_options = {
+            "batched": batch_size > 1,
+            "long_audio_chunk_seconds": self.long_audio.chunk_seconds if self.long_audio else None,
+            # Cached transcripts are stored redacted.
+            "redaction": self.redactor.version
+        }
         print("Model loaded.")
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=10))
-    def transcribe(self, audio_path: str) -> str:
-        result = self.model.transcribe(audio_path)
-        return result
+    def transcribe(self, audio_path: str, audio: np.ndarray = None) -> str:
+        if audio is None:
+            audio = self.pcm_cache.load(audio_path)
+        with metrics.stage("whisper", audio_seconds=round(len(audio) / whisper.audio.SAMPLE_RATE, 1)):
+            if self.long_audio is not None and len(audio) >= self.long_audio_threshold * whisper.audio.SAMPLE_RATE:
+                with self.pcm_cache.pinned(audio_path, audio) as pcm_path:
+                    return self.long_audio.transcribe(pcm_path, audio)
+            # Copy out of the read-only memory map; whisper wraps it in a tensor.
+            result = self.model.transcribe(np.array(audio))
+            return result
 
-    def segments_to_human_transcript(self, segments: list) -> str:
-        lines = []
-
-        for seg in segments:
-            ts = seg["start"]
-            text = seg["text"].strip()
-
-            if not text:
-                continue
+    def load_features(self, job: dict):
+        """
+        Decode a job's audio (through the PCM cache) and compute its mel
+        spectrogram. Runs on the prefetch threads.
+        """
+        with metrics.trace(job.get("trace_id")):
+            audio = self.pcm_cache.load(job["file_path"])
+            with metrics.stage("mel"):
+                return self.batch_transcriber.compute_mel(np.array(audio))
 
-            lines.append(f"{ts} {text}")
+    def load_audio(self, job: dict):
+        with metrics.trace(job.get("trace_id")):
+            return self.pcm_cache.load(job["file_path"])
 
-        return "\n".join(lines)
+    def segments_to_human_transcript(self, segments: list) -> str:
+        return self.transcript_formatter.render(segments)
     
     def redact_pii(self, text: str) -> str:
-        text = re.sub(r"\b\d{10,}\b", "[REDACTED_PHONE]", text)
-        text = re.sub(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b", "[REDACTED_EMAIL]", text)
-        return text
+        return self.redactor.redact_text(text)
 
     def process_transcription_job(self, message: dict):
         """
-        Callback executed for every message from RabbitMQ.
+        Callback executed for every message from RabbitMQ. Raises if the job
+        failed, so the consumer can schedule a retry.
+        """
+        audio_path = message.get("file_path")
+        if not audio_path:
+            print("Invalid message received:", message)
+            return
+
+        with metrics.trace(message.get("trace_id")), metrics.stage("transcription"):
+            if not self._serve_from_cache(message):
+                self._transcribe_one(message)
+
+    def _transcribe_one(self, message: dict):
+        audio_path = message.get("file_path")
+        print(f"Transcribing: {audio_path}")
+        transcript = self.transcribe(audio_path)
+        self.finish_job(message, transcript)
+
+    # ----------------
+    # Transcript cache
+    # ----------------
+
+    def transcript_cache_key(self, message: dict) -> str:
+        audio_hash = message.get("content_hash") or content_hash(message["file_path"])
+        return ResultCache.make_key(audio_hash, self.model_name, self.decode_options)
+
+    def _serve_from_cache(self, message: dict) -> bool:
+        """
+        Complete the job from a cached transcript of the same audio, model and
+        decode options. Returns False on a miss (or if the lookup failed).
+        """
+        if self.transcript_cache is None or not self.transcript_cache.enabled:
+            return False
+
+        try:
+            transcript = self.transcript_cache.get(self.transcript_cache_key(message))
+        except Exception as e:
+            print("Transcript cache lookup failed:", e)
+            return False
+
+        if transcript is None:
+            return False
+
+        print(f"Transcript cache hit for {message['file_path']} {self.transcript_cache.stats()}")
+        self.complete_job(message, transcript)
+        return True
+
+    def _cache_transcript(self, message: dict, transcript: dict):
         """
+        Store an already redacted transcript (see finish_job); the cache
+        table is shared, so raw Whisper output must never reach it.
+        """
+        if self.transcript_cache is None or not self.transcript_cache.enabled:
+            return
+
         try:
-            audio_path = message.get("file_path")
-            if not audio_path:
+            self.transcript_cache.put(
+                self.transcript_cache_key(message),
+                {
+                    "text": transcript["text"],
+                    "segments": transcript["segments"],
+                    "language": transcript.get("language")
+                }
+            )
+        except Exception as e:
+            print("Could not cache transcript:", e)
+
+    def process_transcription_batch(self, messages: list):
+        """
+        Batch callback. With batch_size > 1 all calls go through the batched
+        Whisper engine; otherwise they are transcribed one after another while
+        the following files are decoded in the background. Returns the
+        (message, error) pairs of the jobs that failed.
+        """
+        jobs, failures = [], []
+        for message in messages:
+            if not message.get("file_path"):
                 print("Invalid message received:", message)
-                return
+                continue
+            try:
+                if self._serve_from_cache(message):
+                    continue
+            except Exception as e:
+                failures.append((message, e))
+                continue
+            jobs.append(message)
 
-            print(f"Transcribing: {audio_path}")
-            transcript = self.transcribe(audio_path)
-            transcript["text"] = self.redact_pii(transcript["text"])
-            transcript_id = self.db.save_transcript(
+        if not jobs:
+            return failures
+
+        # Shortest first: a long call in the batch does not delay the rest.
+        jobs.sort(key=lambda job: (job.get("duration_seconds") is None, job.get("duration_seconds") or 0))
+
+        if self.batch_size > 1:
+            self._transcribe_batched(jobs, failures)
+        else:
+            self._transcribe_pipelined(jobs, failures)
+        return failures
+
+    def _try_transcribe_one(self, job: dict, failures: list):
+        try:
+            with metrics.trace(job.get("trace_id")):
+                self._transcribe_one(job)
+        except Exception as e:
+            failures.append((job, e))
+
+    def _transcribe_pipelined(self, jobs: list, failures: list):
+        for job, audio, error in self.prefetcher.iterate(jobs, self.load_audio):
+            try:
+                with metrics.trace(job.get("trace_id")):
+                    if error is not None:
+                        raise error
+                    print(f"Transcribing: {job['file_path']}")
+                    transcript = self.transcribe(job["file_path"], audio)
+                    self.finish_job(job, transcript)
+            except Exception as e:
+                failures.append((job, e))
+
+    def _transcribe_batched(self, jobs: list, failures: list):
+        ready, mels = [], []
+        for job, mel, error in self.prefetcher.iterate(jobs, self.load_features):
+            if error is not None:
+                failures.append((job, error))
+                continue
+            ready.append(job)
+            mels.append(mel)
+
+        if self.long_audio is not None:
+            # Long calls get the chunked, multi-process path instead.
+            long_frames = self.long_audio_threshold * whisper.audio.SAMPLE_RATE / whisper.audio.HOP_LENGTH
+            batch = []
+            for job, mel in zip(ready, mels):
+                if mel.shape[-1] - whisper.audio.N_FRAMES >= long_frames:
+                    self._try_transcribe_one(job, failures)
+                else:
+                    batch.append((job, mel))
+            ready = [job for job, _ in batch]
+            mels = [mel for _, mel in batch]
+
+        if not ready:
+            return
+
+        print(f"Transcribing batch of {len(ready)}: {[job['file_path'] for job in ready]}")
+        start = time.perf_counter()
+        try:
+            with metrics.stage("whisper_batch"):
+                transcripts = self.batch_transcriber.transcribe_mels(mels)
+        except Exception as e:
+            print("Batched transcription failed, retrying individually:", e)
+            for job in ready:
+                self._try_transcribe_one(job, failures)
+            return
+
+        seconds = time.perf_counter() - start
+        for job, transcript in zip(ready, transcripts):
+            try:
+                with metrics.trace(job.get("trace_id")):
+                    metrics.trace_event("whisper_batch", seconds, batch=len(ready))
+                    self.finish_job(job, transcript)
+            except Exception as e:
+                failures.append((job, e))
+
+    def finish_job(self, message: dict, transcript: dict):
+        """
+        Redact a fresh transcript (text and segments alike), cache it and
+        complete the job. Only redacted transcripts are cached or stored.
+        """
+        with metrics.stage("redact"):
+            transcript = self.redactor.redact_transcript(transcript)
+        self._cache_transcript(message, transcript)
+        self.complete_job(message, transcript)
+
+    def complete_job(self, message: dict, transcript: dict):
+        """
+        Store a finished, redacted transcript, then queue its evaluation.
+        """
+        audio_path = message.get("file_path")
+        timestamped_text = self.segments_to_human_transcript(transcript["segments"])
+        with metrics.stage("db_write"):
+            transcript_id = self.db.complete_transcription(
                 call_id=message.get("call_id"),
                 transcript_id=str(uuid.uuid4()),
                 transcript_text=transcript["text"],
                 segments=transcript["segments"],
-                timestamped_text=self.segments_to_human_transcript(transcript["segments"]),
-                model_name="whisper-small",
+                timestamped_text=timestamped_text,
+                model_name=f"whisper-{self.model_name}",
                 language=transcript.get("language", "en")
             )
-            self.mq.publish("evaluation_jobs", {"file_path": audio_path, "call_id": message.get("call_id")})
-            self.db.update_call_status(message.get("call_id"), "EVALUATION_QUEUE")
+        if transcript_id is None:
+            raise RuntimeError("Could not save transcript")
+        self.mq.publish(
+            "evaluation_jobs",
+            {"file_path": audio_path, "call_id": message.get("call_id"), "trace_id": message.get("trace_id")}
+        )
 
-        except Exception as e:
-            print("Error processing transcription job:", e)
-            self.db.update_call_status(message.get("call_id"), "FAILED", f"Transcription failed: {str(e)}")
-            self.mq.publish("failed_jobs", {"file_path": audio_path, "call_id": message.get("call_id"), "error": f"Transcription failed: {str(e)}"})
+    def fail_job(self, message: dict, error: Exception):
+        """
+        Failure handler for a job that used up its retries.
+        """
+        fail_transcription(self.db, self.mq, message, error)
+
+
+def fail_transcription(db: PostgresClient, mq: RabbitMQClient, message: dict, error: Exception):
+    print("Error processing transcription job:", error)
+    db.update_call_status(message.get("call_id"), "FAILED", f"Transcription failed: {str(error)}")
+    mq.publish("failed_jobs", {"file_path": message.get("file_path"), "call_id": message.get("call_id"), "trace_id": message.get("trace_id"), "error": f"Transcription failed: {str(error)}"})
+
+
+
+# -------------------------
+# Process pool entry points
+# -------------------------
+
+# Whisper is not safe to share between threads (decoding installs forward
+# hooks on the model), so concurrent transcription uses one worker, model
+# and set of clients per process.
+_process_worker = None
+
+
+def _init_process_worker():
+    global _process_worker
+    model, long_audio = load_models_from_env()
+    _process_worker = worker_from_env(RabbitMQClient(), PostgresClient(maxconn=2), model, long_audio)
 
 
+def _run_transcription_job(message: dict):
+    _process_worker.process_transcription_job(message)
+
+
+def load_model(model_name: str):
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    print(f"Loading Whisper model '{model_name}' on {device}...")
+    return whisper.load_model(model_name).to(device)
+
+
+def long_audio_from_env(model) -> ChunkedTranscriber:
+    """
+    The long-call chunk pool sharing `model`, or None if LONG_AUDIO_WORKERS
+    is 0 or the model is not on CPU. The chunk processes split this
+    process's torch threads (pinned per worker by the supervisor) unless
+    LONG_AUDIO_THREADS_PER_WORKER is set.
+    """
+    workers = int(os.getenv("LONG_AUDIO_WORKERS", "0"))
+    if workers <= 0 or next(model.parameters()).device.type != "cpu":
+        return None
+    threads = int(os.getenv("LONG_AUDIO_THREADS_PER_WORKER", "0")) or max(1, torch.get_num_threads() // workers)
+    return ChunkedTranscriber(
+        model,
+        workers=workers,
+        chunk_seconds=float(os.getenv("LONG_AUDIO_CHUNK_SECONDS", "300")),
+        threads_per_worker=threads
+    )
+
+
+def load_models_from_env(model=None) -> tuple:
+    """
+    The Whisper model (loaded unless given) and its long-call chunk pool.
+    Call this before opening any connections or starting any threads: the
+    pool processes are forked from the caller and would inherit them.
+    """
+    if model is None:
+        model = load_model(os.getenv("TRANSCRIPTION_MODEL"))
+    return model, long_audio_from_env(model)
+
+
+def worker_from_env(mq: RabbitMQClient, db: PostgresClient, model=None, long_audio: ChunkedTranscriber = None) -> TranscriptionWorker:
+    worker = TranscriptionWorker(
+        model_name=os.getenv("TRANSCRIPTION_MODEL"),
+        MQClient=mq,
+        DBClient=db,
+        batch_size=int(os.getenv("TRANSCRIPTION_BATCH_SIZE", "1")),
+        prefetch=int(os.getenv("TRANSCRIPTION_PREFETCH", "1")),
+        pcm_cache=PcmCache(
+            cache_dir=os.getenv("PCM_CACHE_DIR"),
+            max_bytes=int(os.getenv("PCM_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+        ),
+        long_audio=long_audio,
+        long_audio_threshold=float(os.getenv("LONG_AUDIO_THRESHOLD_SECONDS", "600")),
+        model=model,
+        transcript_cache=ResultCache(
+            db,
+            namespace="transcript",
+            max_bytes=int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(1024 ** 3))),
+            enabled=os.getenv("TRANSCRIPT_CACHE", "1") == "1"
+        ),
+        transcript_formatter=TranscriptFormatter(
+            compact=os.getenv("TRANSCRIPT_COMPACT", "0") == "1",
+            merge_chars=int(os.getenv("TRANSCRIPT_MERGE_CHARS", "200")),
+            max_gap=float(os.getenv("TRANSCRIPT_MERGE_GAP", "1.0")),
+            collapse=os.getenv("TRANSCRIPT_COLLAPSE_REPEATS", "1") == "1"
+        ),
+        redactor=RedactionEngine(
+            ner=os.getenv("REDACTION_NER", "0") == "1",
+            nlp_model=os.getenv("REDACTION_NER_MODEL", "en_core_web_lg")
+        )
+    )
+    metrics.register_stats("db_pool", db.pool_stats, counters=POOL_STAT_COUNTERS)
+    metrics.register_stats("result_cache", worker.transcript_cache.stats, counters=("hits", "misses"), namespace="transcript")
+    return worker
+
+
+def consume_jobs(worker: TranscriptionWorker, mq: RabbitMQClient, lanes: str = None):
+    """
+    Serve the transcription lanes in `lanes` (default TRANSCRIPTION_LANES,
+    e.g. "short:3,long:1"). A single lane is consumed as before; several
+    lanes are pulled by weight, so short calls keep flowing while long ones
+    are in progress.
+    """
+    queues = lane_weights(lanes or os.getenv("TRANSCRIPTION_LANES", DEFAULT_LANES))
+    batch_size = max(worker.batch_size, worker.prefetcher.depth)
+
+    if len(queues) > 1:
+        mq.consume_weighted(
+            queue_weights=queues,
+            callback=worker.process_transcription_batch,
+            batch_size=batch_size,
+            on_failure=worker.fail_job
+        )
+        return
+
+    queue_name = next(iter(queues))
+    if batch_size > 1:
+        mq.consume_batches(
+            queue_name=queue_name,
+            callback=worker.process_transcription_batch,
+            batch_size=batch_size,
+            max_wait=float(os.getenv("TRANSCRIPTION_BATCH_WAIT", "2.0")),
+            on_failure=worker.fail_job
+        )
+        return
+
+    mq.consume(
+        queue_name=queue_name,
+        callback=worker.process_transcription_job,
+        on_failure=worker.fail_job
+    )
+
 
 def main():
+    concurrency = int(os.getenv("TRANSCRIPTION_CONCURRENCY", "1"))
+    if concurrency <= 1:
+        # Before the metrics thread and the connections below.
+        model, long_audio = load_models_from_env()
     mq = RabbitMQClient()
-    db = PostgresClient()
-    worker = TranscriptionWorker(model_name=os.getenv("TRANSCRIPTION_MODEL"),MQClient=mq, DBClient=db)
+
     print("Waiting for transcription jobs...")
-    mq.consume(
-        queue_name="transcription_jobs",
-        callback=worker.process_transcription_job
-    )
+    # With a process pool only the parent serves metrics (queue and
+    # failure counts); the stage timings stay in the pool processes.
+    metrics.serve_from_env(9102)
+    if concurrency > 1:
+        # Jobs run in the pool processes; failures that used up their
+        # retries are recorded from here.
+        db = PostgresClient(maxconn=2)
+        mq.consume(
+            queue_name=list(lane_weights(os.getenv("TRANSCRIPTION_LANES", DEFAULT_LANES))),
+            callback=_run_transcription_job,
+            concurrency=concurrency,
+            executor="process",
+            initializer=_init_process_worker,
+            on_failure=partial(fail_transcription, db, mq)
+        )
+        return
+
+    db = PostgresClient()
+    worker = worker_from_env(mq, db, model, long_audio)
+    consume_jobs(worker, mq)
 
 
 if __name__ == "__main__":
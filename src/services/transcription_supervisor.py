@@ -0,0 +1,150 @@
+import gc
+import multiprocessing
+import os
+import signal
+import time
+import torch
+import whisper
+from src.clients.rabbitmq_client import RabbitMQClient
+from src.clients.postgres_client import PostgresClient
+from src.services.transcription import load_models_from_env, worker_from_env, consume_jobs
+from src.services.redaction import load_nlp
+from src.services.job_lanes import DEFAULT_LANES
+from src.services import metrics
+
+from dotenv import load_dotenv
+load_dotenv()
+
+
+# -------------------------
+# Worker process
+# -------------------------
+
+def _run_worker(index: int, model, threads: int, lanes: str):
+    # Each worker gets a fixed slice of the host so N workers do not
+    # oversubscribe the cores with N default-sized torch thread pools.
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    # The chunk pool forks from this process, so it is started before any
+    # connections are opened; those are opened after the fork, never
+    # inherited.
+    model, long_audio = load_models_from_env(model)
+    mq = RabbitMQClient()
+    db = PostgresClient(maxconn=2)
+    worker = worker_from_env(mq, db, model, long_audio)
+    metrics.serve_from_env(9102, offset=index)
+    print(f"[worker {index}] pid={os.getpid()} threads={threads} lanes={lanes}, waiting for transcription jobs...")
+    consume_jobs(worker, mq, lanes)
+
+
+# -------------------------
+# Supervisor
+# -------------------------
+
+class TranscriptionSupervisor:
+    """
+    Runs N transcription workers on one host. The first
+    `short_lane_workers` only take short calls, so a burst of long calls
+    cannot occupy every worker; the rest serve `lanes` (by default both
+    lanes, weighted towards short calls).
+
+    On CPU the Whisper model is loaded once in the supervisor and inherited by
+    the forked workers, so its weights are shared copy-on-write instead of
+    being duplicated per process. On CUDA every worker loads its own model
+    because a CUDA context cannot be forked.
+    """
+    def __init__(
+        self,
+        model_name: str,
+        workers: int = None,
+        threads_per_worker: int = None,
+        lanes: str = DEFAULT_LANES,
+        short_lane_workers: int = 0
+    ):
+        cpus = os.cpu_count() or 1
+        if threads_per_worker is None:
+            threads_per_worker = max(1, cpus // workers) if workers else min(2, cpus)
+        self.threads_per_worker = threads_per_worker
+        self.workers = workers or max(1, cpus // threads_per_worker)
+        self.model_name = model_name
+        self.lanes = lanes
+        self.short_lane_workers = min(short_lane_workers, self.workers - 1)
+        self.context = multiprocessing.get_context("fork")
+        self.processes = {}
+        self.running = True
+        self.model = None
+
+        if not torch.cuda.is_available():
+            print(f"Loading shared Whisper model '{model_name}' on cpu...")
+            self.model = whisper.load_model(model_name, device="cpu").eval()
+            for param in self.model.parameters():
+                param.requires_grad_(False)
+            if os.getenv("REDACTION_NER", "0") == "1":
+                # Loaded here so the workers share it too.
+                load_nlp(os.getenv("REDACTION_NER_MODEL", "en_core_web_lg"))
+            # Move everything allocated so far out of the GC's tracked
+            # generations, so collections in the children do not touch (and
+            # copy) the pages holding the parent's objects.
+            gc.collect()
+            gc.freeze()
+
+    def lanes_for(self, index: int) -> str:
+        return "short" if index < self.short_lane_workers else self.lanes
+
+    def _start(self, index: int):
+        process = self.context.Process(
+            target=_run_worker,
+            args=(index, self.model, self.threads_per_worker, self.lanes_for(index)),
+            name=f"transcription-worker-{index}"
+        )
+        process.start()
+        self.processes[index] = process
+
+    def _stop(self, *_):
+        self.running = False
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        print(f"Starting {self.workers} transcription workers x {self.threads_per_worker} threads")
+        if self.short_lane_workers:
+            print(f"{self.short_lane_workers} of them take short calls only")
+        for index in range(self.workers):
+            self._start(index)
+
+        while self.running:
+            time.sleep(1)
+            for index, process in list(self.processes.items()):
+                if not process.is_alive() and self.running:
+                    print(f"Worker {index} exited with code {process.exitcode}, restarting")
+                    self._start(index)
+
+        print("Stopping transcription workers...")
+        for process in self.processes.values():
+            process.terminate()
+        for process in self.processes.values():
+            process.join(timeout=30)
+
+
+def main():
+    workers = int(os.getenv("TRANSCRIPTION_WORKERS", "0")) or None
+    threads = int(os.getenv("TRANSCRIPTION_THREADS_PER_WORKER", "0")) or None
+    TranscriptionSupervisor(
+        model_name=os.getenv("TRANSCRIPTION_MODEL"),
+        workers=workers,
+        threads_per_worker=threads,
+        lanes=os.getenv("TRANSCRIPTION_LANES", DEFAULT_LANES),
+        short_lane_workers=int(os.getenv("TRANSCRIPTION_SHORT_LANE_WORKERS", "0"))
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import struct
+
+import pytest
+
+from src.services import audio_probe
+from src.services.audio_probe import probe_duration
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, stereo: 417-byte frames of 1152 samples.
+MP3_HEADER = bytes([0xFF, 0xFB, 0x90, 0x00])
+MP3_FRAME_BYTES = 417
+MP3_SIDE_INFO = 32
+
+
+@pytest.fixture(autouse=True)
+def no_ffprobe(monkeypatch):
+    # Header parsing only; a missed parse must show up as None.
+    monkeypatch.setattr(audio_probe, "_ffprobe_duration", lambda path, timeout=10.0: None)
+
+
+def write(tmp_path, name: str, data: bytes) -> str:
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def chunk(chunk_id: bytes, body: bytes, size: int = None) -> bytes:
+    pad = b"\0" if len(body) & 1 else b""
+    return struct.pack("<4sI", chunk_id, len(body) if size is None else size) + body + pad
+
+
+def fmt_chunk(sample_rate: int = 16000, channels: int = 1, bits: int = 16) -> bytes:
+    block = channels * bits // 8
+    return chunk(b"fmt ", struct.pack("<HHIIHH", 1, channels, sample_rate, sample_rate * block, block, bits))
+
+
+def wav(*chunks: bytes, magic: bytes = b"RIFF") -> bytes:
+    body = b"WAVE" + b"".join(chunks)
+    return struct.pack("<4sI", magic, len(body)) + body
+
+
+def test_wav_duration_from_data_chunk(tmp_path):
+    data = b"\0" * 32000 * 3
+    path = write(tmp_path, "a.wav", wav(fmt_chunk(), chunk(b"LIST", b"odd"), chunk(b"data", data)))
+    assert probe_duration(path) == 3.0
+
+
+def test_wav_streamed_with_unset_data_size(tmp_path):
+    path = write(tmp_path, "a.wav", wav(fmt_chunk(8000), chunk(b"data", b"\0" * 16000, size=0)))
+    assert probe_duration(path) == 1.0
+
+
+def test_rf64_takes_data_size_from_ds64(tmp_path):
+    data = b"\0" * 32000 * 2
+    ds64 = chunk(b"ds64", struct.pack("<QQQI", 0, len(data), 0, 0))
+    path = write(tmp_path, "a.wav", wav(ds64, fmt_chunk(), chunk(b"data", data, size=0xFFFFFFFF), magic=b"RF64"))
+    assert probe_duration(path) == 2.0
+
+
+def test_wav_without_data_chunk_is_unknown(tmp_path):
+    path = write(tmp_path, "a.wav", wav(fmt_chunk()))
+    assert probe_duration(path) is None
+
+
+def mp3_frame(payload: bytes = b"") -> bytes:
+    body = b"\0" * MP3_SIDE_INFO + payload
+    return MP3_HEADER + body + b"\0" * (MP3_FRAME_BYTES - 4 - len(body))
+
+
+def test_mp3_cbr_duration_from_file_size(tmp_path):
+    frames = 100
+    path = write(tmp_path, "a.mp3", mp3_frame() * frames)
+    assert probe_duration(path) == round(frames * MP3_FRAME_BYTES * 8 / 128000, 3)
+
+
+def test_mp3_cbr_skips_id3v2_and_id3v1_tags(tmp_path):
+    tag_body = b"\0" * 300
+    id3v2 = b"ID3\x04\x00\x00" + bytes([0, 0, 300 >> 7, 300 & 0x7F]) + tag_body
+    id3v1 = b"TAG" + b"\0" * 125
+    path = write(tmp_path, "a.mp3", id3v2 + mp3_frame() * 50 + id3v1)
+    assert probe_duration(path) == round(50 * MP3_FRAME_BYTES * 8 / 128000, 3)
+
+
+def test_mp3_xing_frame_count(tmp_path):
+    xing = b"Xing" + struct.pack(">II", 1, 5000)
+    path = write(tmp_path, "a.mp3", mp3_frame(xing) + mp3_frame() * 3)
+    assert probe_duration(path) == round(5000 * 1152 / 44100, 3)
+
+
+def test_mp3_vbri_frame_count(tmp_path):
+    # Version, delay, quality and byte count precede the frame count.
+    vbri = b"VBRI" + struct.pack(">HHHII", 1, 0, 0, 0, 2500)
+    path = write(tmp_path, "a.mp3", mp3_frame(vbri) + mp3_frame() * 3)
+    assert probe_duration(path) == round(2500 * 1152 / 44100, 3)
+
+
+def test_false_sync_is_skipped(tmp_path):
+    # An empty ID3 tag, a lone sync word with no frame after it, then real frames.
+    id3 = b"ID3\x04\x00\x00\x00\x00\x00\x00"
+    path = write(tmp_path, "a.mp3", id3 + MP3_HEADER + b"\x01" * 10 + mp3_frame() * 20)
+    assert probe_duration(path) == round(20 * MP3_FRAME_BYTES * 8 / 128000, 3)
+
+
+def test_unknown_format_falls_back_to_ffprobe(tmp_path, monkeypatch):
+    path = write(tmp_path, "a.ogg", b"OggS" + b"\0" * 100)
+    assert probe_duration(path) is None
+    monkeypatch.setattr(audio_probe, "_ffprobe_duration", lambda path, timeout=10.0: 12.3456)
+    assert probe_duration(path) == 12.346
+
+
+def test_missing_file_is_unknown(tmp_path):
+    assert probe_duration(str(tmp_path / "missing.wav")) is None
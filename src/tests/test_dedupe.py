@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+pytest.importorskip("xxhash")
+pytest.importorskip("psycopg2")
+
+from src.services.dedupe import AudioDedupeStore
+
+
+class IndexDB:
+    """
+    The audio_files queries of PostgresClient over a dict of rows, with the
+    same upsert and `NOT is_duplicate` semantics.
+    """
+    def __init__(self):
+        self.rows = {}
+        self.calls = {}
+
+    def get_audio_files(self, paths):
+        return {path: dict(self.rows[path]) for path in paths if path in self.rows}
+
+    def find_calls_by_content(self, keys):
+        found = {}
+        for row in self.rows.values():
+            key = (row["content_hash"], row["size_bytes"])
+            if key in keys and not row["is_duplicate"]:
+                found.setdefault(key, row["call_id"])
+        return found
+
+    def create_calls(self, calls, audio_files=None):
+        for call_id, path, duration_seconds in calls:
+            self.calls[call_id] = path
+        for path, content_hash, size_bytes, mtime, call_id, is_duplicate in audio_files or []:
+            self.rows[path] = {
+                "content_hash": content_hash, "size_bytes": size_bytes, "mtime": mtime,
+                "call_id": call_id, "is_duplicate": is_duplicate
+            }
+        return [call[0] for call in calls]
+
+
+def ingest(store, paths):
+    new, duplicates, refreshed, known = store.classify(paths)
+    store.register(new, duplicates, refreshed)
+    return new, duplicates, refreshed, known
+
+
+@pytest.fixture
+def recording(tmp_path):
+    path = tmp_path / "call.wav"
+    path.write_bytes(b"not really audio" * 100)
+    return str(path)
+
+
+def test_copy_links_to_the_original_call(tmp_path, recording):
+    store = AudioDedupeStore(IndexDB())
+    new, _, _, _ = ingest(store, [recording])
+
+    copy = tmp_path / "copy.wav"
+    copy.write_bytes(open(recording, "rb").read())
+    new_again, duplicates, _, _ = ingest(store, [str(copy)])
+
+    assert new_again == []
+    assert [audio.call_id for audio in duplicates] == [new[0].call_id]
+
+
+def test_unchanged_file_is_known_without_hashing(recording, monkeypatch):
+    store = AudioDedupeStore(IndexDB())
+    ingest(store, [recording])
+
+    monkeypatch.setattr("src.services.dedupe.content_hash", lambda path: pytest.fail("rehashed"))
+    assert store.classify([recording]) == ([], [], [], 1)
+
+
+def test_touched_file_stays_the_original_of_its_call(tmp_path, recording):
+    db = IndexDB()
+    store = AudioDedupeStore(db)
+    new, _, _, _ = ingest(store, [recording])
+    call_id = new[0].call_id
+
+    stat = os.stat(recording)
+    os.utime(recording, (stat.st_atime, stat.st_mtime + 60))
+    new_again, duplicates, refreshed, known = ingest(store, [recording])
+
+    assert (new_again, duplicates, known) == ([], [], 1)
+    assert db.rows[recording]["is_duplicate"] is False
+    assert db.rows[recording]["mtime"] == stat.st_mtime + 60
+    assert db.rows[recording]["call_id"] == call_id
+
+    # The recording is still found by content, so a later copy is a duplicate.
+    copy = tmp_path / "copy.wav"
+    copy.write_bytes(open(recording, "rb").read())
+    new_copy, duplicates, _, _ = ingest(store, [str(copy)])
+    assert new_copy == []
+    assert [audio.call_id for audio in duplicates] == [call_id]
+
+
+def test_touched_copy_stays_a_duplicate(tmp_path, recording):
+    db = IndexDB()
+    store = AudioDedupeStore(db)
+    ingest(store, [recording])
+    copy = str(tmp_path / "copy.wav")
+    with open(copy, "wb") as f:
+        f.write(open(recording, "rb").read())
+    ingest(store, [copy])
+
+    stat = os.stat(copy)
+    os.utime(copy, (stat.st_atime, stat.st_mtime + 60))
+    ingest(store, [copy])
+
+    assert db.rows[copy]["is_duplicate"] is True
+    assert db.rows[recording]["is_duplicate"] is False
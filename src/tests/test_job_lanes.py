@@ -0,0 +1,63 @@
+import pytest
+
+from src.clients.memory_queue import InMemoryQueueClient
+from src.services.job_lanes import LONG_QUEUE, SHORT_QUEUE, lane_weights, queue_for_duration
+
+
+def test_lane_weights_parsing():
+    assert lane_weights("short:3,long:1") == {SHORT_QUEUE: 3, LONG_QUEUE: 1}
+    assert lane_weights(" long , short:2 ,") == {LONG_QUEUE: 1, SHORT_QUEUE: 2}
+    assert lane_weights("custom_queue:4") == {"custom_queue": 4}
+
+
+@pytest.mark.parametrize("duration, queue", [
+    (599.9, SHORT_QUEUE),
+    (600, LONG_QUEUE),
+    (None, LONG_QUEUE),
+])
+def test_queue_for_duration(duration, queue):
+    assert queue_for_duration(duration, threshold=600) == queue
+
+
+def consume_order(mq: InMemoryQueueClient, weights: dict, picks: int, on_pick=None) -> list:
+    order = []
+
+    def callback(messages):
+        order.extend(message["queue"] for message in messages)
+        if on_pick is not None:
+            on_pick(len(order))
+        if len(order) >= picks:
+            mq.close()
+
+    mq.consume_weighted(weights, callback)
+    return order[:picks]
+
+
+def filled(**counts) -> InMemoryQueueClient:
+    mq = InMemoryQueueClient()
+    for lane, count in counts.items():
+        queue_name = {"short": SHORT_QUEUE, "long": LONG_QUEUE}[lane]
+        mq.publish_many(queue_name, [{"queue": lane}] * count)
+    return mq
+
+
+def test_weighted_lanes_follow_their_ratio():
+    order = consume_order(filled(short=20, long=20), lane_weights("short:3,long:1"), 16)
+    assert order.count("short") == 12
+    assert order.count("long") == 4
+    # Smooth round-robin: the long lane gets a turn in every window of four.
+    for start in range(0, 16, 4):
+        assert "long" in order[start:start + 4]
+
+
+def test_empty_lane_passes_its_turn_without_banking_it():
+    mq = filled(long=20)
+
+    def on_pick(picked):
+        if picked == 4:
+            mq.publish_many(SHORT_QUEUE, [{"queue": "short"}] * 20)
+
+    order = consume_order(mq, lane_weights("short:3,long:1"), 8, on_pick)
+    assert order[:4] == ["long"] * 4
+    # Short work arriving late resumes at 3:1 rather than catching up.
+    assert sorted(order[4:]) == ["long", "short", "short", "short"]
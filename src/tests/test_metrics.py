@@ -0,0 +1,88 @@
+from src.services.metrics import MetricsRegistry
+
+
+def parse_families(text: str) -> dict:
+    """
+    Minimal Prometheus text-format check: each family has one TYPE line,
+    before its samples, and its samples are contiguous.
+    """
+    families = {}
+    current = None
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            name, kind = line[len("# TYPE "):].split()
+            assert name not in families, f"duplicate TYPE for {name}"
+            families[name] = {"kind": kind, "samples": []}
+            current = name
+        elif line.startswith("#") or not line:
+            continue
+        else:
+            name = line.split("{")[0].split()[0]
+            assert current and (name == current or name.startswith(current + "_")), f"sample {name} outside its family"
+            families[current]["samples"].append(line)
+    return families
+
+
+def test_stats_with_the_same_prefix_share_one_family():
+    registry = MetricsRegistry()
+    registry.register_stats("result_cache", lambda: {"hits": 3, "misses": 1, "bytes": 10}, counters=("hits", "misses"), namespace="transcript")
+    registry.register_stats("result_cache", lambda: {"hits": 5, "misses": 0, "bytes": 20}, counters=("hits", "misses"), namespace="evaluation")
+
+    families = parse_families(registry.render())
+    assert families["result_cache_hits"] == {
+        "kind": "counter",
+        "samples": ['result_cache_hits{namespace="transcript"} 3', 'result_cache_hits{namespace="evaluation"} 5']
+    }
+    assert families["result_cache_bytes"]["kind"] == "gauge"
+
+
+def test_declared_metrics_render_with_labels():
+    registry = MetricsRegistry()
+    registry.counter("jobs_total", "Jobs.", ("queue",)).inc(2, queue="a")
+    registry.histogram("wait_seconds", "Wait.", buckets=(1, 5)).observe(2)
+
+    families = parse_families(registry.render())
+    assert families["jobs_total"]["samples"] == ['jobs_total{queue="a"} 2']
+    assert families["wait_seconds"]["samples"] == [
+        'wait_seconds_bucket{le="1.0"} 0',
+        'wait_seconds_bucket{le="5.0"} 1',
+        'wait_seconds_bucket{le="+Inf"} 1',
+        "wait_seconds_sum 2.0",
+        "wait_seconds_count 1",
+    ]
+
+
+def test_failing_collector_does_not_break_the_scrape():
+    registry = MetricsRegistry()
+    registry.register_stats("broken", lambda: 1 / 0)
+    registry.register_stats("ok", lambda: {"value": 1, "label": "skipped"})
+
+    families = parse_families(registry.render())
+    assert families["ok_value"]["samples"] == ["ok_value 1"]
+
+
+def test_fused_pipeline_registrations_render_cleanly():
+    # The set registered by fused_pipeline.main(): worker_from_env,
+    # agent_from_env, then the in-memory queues, all in one process.
+    from src.agents.concurrency import AdaptiveConcurrencyLimiter
+    from src.clients.memory_queue import InMemoryQueueClient
+
+    registry = MetricsRegistry()
+    mq = InMemoryQueueClient(maxsizes={"transcription_jobs": 2})
+    mq.queue("transcription_jobs")
+    mq.queue("evaluation_jobs")
+    pool_stats = {"checkouts": 4, "waits": 0, "wait_seconds_total": 0.0, "reconnects": 0, "in_use": 1}
+    cache_stats = {"hits": 1, "misses": 2, "hit_rate": 1 / 3}
+    counters = ("checkouts", "waits", "wait_seconds_total", "reconnects")
+
+    registry.register_stats("db_pool", lambda: pool_stats, counters=counters)
+    registry.register_stats("result_cache", lambda: cache_stats, counters=("hits", "misses"), namespace="transcript")
+    registry.register_stats("result_cache", lambda: cache_stats, counters=("hits", "misses"), namespace="evaluation")
+    registry.register_stats("llm_limiter", AdaptiveConcurrencyLimiter().stats)
+    registry.register_stats("memory_queue", mq.stats)
+
+    families = parse_families(registry.render())
+    assert len(families["result_cache_misses"]["samples"]) == 2
+    assert families["db_pool_checkouts"]["kind"] == "counter"
+    assert families["memory_queue_transcription_jobs_depth"]["samples"] == ["memory_queue_transcription_jobs_depth 0"]
+    assert "llm_limiter_limit" in families
@@ -0,0 +1,69 @@
+import pytest
+
+from src.agents.output_parser import extract_json, loads_lenient, merge_patch, repair_json, validate_evaluation, CATEGORIES
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"overall_score": 4, "strengths": ["a"], "areas_for', {"overall_score": 4, "strengths": ["a"]}),
+    ('{"overall_score": 4, "strengths": ["a"], "areas_for_improvement"', {"overall_score": 4, "strengths": ["a"]}),
+    ('{"overall_score": 4, "strengths": ["a"], "areas_for_improvement": ', {"overall_score": 4, "strengths": ["a"]}),
+    ('{"overall_score": 4, "strengths": ["a"], "', {"overall_score": 4, "strengths": ["a"]}),
+    ('{"category_scores": {"greeting": {"score": 4, "expl', {"category_scores": {"greeting": {"score": 4}}}),
+    ('{"a": tru', {}),
+    ('{"a": 4.', {}),
+    ('{"a": 1, "b": nul', {"a": 1}),
+    ('{"a": 4', {"a": 4}),
+    ('{"a": "partial expla', {"a": "partial expla"}),
+    ('{"a": "ends in escape\\', {"a": "ends in escape"}),
+    ('{"a": ["x", "y",', {"a": ["x", "y"]}),
+    ('{"a": {"b": ["c"', {"a": {"b": ["c"]}}),
+])
+def test_truncated_output_is_cut_to_last_complete_member(text, expected):
+    assert loads_lenient(text) == expected
+
+
+def test_trailing_commas_are_dropped():
+    assert loads_lenient('{"a": [1, 2, ], "b": {"c": 3,},}') == {"a": [1, 2], "b": {"c": 3}}
+
+
+def test_smart_quotes_used_as_delimiters():
+    assert loads_lenient("{“a”: “b”}") == {"a": "b"}
+
+
+def test_brackets_inside_strings_are_not_structure():
+    assert loads_lenient('{"a": "x}], \\"y", "b": [1') == {"a": 'x}], "y', "b": [1]}
+
+
+def test_extract_json_skips_fences_and_trailing_text():
+    assert extract_json('```json\n{"a": {"b": 1}}\n``` done') == '{"a": {"b": 1}}'
+
+
+def test_repair_leaves_valid_json_unchanged():
+    text = '{"a": [1, {"b": "c"}], "d": null}'
+    assert repair_json(text) == text
+
+
+def test_non_object_is_rejected():
+    assert loads_lenient("no json here") is None
+    assert loads_lenient('[1, 2]') is None
+
+
+def _category(score):
+    return {"score": score, "explanation": "e", "evidence": "q"}
+
+
+def test_validate_reports_missing_fields_and_recomputes_overall():
+    evaluation = {"category_scores": {name: _category(4) for name in CATEGORIES[1:]}, "strengths": ["s"]}
+    assert validate_evaluation(evaluation) == [f"category_scores.{CATEGORIES[0]}", "areas_for_improvement"]
+
+    merge_patch(evaluation, {CATEGORIES[0]: _category("5"), "areas_for_improvement": []},
+                [f"category_scores.{CATEGORIES[0]}", "areas_for_improvement"])
+    assert validate_evaluation(evaluation) == []
+    assert evaluation["overall_score"] == 4
+
+
+def test_merge_patch_keeps_fields_that_were_already_valid():
+    evaluation = {"strengths": ["kept"]}
+    merge_patch(evaluation, {"strengths": ["replaced"], "areas_for_improvement": ["a"]}, ["areas_for_improvement"])
+    assert evaluation["strengths"] == ["kept"]
+    assert evaluation["areas_for_improvement"] == ["a"]
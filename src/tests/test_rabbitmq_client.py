@@ -0,0 +1,72 @@
+import json
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+
+pika = pytest.importorskip("pika")
+
+from src.clients.rabbitmq_client import ATTEMPT_HEADER, RabbitMQClient
+
+
+class FakeChannel:
+    is_open = True
+
+    def __init__(self):
+        self.calls = []
+
+    def basic_publish(self, exchange, routing_key, body, properties):
+        self.calls.append(("publish", routing_key, properties.headers[ATTEMPT_HEADER]))
+
+    def basic_ack(self, delivery_tag):
+        self.calls.append(("ack", delivery_tag))
+
+    def basic_nack(self, delivery_tag, requeue):
+        self.calls.append(("nack", delivery_tag, requeue))
+
+
+class FakeConnection:
+    @staticmethod
+    def add_callback_threadsafe(fn):
+        fn()
+
+
+def run_inline(client, channel, error, attempt, on_failure):
+    def callback(message):
+        if error is not None:
+            raise error
+
+    client._handle_message(
+        callback, "jobs", on_failure, channel,
+        SimpleNamespace(delivery_tag=7), pika.BasicProperties(headers={ATTEMPT_HEADER: attempt}),
+        json.dumps({"call_id": "c"})
+    )
+
+
+def run_pooled(client, channel, error, attempt, on_failure):
+    properties = pika.BasicProperties(headers={ATTEMPT_HEADER: attempt})
+    body = json.dumps({"call_id": "c"})
+    delivery = client._decode(channel, "jobs", SimpleNamespace(delivery_tag=7), properties, body)
+    future = Future()
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
+    client._on_job_done(FakeConnection(), channel, delivery, on_failure, future)
+
+
+@pytest.mark.parametrize("run", [run_inline, run_pooled])
+@pytest.mark.parametrize("error, attempt, calls, gave_up", [
+    (None, 1, [("ack", 7)], False),
+    (RuntimeError("boom"), 1, [("publish", "jobs.retry.5s", 2), ("ack", 7)], False),
+    (RuntimeError("boom"), 2, [("ack", 7)], True),
+])
+def test_inline_and_pool_modes_settle_failures_the_same_way(run, error, attempt, calls, gave_up):
+    client = RabbitMQClient(retry_delays=[5])
+    channel = FakeChannel()
+    failed = []
+
+    run(client, channel, error, attempt, lambda message, e: failed.append(message))
+
+    assert channel.calls == calls
+    assert failed == ([{"call_id": "c"}] if gave_up else [])
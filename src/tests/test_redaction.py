@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+from src.services.redaction import RedactionEngine
+
+
+class FakeNlp:
+    """
+    Stands in for a spaCy pipeline: tags fixed substrings as entities.
+    """
+    def __init__(self, entities: dict):
+        self.entities = entities
+
+    def pipe(self, texts, batch_size=None):
+        for text in texts:
+            ents = []
+            for substring, label in self.entities.items():
+                start = text.find(substring)
+                if start >= 0:
+                    ents.append(SimpleNamespace(start_char=start, end_char=start + len(substring), label_=label))
+            yield SimpleNamespace(ents=ents)
+
+
+def test_overlapping_spans_extend_the_redaction():
+    text = "call me at 415-555-0134 now"
+    assert RedactionEngine.apply_spans(text, [(8, 15, "PERSON"), (11, 23, "PHONE")]) == "call me [REDACTED_PERSON] now"
+    # A span nested inside an earlier one leaves it unchanged.
+    assert RedactionEngine.apply_spans(text, [(8, 23, "PERSON"), (11, 14, "PHONE")]) == "call me [REDACTED_PERSON] now"
+
+
+def test_patterns_redact_common_pii():
+    engine = RedactionEngine()
+    text = "Email jane.doe@example.com, card 4111 1111 1111 1111, phone (415) 555-0134."
+    assert engine.redact_text(text) == "Email [REDACTED_EMAIL], card [REDACTED_CARD], phone [REDACTED_PHONE]."
+
+
+def test_ner_and_pattern_overlap_in_segments():
+    engine = RedactionEngine()
+    # The NER tier tags "at 415" as a place while the phone pattern
+    # matches the number it starts inside.
+    engine.nlp = FakeNlp({"at 415": "GPE"})
+    transcript = {
+        "text": " call me at 415-555-0134 now",
+        "segments": [{"id": 0, "start": 0.0, "end": 2.0, "text": " call me at 415-555-0134 now", "tokens": [1, 2]}]
+    }
+
+    redacted = engine.redact_transcript(transcript)
+    assert redacted["segments"][0]["text"] == " call me [REDACTED_GPE] now"
+    assert "tokens" not in redacted["segments"][0]
+    assert "555" not in redacted["text"]
+
+
+def test_match_across_segments_is_removed_from_both():
+    engine = RedactionEngine()
+    transcript = {"text": "", "segments": [
+        {"id": 0, "start": 0.0, "end": 1.0, "text": " my number is 415-555"},
+        {"id": 1, "start": 1.0, "end": 2.0, "text": "-0134 thanks"},
+    ]}
+
+    redacted = engine.redact_transcript(transcript)
+    assert [segment["text"] for segment in redacted["segments"]] == [" my number is [REDACTED_PHONE]", " thanks"]
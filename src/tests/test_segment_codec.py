@@ -0,0 +1,63 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.clients.segment_codec import LazySegments, pack_segments, unpack_extras
+
+SEGMENTS = [
+    {
+        "id": 0, "seek": 0, "start": 0.0, "end": 2.48, "text": " Hello, thanks for calling.",
+        "tokens": [50364, 2425, 11, 3231, 337, 5141, 13], "temperature": 0.0,
+        "avg_logprob": -0.21875, "compression_ratio": 1.25, "no_speech_prob": 0.015625
+    },
+    {"id": 1, "seek": 3000, "start": 2.48, "end": 5.1, "text": " Hi.", "tokens": []},
+    {"id": 2, "start": 5.1, "end": 6.0, "text": " ..."},
+]
+
+
+def test_pack_unpack_round_trip():
+    starts, ends, texts, extras = pack_segments(SEGMENTS)
+    assert texts == [segment["text"] for segment in SEGMENTS]
+
+    segments = LazySegments(starts, ends, texts, extras).to_list()
+    assert segments[0] == SEGMENTS[0]
+    assert segments[1] == SEGMENTS[1]
+    # Fields missing on write stay missing on read.
+    assert segments[2] == {**SEGMENTS[2], "tokens": []}
+
+
+def test_unpack_keeps_float_precision_to_six_places():
+    segment = {"start": 0, "end": 1, "text": "x", "avg_logprob": -0.123456789}
+    _, _, _, extras = pack_segments([segment])
+    assert math.isclose(unpack_extras(extras, 1)[0]["avg_logprob"], -0.123457)
+
+
+def test_empty_transcript():
+    starts, ends, texts, extras = pack_segments([])
+    assert (starts, ends, texts) == ([], [], [])
+    assert unpack_extras(extras, 0) == []
+
+
+def test_corrupt_extras_are_rejected():
+    _, _, _, extras = pack_segments(SEGMENTS)
+    with pytest.raises(ValueError):
+        unpack_extras(extras, len(SEGMENTS) + 1)
+    with pytest.raises(ValueError):
+        unpack_extras(b"XXXX" + extras[4:], len(SEGMENTS))
+
+
+def test_lazy_segments_indexing_without_extras():
+    segments = LazySegments([0.0, 1.23456], [1.23456, 2.0], ["a", "b"])
+    assert len(segments) == 2
+    assert segments[-1] == {"id": 1, "start": 1.235, "end": 2.0, "text": "b"}
+    assert segments[0:1] == [{"id": 0, "start": 0.0, "end": 1.235, "text": "a"}]
+    with pytest.raises(IndexError):
+        segments[2]
+
+
+def test_lazy_segments_fall_back_to_legacy_json():
+    legacy = [{"id": 0, "start": 0.0, "end": 1.0, "text": "a", "tokens": [1, 2], "seek": 0}]
+    segments = LazySegments([0.0], [1.0], ["a"], legacy=legacy)
+    assert segments[0] == legacy[0]
@@ -0,0 +1,60 @@
+import pytest
+
+pytest.importorskip("tiktoken")
+
+from src.services.transcript_format import TranscriptFormatter, collapse_repeats
+
+
+def segments(*texts, gap: float = 0.1):
+    return [
+        {"start": i * (1.0 + gap), "end": i * (1.0 + gap) + 1.0, "text": f" {text}"}
+        for i, text in enumerate(texts)
+    ]
+
+
+def render(*texts, **options):
+    return TranscriptFormatter(compact=True, **options).render_compact(segments(*texts))
+
+
+def test_repeated_single_word_segments_are_kept():
+    assert render("No.", "No.", "No.") == "00:00 No. No. No."
+
+
+def test_multi_word_segment_loop_collapses_to_one():
+    assert render("Thank you.", "Thank you.", "thank you", "Bye now.") == "00:00 Thank you. Bye now."
+
+
+def test_multi_word_segment_said_twice_is_kept():
+    assert render("Thank you.", "Thank you.", "Bye now.") == "00:00 Thank you. Thank you. Bye now."
+
+
+def test_read_out_numbers_are_kept():
+    assert render("one two 3", "one two 3", "one two 3") == "00:00 one two 3 one two 3 one two 3"
+
+
+def test_filler_runs_are_dropped():
+    assert render("uh", "um", "Hello there.") == "00:00 uh Hello there."
+
+
+def test_empty_segments_do_not_break_a_loop():
+    assert render("Thank you.", "", "Thank you.", "Thank you.") == "00:00 Thank you."
+
+
+def test_collapse_off_keeps_everything():
+    assert render("Thank you.", "Thank you.", "Thank you.", collapse=False) == "00:00 Thank you. Thank you. Thank you."
+
+
+def test_lines_split_on_gaps_and_length():
+    formatter = TranscriptFormatter(compact=True, merge_chars=12, max_gap=1.0)
+    text = formatter.render_compact([
+        {"start": 0.0, "end": 1.0, "text": " Hello."},
+        {"start": 1.2, "end": 2.0, "text": " How are you?"},
+        {"start": 65.0, "end": 66.0, "text": " Fine."},
+    ])
+    assert text == "00:00 Hello.\n00:01 How are you?\n01:05 Fine."
+
+
+def test_in_segment_phrase_loops_collapse_but_single_words_stay():
+    assert collapse_repeats("thank you, thank you, thank you so much") == "thank you so much"
+    assert collapse_repeats("no, no, no") == "no, no, no"
+    assert collapse_repeats("um um um okay") == "um okay"